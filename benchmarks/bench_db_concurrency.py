@@ -0,0 +1,125 @@
+"""Benchmark SQLite ingest and fetch throughput with concurrent writers.
+
+Runs writer threads bulk-upserting messages while reader threads fetch digest
+windows, once with SQLite's defaults (rollback journal, synchronous=FULL) and
+once with the pragmas ``storage.db.get_engine`` applies (WAL, synchronous=NORMAL,
+busy_timeout, mmap).
+
+    python benchmarks/bench_db_concurrency.py --writers 4 --readers 4 --seconds 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from slack_digest_bot.app.settings import get_settings
+from slack_digest_bot.storage.db import Base, get_engine, sqlite_pragmas
+from slack_digest_bot.storage.repo import Repository
+
+CHANNELS = [f"C{idx:03d}" for idx in range(20)]
+
+
+def message_row(worker: int, seq: int, created_at: Optional[dt.datetime] = None) -> Dict:
+    return {
+        "team_id": "T1",
+        "channel_id": CHANNELS[seq % len(CHANNELS)],
+        "slack_ts": f"{worker}{seq:09d}.000100",
+        "user_id": f"U{seq % 50}",
+        "text": f"message {seq} from writer {worker}",
+        "thread_ts": None,
+        "subtype": None,
+        "created_at": created_at,
+    }
+
+
+def run(db_path: Path, pragmas: Optional[Dict[str, Any]], args: argparse.Namespace) -> Dict:
+    engine = get_engine(f"sqlite:///{db_path}", pragmas=pragmas)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    with session_factory.begin() as session:
+        repo = Repository(session)
+        repo.add_channels(repo.get_or_create_user("T1", "U1"), CHANNELS)
+        # Readers fetch this fixed window so their cost does not grow with ingest.
+        until = dt.datetime.now(dt.timezone.utc) - dt.timedelta(minutes=1)
+        repo.bulk_upsert_messages(
+            [message_row(9, seq, until - dt.timedelta(seconds=seq)) for seq in range(args.seed)]
+        )
+
+    stop = threading.Event()
+    counts = {"rows": 0, "fetches": 0, "errors": 0}
+    lock = threading.Lock()
+    since = until - dt.timedelta(seconds=args.seed)
+
+    def bump(key: str, amount: int = 1) -> None:
+        with lock:
+            counts[key] += amount
+
+    def writer(worker: int) -> None:
+        seq = 0
+        while not stop.is_set():
+            rows = [message_row(worker, seq + idx) for idx in range(args.batch)]
+            seq += args.batch
+            try:
+                with session_factory.begin() as session:
+                    Repository(session).bulk_upsert_messages(rows)
+            except OperationalError:
+                bump("errors")
+            else:
+                bump("rows", len(rows))
+
+    def reader() -> None:
+        while not stop.is_set():
+            try:
+                with session_factory() as session:
+                    Repository(session).fetch_messages_for_user(
+                        "T1", "U1", since=since, until=until
+                    )
+            except OperationalError:
+                bump("errors")
+            else:
+                bump("fetches")
+
+    threads = [threading.Thread(target=writer, args=(idx,)) for idx in range(args.writers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=50, help="rows per write transaction")
+    parser.add_argument("--seed", type=int, default=2000, help="messages in the read window")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    configs = {"defaults": {}, "tuned": sqlite_pragmas(get_settings())}
+    print(f"{args.writers} writers x {args.batch} rows/txn, {args.readers} readers")
+    for name, pragmas in configs.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            counts = run(Path(tmp) / "bench.db", pragmas, args)
+        print(
+            f"{name:8s}: {counts['rows'] / args.seconds:10.0f} rows/s ingested  "
+            f"{counts['fetches'] / args.seconds:8.1f} fetches/s  "
+            f"{counts['errors']} lock errors"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Measure cold import time of the bot's entry point with ``python -X importtime``.
+
+Each run imports the package in a fresh interpreter and reports the median
+cumulative time plus the slowest top-level dependencies. With ``--budget-ms``
+the script exits non-zero when the median exceeds it, so CI can guard startup.
+
+    python benchmarks/bench_import_time.py --module slack_digest_bot.app.main --budget-ms 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# "import time: self [us] | cumulative | imported package", nesting shown by indent
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module: str) -> List[Tuple[str, int, int]]:
+    """(module, cumulative us, depth) for every import made by importing ``module``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            rows.append((match.group(4), int(match.group(2)), len(match.group(3)) // 2))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="slack_digest_bot.app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    totals: List[float] = []
+    heaviest: Dict[str, List[int]] = {}
+    for _ in range(args.runs):
+        profile = import_profile(args.module)
+        totals.append(next(us for name, us, _ in profile if name == args.module) / 1000)
+        for name, us, depth in profile:
+            if depth == 1:  # direct imports of the measured module
+                heaviest.setdefault(name, []).append(us)
+
+    median_ms = statistics.median(totals)
+    print(f"import {args.module}: median {median_ms:.0f} ms over {args.runs} runs")
+    ranked = sorted(heaviest.items(), key=lambda item: -statistics.median(item[1]))
+    for name, samples in ranked[: args.top]:
+        print(f"  {statistics.median(samples) / 1000:8.1f} ms  {name}")
+
+    if args.budget_ms is not None and median_ms > args.budget_ms:
+        print(f"over budget: {median_ms:.0f} ms > {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark unanswered-question detection on synthetic channel traffic.
+
+Compares ``detect_unanswered`` against the original list-membership implementation
+and checks both return the same messages.
+
+    python benchmarks/bench_preprocess.py --messages 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import random
+import time
+from typing import Dict, List
+
+from slack_digest_bot.digest.preprocess import detect_unanswered, is_question_candidate
+from slack_digest_bot.storage.models import DigestMessage
+
+
+def detect_unanswered_baseline(
+    all_messages: List[DigestMessage], question_candidates: List[DigestMessage]
+) -> List[DigestMessage]:
+    """The pre-optimisation implementation, kept verbatim as the reference."""
+    unanswered: List[DigestMessage] = []
+    messages_by_thread: Dict[str, List[DigestMessage]] = {}
+    for msg in all_messages:
+        if msg.thread_ts:
+            messages_by_thread.setdefault(msg.thread_ts, []).append(msg)
+
+    for _thread_ts, msgs in messages_by_thread.items():
+        ordered = sorted(msgs, key=lambda m: m.slack_ts)
+        starter = ordered[0]
+        if starter not in question_candidates:
+            continue
+        if len(ordered) == 1:
+            unanswered.append(starter)
+
+    channel_buckets: Dict[str, List[DigestMessage]] = {}
+    for msg in all_messages:
+        if not msg.thread_ts:
+            channel_buckets.setdefault(msg.channel_id, []).append(msg)
+    for msgs in channel_buckets.values():
+        ordered = sorted(msgs, key=lambda m: m.slack_ts)
+        for idx, msg in enumerate(ordered):
+            if msg not in question_candidates:
+                continue
+            window = ordered[idx + 1 : idx + 6]
+            if not window:
+                unanswered.append(msg)
+                continue
+            current_time = dt.datetime.fromtimestamp(float(msg.slack_ts))
+            replied = False
+            for nxt in window:
+                next_time = dt.datetime.fromtimestamp(float(nxt.slack_ts))
+                if (next_time - current_time) <= dt.timedelta(minutes=20):
+                    replied = True
+                    break
+            if not replied:
+                unanswered.append(msg)
+    return unanswered
+
+
+def synthetic_messages(count: int, channels: int, seed: int = 7) -> List[DigestMessage]:
+    rng = random.Random(seed)
+    texts = ["deploy done", "Can someone review?", "lgtm", "why is CI red", "thanks!", "ok"]
+    ts = 1_700_000_000.0
+    messages: List[DigestMessage] = []
+    open_threads: List[str] = []
+    for idx in range(count):
+        ts += rng.expovariate(1 / 90)  # ~90s between messages workspace-wide
+        slack_ts = f"{ts:.6f}"
+        thread_ts = None
+        roll = rng.random()
+        if roll < 0.1:
+            thread_ts = slack_ts
+            open_threads.append(slack_ts)
+        elif roll < 0.3 and open_threads:
+            thread_ts = rng.choice(open_threads[-50:])
+        messages.append(
+            DigestMessage(
+                channel_id=f"C{rng.randrange(channels):04d}",
+                slack_ts=slack_ts,
+                user_id=f"U{idx % 300}",
+                text=rng.choice(texts),
+                thread_ts=thread_ts,
+            )
+        )
+    rng.shuffle(messages)  # DB order is created_at, not ts; exercise the sort path
+    return messages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--channels", type=int, default=50)
+    args = parser.parse_args()
+
+    messages = synthetic_messages(args.messages, args.channels)
+    candidates = [m for m in messages if is_question_candidate(m.text)]
+    print(f"{len(messages)} messages, {len(candidates)} question candidates")
+
+    started = time.perf_counter()
+    fast = detect_unanswered(messages, candidates)
+    fast_s = time.perf_counter() - started
+    print(f"detect_unanswered:          {fast_s:8.3f}s")
+
+    started = time.perf_counter()
+    baseline = detect_unanswered_baseline(messages, candidates)
+    base_s = time.perf_counter() - started
+    print(f"baseline (list membership): {base_s:8.3f}s")
+
+    assert fast == baseline, "optimised detector diverged from the baseline"
+    print(f"identical results ({len(fast)} unanswered); speedup x{base_s / fast_s:.0f}")
+
+
+if __name__ == "__main__":
+    main()
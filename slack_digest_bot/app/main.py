@@ -1,11 +1,15 @@
+import atexit
 import logging
 import os
 
 from slack_digest_bot.app.logging_config import configure_logging
 from slack_digest_bot.app.settings import get_settings
 from slack_digest_bot.digest.scheduler import DigestScheduler
+from slack_digest_bot.llm.gateway import get_llm_gateway
 from slack_digest_bot.slack.bolt_app import build_bolt_app, run_socket_mode
+from slack_digest_bot.slack.event_queue import EventWorkerPool
 from slack_digest_bot.storage.db import init_db
+from slack_digest_bot.storage.ingest import MessageIngestBuffer
 
 
 def main() -> None:
@@ -14,7 +18,39 @@ def main() -> None:
     logging.getLogger(__name__).info("Starting Slack digest bot in %s mode", settings.env)
 
     init_db()
-    app, slack_client = build_bolt_app(settings)
+    atexit.register(get_llm_gateway().close)
+    ingest_buffer = None
+    if settings.ingest_buffer_enabled:
+        ingest_buffer = MessageIngestBuffer(
+            flush_interval_ms=settings.ingest_flush_interval_ms,
+            max_rows=settings.ingest_flush_max_rows,
+            max_pending=settings.ingest_max_pending,
+            max_attempts=settings.ingest_max_attempts,
+        )
+        ingest_buffer.start()
+        atexit.register(ingest_buffer.close)
+
+    put_timeout = settings.event_queue_put_timeout_ms / 1000
+    event_pool = EventWorkerPool(
+        "events",
+        workers=settings.event_workers,
+        max_queue=settings.event_queue_size,
+        put_timeout=put_timeout,
+    )
+    dm_pool = EventWorkerPool(
+        "dm",
+        workers=settings.dm_workers,
+        max_queue=settings.event_queue_size,
+        put_timeout=put_timeout,
+    )
+    for pool in (event_pool, dm_pool):
+        pool.start()
+        # atexit runs LIFO: pools drain into the ingest buffer before it flushes.
+        atexit.register(pool.close)
+
+    app, slack_client = build_bolt_app(
+        settings, ingest_buffer=ingest_buffer, event_pool=event_pool, dm_pool=dm_pool
+    )
 
     scheduler = DigestScheduler(slack_client)
     scheduler.bootstrap_from_db()
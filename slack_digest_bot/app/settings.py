@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -19,20 +19,84 @@ class Settings(BaseSettings):
     slack_client_id: Optional[str] = None
     slack_client_secret: Optional[SecretStr] = None
     slack_scopes: List[str] = Field(default_factory=list)
+    slack_api_base_url: Optional[str] = None  # e.g. a local fake Slack API server
+    # Overrides of requests/minute per method tier ("tier1".."tier4", "post")
+    slack_tier_rates_per_minute: Dict[str, float] = Field(default_factory=dict)
+    slack_max_rate_limit_waits: int = 10
 
     # OpenAI
     openai_api_key: SecretStr = SecretStr("dev-openai-key")
     openai_model_digest: str = "gpt-4.1"
     openai_model_nl: str = "gpt-4.1-mini"
+    openai_base_url: Optional[str] = None  # e.g. a proxy or a local stub server
+    openai_max_concurrency: int = 16
+    openai_requests_per_minute: float = 500
+    openai_tokens_per_minute: float = 200_000
+    openai_max_retries: int = 4
+    openai_timeout_seconds: float = 60.0
+    # Response cache in front of the gateway, keyed by the normalised request
+    llm_cache_enabled: bool = True
+    llm_cache_backend: str = "memory"  # "memory" (per-process LRU) or "sql" (shared table)
+    llm_cache_max_entries: int = 4096
+    llm_cache_ttl_seconds: int = 3600
 
     # Database
     database_url: str = "sqlite:///./slack_digest.db"
+    # Connection pool for server databases (Postgres)
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30.0
+    db_pool_pre_ping: bool = True
+    db_pool_recycle_seconds: int = 1800
+    # SQLite per-connection pragmas
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
     app_encryption_key: SecretStr = SecretStr("dev-encryption-key-please-change")
     message_retention_days: int = 30
+    message_retention_batch_size: int = 5000  # id range deleted per transaction
+    message_retention_pause_ms: int = 100
+    # Postgres only: detach and drop expired partitions when messages is range-partitioned
+    message_retention_drop_partitions: bool = False
+    tracked_channel_cache_ttl_seconds: int = 300
+
+    # Ingestion
+    ingest_buffer_enabled: bool = True
+    ingest_flush_interval_ms: int = 200
+    ingest_flush_max_rows: int = 500
+    ingest_max_pending: int = 10_000  # producers block beyond this many queued ops
+    ingest_max_attempts: int = 10  # transient-failure retries before dead-lettering
+
+    # Event processing (ack first, persist on worker threads)
+    event_workers: int = 4
+    event_queue_size: int = 1000
+    event_queue_put_timeout_ms: int = 500
+    dm_workers: int = 2
 
     # Scheduling
     default_digest_hour_local: int = 9
     default_digest_minute_local: int = 0
+    schedule_sync_interval_seconds: int = 60
+    schedule_prune_interval_minutes: int = 60  # drop users deleted by other processes
+    digest_workers: int = 32
+    digest_db_concurrency: int = 4
+    digest_llm_concurrency: int = 8
+    digest_slack_posts_per_second: float = 5.0  # per team
+    digest_delivery_workers: int = 8
+    digest_delivery_queue_size: int = 1000
+    summary_cache_max_entries: int = 2048
+    summary_cache_ttl_seconds: int = 86400
+    digest_token_budget: int = 12000  # estimated prompt tokens per digest call
+    digest_map_workers: int = 8  # concurrent chunk summaries for oversized windows
+    rollup_bucket_minutes: int = 30  # time bucket of rolling per-channel summaries
+    rollup_refresh_minutes: int = 15
+    # Batch API mode: build digests ahead of their slot, deliver at the scheduled time
+    digest_batch_enabled: bool = False
+    digest_batch_backend: str = "openai"  # "openai" (Batch API) or "local" (gateway stand-in)
+    digest_batch_lead_minutes: int = 240
+    digest_batch_prepare_interval_minutes: int = 10
+    digest_batch_poll_interval_seconds: int = 60
 
     # Runtime
     log_level: str = "INFO"
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import datetime as dt
+import itertools
+import json
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.app.settings import get_settings
+from slack_digest_bot.digest.engine import DigestEngine, DigestJob
+from slack_digest_bot.digest.llm_digest import DIGEST_FALLBACK, parse_json_content
+from slack_digest_bot.digest.payload import dumps_compact
+from slack_digest_bot.digest.schedule_index import ScheduleIndex
+from slack_digest_bot.llm.gateway import LLMGateway
+from slack_digest_bot.storage.db import session_scope
+from slack_digest_bot.storage.repo import Repository
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+log = logging.getLogger(__name__)
+settings = get_settings()
+
+CHAT_ENDPOINT = "/v1/chat/completions"
+
+# custom_id -> assistant message content, or None when that request failed
+BatchResults = Dict[str, Optional[str]]
+
+
+class BatchBackend(ABC):
+    """Submits many chat requests as one job and reports their results when done."""
+
+    @abstractmethod
+    def submit(self, requests: Mapping[str, Dict[str, Any]]) -> str:
+        """Start a batch of ``custom_id -> chat request``; returns the batch id."""
+
+    @abstractmethod
+    def poll(self, batch_id: str) -> Optional[BatchResults]:
+        """Results once the batch has finished (missing ids failed); None while running."""
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API: one JSONL upload, results fetched from the output file."""
+
+    RUNNING = {"validating", "in_progress", "finalizing", "cancelling"}
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client: Optional[OpenAI] = None
+
+    @property
+    def client(self) -> OpenAI:
+        if self._client is None:
+            from openai import OpenAI
+
+            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    def submit(self, requests: Mapping[str, Dict[str, Any]]) -> str:
+        lines = "\n".join(
+            dumps_compact({"custom_id": cid, "method": "POST", "url": CHAT_ENDPOINT, "body": body})
+            for cid, body in requests.items()
+        )
+        upload = self.client.files.create(
+            file=("digests.jsonl", lines.encode("utf-8")), purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=upload.id, endpoint=CHAT_ENDPOINT, completion_window="24h"
+        )
+        return batch.id
+
+    def poll(self, batch_id: str) -> Optional[BatchResults]:
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status in self.RUNNING:
+            return None
+        results: BatchResults = {}
+        if batch.output_file_id:
+            for line in self.client.files.content(batch.output_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                response = item.get("response") or {}
+                content = None
+                if response.get("status_code") == 200:
+                    content = response["body"]["choices"][0]["message"]["content"]
+                results[item["custom_id"]] = content
+        if batch.status != "completed":
+            log.warning("Digest batch %s ended as %s", batch_id, batch.status)
+        return results
+
+
+class GatewayBatchBackend(BatchBackend):
+    """Local stand-in that runs a "batch" through the realtime gateway in the background.
+
+    Useful with providers or stubs that have no Batch API; results are kept in memory.
+    """
+
+    def __init__(self, gateway: LLMGateway):
+        self.gateway = gateway
+        self._batches: Dict[str, Dict[str, Future]] = {}
+        self._ids = itertools.count(1)
+
+    def submit(self, requests: Mapping[str, Dict[str, Any]]) -> str:
+        batch_id = f"local-{next(self._ids)}"
+        self._batches[batch_id] = {
+            cid: self.gateway.submit("digest-batch", **body) for cid, body in requests.items()
+        }
+        return batch_id
+
+    def poll(self, batch_id: str) -> Optional[BatchResults]:
+        futures = self._batches.get(batch_id)
+        if futures is None:
+            return {}
+        if not all(f.done() for f in futures.values()):
+            return None
+        del self._batches[batch_id]
+        return {
+            cid: None if f.exception() else f.result().choices[0].message.content
+            for cid, f in futures.items()
+        }
+
+
+def _custom_id(job: DigestJob) -> str:
+    return f"{job.team_id}/{job.user_id}/{int(job.scheduled_for.timestamp())}"
+
+
+def _as_utc(moment: dt.datetime) -> dt.datetime:
+    return moment if moment.tzinfo else moment.replace(tzinfo=dt.timezone.utc)
+
+
+class DigestBatchPlanner:
+    """Builds upcoming digests ahead of time and submits them as Batch API jobs.
+
+    ``prepare`` looks ``lead_minutes`` ahead in the schedule index and submits one
+    batch per slot for users not prepared yet. Each window ends at build time, up
+    to ``lead_minutes`` before the slot; messages after it roll into the user's next
+    digest and the gap is recorded as ``digest.batch.window_gap_minutes`` at
+    delivery. ``poll`` stores finished results;
+    ``DigestEngine(use_prepared=True)`` delivers them at the scheduled time and
+    falls back to the realtime path for anything not ready.
+    """
+
+    def __init__(
+        self,
+        engine: DigestEngine,
+        index: ScheduleIndex,
+        backend: BatchBackend,
+        lead_minutes: int = 240,
+    ):
+        self.engine = engine
+        self.index = index
+        self.backend = backend
+        self.lead = dt.timedelta(minutes=lead_minutes)
+
+    def prepare(self, now: Optional[dt.datetime] = None) -> int:
+        """Submit batches for slots due within the lead time; returns requests submitted."""
+        now = now or dt.datetime.now(dt.timezone.utc)
+        submitted = 0
+        # Slots in the next couple of minutes are left to the realtime path.
+        horizon = self.index.due_between(now + dt.timedelta(minutes=2), now + self.lead)
+        for scheduled_for, users in horizon:
+            with session_scope() as session:
+                done = Repository(session).prepared_digest_users(scheduled_for)
+            jobs = [
+                DigestJob(team_id, user_id, scheduled_for)
+                for team_id, user_id in users
+                if (team_id, user_id) not in done
+            ]
+            if jobs:
+                submitted += self._submit(scheduled_for, jobs)
+        return submitted
+
+    def _submit(self, scheduled_for: dt.datetime, jobs: List[DigestJob]) -> int:
+        prepared = self.engine.prepare_requests(jobs)
+        if not prepared:
+            return 0
+        requests = {_custom_id(job): request for job, _, request in prepared}
+        batch_id = self.backend.submit(requests)
+        with session_scope() as session:
+            Repository(session).add_prepared_digests(
+                batch_id=batch_id,
+                scheduled_for=scheduled_for,
+                window_until={(job.team_id, job.user_id): until for job, until, _ in prepared},
+            )
+        metrics.counter("digest.batch.submitted").inc(len(requests))
+        log.info(
+            "Submitted digest batch %s: %s requests for %s", batch_id, len(requests), scheduled_for
+        )
+        return len(requests)
+
+    def poll(self) -> int:
+        """Store results of finished batches; returns digests that became ready."""
+        with session_scope() as session:
+            batch_ids = Repository(session).pending_digest_batches()
+        ready = 0
+        for batch_id in batch_ids:
+            try:
+                results = self.backend.poll(batch_id)
+            except Exception:
+                log.exception("Polling digest batch %s failed", batch_id)
+                continue
+            if results is None:
+                continue
+            ready += self._store_results(batch_id, results)
+        return ready
+
+    def _store_results(self, batch_id: str, results: BatchResults) -> int:
+        ready = 0
+        with session_scope() as session:
+            for row in Repository(session).pending_prepared_digests(batch_id):
+                job = DigestJob(row.team_id, row.user_id, _as_utc(row.scheduled_for))
+                content = results.get(_custom_id(job))
+                if content is None:
+                    row.status = "failed"
+                    continue
+                row.digest_json = parse_json_content(content, DIGEST_FALLBACK)
+                row.status = "ready"
+                ready += 1
+        metrics.counter("digest.batch.ready").inc(ready)
+        log.info("Digest batch %s finished: %s/%s ready", batch_id, ready, len(results))
+        return ready
+
+
+def build_batch_backend(gateway: LLMGateway) -> BatchBackend:
+    if settings.digest_batch_backend == "local":
+        return GatewayBatchBackend(gateway)
+    return OpenAIBatchBackend(
+        api_key=settings.openai_api_key.get_secret_value(), base_url=settings.openai_base_url
+    )
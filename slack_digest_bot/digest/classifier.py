@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import enum
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+
+class MessageFlag(enum.IntFlag):
+    NONE = 0
+    MENTION = 1  # mentions at least one user
+    BROADCAST = 2  # @here / @channel / @everyone
+    QUESTION = 4
+    LINK = 8
+
+
+# Built-in rules as (group name, pattern). Mentions and links only consume their
+# opening token so "?" or custom keywords inside them are still seen by the scan.
+_BUILTIN_PATTERNS: List[Tuple[str, str]] = [
+    ("question_prefix", r"\A\s*(?i:who|what|when|where|why|how|can someone)"),
+    ("mention", r"<@(?P<mention_id>[^<>|]+)"),
+    ("broadcast", r"<!(?:here|channel|everyone)[|>]"),
+    ("link", r"<(?=https?://)"),
+    ("question_mark", r"\?"),
+]
+_FLAG_FOR_GROUP = {
+    "question_prefix": MessageFlag.QUESTION,
+    "question_mark": MessageFlag.QUESTION,
+    "mention": MessageFlag.MENTION,
+    "broadcast": MessageFlag.BROADCAST,
+    "link": MessageFlag.LINK,
+}
+
+
+@dataclass(frozen=True)
+class MessageFeatures:
+    flags: MessageFlag
+    mentions: FrozenSet[str]
+    custom: FrozenSet[str]  # names of matching user-defined rules
+
+
+class MessageClassifier:
+    """Computes every built-in message flag with one combined regex scan.
+
+    User-defined rules are ``{name: pattern}`` (case-insensitive). Each is searched on
+    its own, because a rule in the built-in alternation would consume text the
+    built-ins need (and vice versa). With ``builtin=False`` only the custom rules
+    are checked (flags were stored at ingestion).
+    """
+
+    def __init__(
+        self, custom_patterns: Optional[Mapping[str, str]] = None, *, builtin: bool = True
+    ):
+        parts = [f"(?P<{name}>{pattern})" for name, pattern in _BUILTIN_PATTERNS if builtin]
+        self._pattern = re.compile("|".join(parts)) if parts else None
+        self._custom: List[Tuple[str, re.Pattern[str]]] = []
+        for name, pattern in sorted((custom_patterns or {}).items()):
+            try:
+                self._custom.append((name, re.compile(pattern, re.IGNORECASE)))
+            except re.error:
+                log.warning("Ignoring invalid custom rule %r: %r", name, pattern)
+
+    @property
+    def has_custom_rules(self) -> bool:
+        return bool(self._custom)
+
+    def classify(self, text: str) -> MessageFeatures:
+        flags = MessageFlag.NONE
+        mentions = set()
+        text = text or ""
+        if self._pattern is not None:
+            for match in self._pattern.finditer(text):
+                group = match.lastgroup
+                if group == "mention":
+                    mentions.add(match.group("mention_id"))
+                    flags |= MessageFlag.MENTION
+                elif group:
+                    flags |= _FLAG_FOR_GROUP[group]
+        custom = {name for name, compiled in self._custom if compiled.search(text)}
+        return MessageFeatures(flags=flags, mentions=frozenset(mentions), custom=frozenset(custom))
+
+
+def custom_patterns_from_rules(rules: Optional[Mapping[str, Any]]) -> Dict[str, str]:
+    """Extract ``{"patterns": {name: regex}}`` from ``TrackingPreferences.custom_rules_json``."""
+    patterns = (rules or {}).get("patterns") or {}
+    if not isinstance(patterns, Mapping):
+        return {}
+    return {str(name): str(pattern) for name, pattern in patterns.items() if pattern}
+
+
+@lru_cache(maxsize=256)
+def _cached_classifier(
+    patterns: Tuple[Tuple[str, str], ...], *, builtin: bool
+) -> MessageClassifier:
+    return MessageClassifier(dict(patterns), builtin=builtin)
+
+
+def classifier_for_rules(
+    rules: Optional[Mapping[str, Any]] = None, *, builtin: bool = True
+) -> MessageClassifier:
+    """Shared classifier for a user's custom rules; compiled once per distinct rule set."""
+    patterns = tuple(sorted(custom_patterns_from_rules(rules).items()))
+    return _cached_classifier(patterns, builtin=builtin)
+
+
+MENTIONS_COLUMN_LENGTH = 512
+
+
+def encode_mentions(user_ids: Iterable[str]) -> Optional[str]:
+    ids = sorted(set(user_ids))
+    value = f",{','.join(ids)}," if ids else None
+    while value and len(value) > MENTIONS_COLUMN_LENGTH:
+        ids.pop()
+        value = f",{','.join(ids)}," if ids else None
+    return value
+
+
+def decode_mentions(value: Optional[str]) -> FrozenSet[str]:
+    return frozenset(part for part in (value or "").split(",") if part)
+
+
+def ingestion_features(text: str) -> Tuple[int, Optional[str]]:
+    """User-independent ``(features, mentioned_user_ids)`` column values for a message."""
+    features = classifier_for_rules().classify(text)
+    return int(features.flags), encode_mentions(features.mentions)
@@ -1,15 +1,168 @@
 from __future__ import annotations
 
+import datetime as dt
 import logging
-from typing import Dict
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 
+from slack_sdk.errors import SlackApiError
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.app.ratelimit import TokenBucket
 from slack_digest_bot.digest.renderer import render_digest_blocks
+from slack_digest_bot.slack.dm_channels import is_channel_not_found
+from slack_digest_bot.slack.rate_limits import BULK
 from slack_digest_bot.slack.slack_client import SlackClient
+from slack_digest_bot.storage.db import session_scope
+from slack_digest_bot.storage.repo import Repository
 
 log = logging.getLogger(__name__)
 
 
-def deliver_digest(slack_client: SlackClient, user_id: str, digest_json: Dict) -> None:
-    text, blocks = render_digest_blocks(digest_json)
-    dm_channel = slack_client.open_dm(user_id)
-    slack_client.post_message(dm_channel, text=text, blocks=blocks)
+def deliver_rendered(
+    slack_client: SlackClient, team_id: str, user_id: str, text: str, blocks: List[Dict]
+) -> None:
+    dm_channel = slack_client.dm_channel_id(team_id, user_id)
+    try:
+        slack_client.post_message(dm_channel, text=text, blocks=blocks, priority=BULK)
+    except SlackApiError as exc:
+        if not is_channel_not_found(exc):
+            raise
+        # The cached IM channel is gone; open a fresh one and retry once.
+        slack_client.dm_channels.invalidate(team_id, user_id)
+        dm_channel = slack_client.dm_channel_id(team_id, user_id)
+        slack_client.post_message(dm_channel, text=text, blocks=blocks, priority=BULK)
+
+
+@dataclass
+class RenderedDigest:
+    team_id: str
+    user_id: str
+    scheduled_for: dt.datetime
+    window_until: dt.datetime  # recorded as last_digest_sent_at once posted
+    text: str
+    blocks: List[Dict] = field(default_factory=list)
+
+    @classmethod
+    def render(
+        cls,
+        team_id: str,
+        user_id: str,
+        scheduled_for: dt.datetime,
+        window_until: dt.datetime,
+        digest_json: Dict,
+    ) -> "RenderedDigest":
+        text, blocks = render_digest_blocks(digest_json)
+        return cls(team_id, user_id, scheduled_for, window_until, text, blocks)
+
+
+@dataclass
+class _Delivery:
+    digest: RenderedDigest
+    future: Future
+    enqueued_at: float
+
+
+def _stage_done(stage: str, started: float) -> None:
+    metrics.histogram(f"digest.{stage}.duration_ms").observe((time.perf_counter() - started) * 1000)
+    metrics.counter(f"digest.{stage}.completed").inc()
+
+
+class DeliveryPool:
+    """Posts rendered digests from a bounded queue on its own worker threads.
+
+    Producers (the digest engine) ``submit`` and move on to the next job; a full
+    queue blocks them, which is the backpressure. Posts are paced per team by a
+    token bucket of ``posts_per_second``. After a post, the result is recorded in
+    a short transaction of its own (``last_digest_sent_at``), so no DB connection
+    is held during Slack I/O. Each ``submit`` returns a future of the outcome.
+    """
+
+    def __init__(
+        self,
+        slack_client: SlackClient,
+        workers: int = 8,
+        max_queue: int = 1000,
+        posts_per_second: float = 5.0,
+        db_slots: Optional[threading.Semaphore] = None,
+    ):
+        self.slack_client = slack_client
+        self.posts_per_second = posts_per_second
+        self._db_slots = db_slots
+        self._queue: queue.Queue[Optional[_Delivery]] = queue.Queue(maxsize=max_queue)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._depth = metrics.gauge("digest.delivery.queue_depth")
+        self._wait = metrics.histogram("digest.delivery.queue_wait_ms")
+        self._sent = metrics.counter("digest.delivery.sent")
+        self._errors = metrics.counter("digest.delivery.failed")
+        self._lateness = metrics.histogram("digest.lateness_seconds")
+        self._threads = [
+            threading.Thread(target=self._run, name=f"digest-delivery-{idx}", daemon=True)
+            for idx in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, digest: RenderedDigest) -> Future:
+        future: Future = Future()
+        self._queue.put(_Delivery(digest, future, time.monotonic()))
+        self._depth.set(self._queue.qsize())
+        return future
+
+    def _bucket(self, team_id: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(team_id)
+            if bucket is None:
+                bucket = self._buckets[team_id] = TokenBucket(rate=self.posts_per_second)
+            return bucket
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            self._wait.observe((time.monotonic() - item.enqueued_at) * 1000)
+            self._depth.set(self._queue.qsize())
+            try:
+                self._deliver(item.digest)
+            except Exception as exc:
+                self._errors.inc()
+                log.exception(
+                    "Digest delivery failed for %s/%s", item.digest.team_id, item.digest.user_id
+                )
+                item.future.set_exception(exc)
+            else:
+                self._sent.inc()
+                item.future.set_result(None)
+
+    def _deliver(self, digest: RenderedDigest) -> None:
+        started = time.perf_counter()
+        self._bucket(digest.team_id).acquire()
+        deliver_rendered(
+            self.slack_client, digest.team_id, digest.user_id, digest.text, digest.blocks
+        )
+        _stage_done("deliver", started)
+
+        started = time.perf_counter()
+        with self._db_slots or nullcontext(), session_scope() as session:
+            Repository(session).mark_digest_sent(
+                digest.team_id, digest.user_id, digest.window_until
+            )
+        _stage_done("record", started)
+        self._lateness.observe(
+            (dt.datetime.now(dt.timezone.utc) - digest.scheduled_for).total_seconds()
+        )
+
+    def close(self) -> None:
+        """Finish queued deliveries and stop the workers."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
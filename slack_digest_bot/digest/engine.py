@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.digest.delivery import DeliveryPool, RenderedDigest
+from slack_digest_bot.digest.llm_digest import (
+    build_digest_request,
+    generate_digest,
+    merge_summaries,
+    summarize_channel,
+)
+from slack_digest_bot.digest.preprocess import preprocess_messages
+from slack_digest_bot.digest.rollup import RollingChannelSummaries
+from slack_digest_bot.digest.summary_cache import ChannelSummaryCache, channel_summaries
+from slack_digest_bot.slack.slack_client import SlackClient
+from slack_digest_bot.storage.db import session_scope
+from slack_digest_bot.storage.models import DigestMessage
+from slack_digest_bot.storage.repo import Repository
+
+log = logging.getLogger(__name__)
+
+STAGES = ("fetch", "llm", "deliver", "record")
+
+
+@dataclass
+class DigestJob:
+    team_id: str
+    user_id: str
+    scheduled_for: dt.datetime
+
+
+@dataclass
+class _DigestWindow:
+    timezone: Optional[str]
+    since: dt.datetime
+    until: dt.datetime
+    messages: List[DigestMessage]
+    custom_rules: Dict[str, Any] = field(default_factory=dict)
+    channel_weights: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class SlotReport:
+    jobs: int
+    succeeded: int
+    failed: int
+    wall_seconds: float
+    stage_throughput: Dict[str, float] = field(default_factory=dict)  # completions/sec
+    max_lateness_seconds: float = 0.0
+
+
+class DigestEngine:
+    """Runs due digests concurrently with a separate limit per pipeline stage.
+
+    Each job goes fetch (DB) -> preprocess + LLM -> Slack post -> record (DB). The
+    stages are capped independently so a slow OpenAI call never holds a DB
+    connection. Rendered digests go to a ``DeliveryPool`` with its own workers and
+    per-team post rate, so digest workers never wait on Slack. Channel summaries are
+    shared between users through ``summary_cache`` and assembled from the rolling
+    bucket summaries in ``rollups``; the per-user LLM call only personalises them.
+    With ``use_prepared`` a digest built ahead through the Batch API is delivered
+    when ready, and the job falls back to the realtime path otherwise.
+    """
+
+    def __init__(
+        self,
+        slack_client: SlackClient,
+        workers: int = 32,
+        db_concurrency: int = 4,
+        llm_concurrency: int = 8,
+        slack_posts_per_second: float = 5.0,
+        summary_cache: Optional[ChannelSummaryCache] = None,
+        rollups: Optional[RollingChannelSummaries] = None,
+        rollup_bucket_minutes: int = 30,
+        *,
+        use_prepared: bool = False,
+        delivery_workers: int = 8,
+        delivery_queue_size: int = 1000,
+    ):
+        self.slack_client = slack_client
+        self.summary_cache = summary_cache if summary_cache is not None else channel_summaries
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="digest")
+        self._db_slots = threading.BoundedSemaphore(db_concurrency)
+        self._llm_slots = threading.BoundedSemaphore(llm_concurrency)
+        self.delivery = DeliveryPool(
+            slack_client,
+            workers=delivery_workers,
+            max_queue=delivery_queue_size,
+            posts_per_second=slack_posts_per_second,
+            db_slots=self._db_slots,
+        )
+        self.rollups = rollups or RollingChannelSummaries(
+            summarize=summarize_channel,
+            merge=merge_summaries,
+            bucket_minutes=rollup_bucket_minutes,
+            db_slots=self._db_slots,
+        )
+        self.use_prepared = use_prepared
+        self._failures = metrics.counter("digest.failed")
+        self._prepared_hits = metrics.counter("digest.batch.delivered")
+        self._prepared_fallbacks = metrics.counter("digest.batch.fallbacks")
+        # Minutes between a prepared window's end and its slot; those messages open
+        # the user's next digest.
+        self._prepared_gap = metrics.histogram("digest.batch.window_gap_minutes")
+
+    def run_slot(self, jobs: Sequence[DigestJob]) -> SlotReport:
+        """Run every job of one time slot and block until all of them finished."""
+        started = time.monotonic()
+        before = {stage: metrics.counter(f"digest.{stage}.completed").value for stage in STAGES}
+        produced = [self._executor.submit(self._produce, job) for job in jobs]
+        wait(produced)
+        deliveries = [f.result() for f in produced if f.exception() is None and f.result()]
+        wait(deliveries)
+        wall = max(time.monotonic() - started, 1e-9)
+
+        failed = sum(1 for f in produced if f.exception() is not None)
+        for delivery in deliveries:
+            if delivery.exception() is not None:
+                failed += 1
+                self._failures.inc()
+        report = SlotReport(
+            jobs=len(jobs),
+            succeeded=len(jobs) - failed,
+            failed=failed,
+            wall_seconds=wall,
+            stage_throughput={
+                stage: (metrics.counter(f"digest.{stage}.completed").value - before[stage]) / wall
+                for stage in STAGES
+            },
+        )
+        if jobs:
+            now = dt.datetime.now(dt.timezone.utc)
+            report.max_lateness_seconds = max(
+                (now - job.scheduled_for).total_seconds() for job in jobs
+            )
+        log.info(
+            "Digest slot done: %s jobs (%s failed) in %.1fs; throughput/s %s; max lateness %.1fs",
+            report.jobs,
+            report.failed,
+            report.wall_seconds,
+            {k: round(v, 2) for k, v in report.stage_throughput.items()},
+            report.max_lateness_seconds,
+        )
+        log.info("Channel summary cache: %s", self.summary_cache.stats())
+        return report
+
+    def run_job(self, job: DigestJob) -> None:
+        """Run one digest and block until it has been delivered."""
+        delivery = self._produce(job)
+        if delivery is None:
+            return
+        try:
+            delivery.result()
+        except Exception:
+            self._failures.inc()
+            raise
+
+    def _produce(self, job: DigestJob) -> Optional[Future]:
+        try:
+            return self._run_job(job)
+        except Exception:
+            self._failures.inc()
+            log.exception("Digest failed for %s/%s", job.team_id, job.user_id)
+            raise
+
+    def _run_job(self, job: DigestJob) -> Optional[Future]:
+        """Build the digest and queue it for delivery; None when there is nothing to send."""
+        if self.use_prepared:
+            with self._stage("fetch"), self._db_slots, session_scope() as session:
+                prepared = Repository(session).claim_prepared_digest(
+                    job.team_id, job.user_id, job.scheduled_for
+                )
+            if prepared is not None:
+                self._prepared_hits.inc()
+                gap = (job.scheduled_for - prepared[1]).total_seconds() / 60
+                self._prepared_gap.observe(max(gap, 0.0))
+                return self._enqueue_delivery(job, *prepared)
+            self._prepared_fallbacks.inc()
+
+        with self._stage("fetch"), self._db_slots:
+            window = self._fetch(job)
+        if window is None:
+            return None
+
+        with self._stage("llm"), self._llm_slots:
+            preprocessed = preprocess_messages(
+                window.messages, job.user_id, custom_rules=window.custom_rules
+            )
+            digest_json = generate_digest(
+                user_id=job.user_id,
+                preprocessed=preprocessed,
+                messages=window.messages,
+                timezone=window.timezone,
+                channel_summaries=self._channel_summaries(job.team_id, window),
+                channel_weights=window.channel_weights,
+            )
+        return self._enqueue_delivery(job, digest_json, window.until)
+
+    def _enqueue_delivery(
+        self, job: DigestJob, digest_json: Dict[str, Any], until: dt.datetime
+    ) -> Future:
+        rendered = RenderedDigest.render(
+            job.team_id, job.user_id, job.scheduled_for, until, digest_json
+        )
+        return self.delivery.submit(rendered)
+
+    def prepare_requests(
+        self, jobs: Sequence[DigestJob]
+    ) -> List[Tuple[DigestJob, dt.datetime, Dict[str, Any]]]:
+        """Build the digest LLM requests for future jobs without sending them.
+
+        Each window ends now, not at ``job.scheduled_for``: later messages do not
+        exist yet. Delivery records ``window_until`` as ``last_digest_sent_at``, so
+        messages in the gap open the next digest instead of being lost. Channel
+        summaries are still built here through the realtime gateway (shared and
+        cached); only the per-user call is batched. Returns ``(job, window_until,
+        request)`` per user found.
+        """
+        prepared = []
+        for future in [self._executor.submit(self._prepare_request, job) for job in jobs]:
+            try:
+                result = future.result()
+            except Exception:
+                log.exception("Failed to prepare a batched digest request")
+                continue
+            if result is not None:
+                prepared.append(result)
+        return prepared
+
+    def _prepare_request(
+        self, job: DigestJob
+    ) -> Optional[Tuple[DigestJob, dt.datetime, Dict[str, Any]]]:
+        with self._stage("fetch"), self._db_slots:
+            window = self._fetch(job)
+        if window is None:
+            return None
+        with self._llm_slots:
+            preprocessed = preprocess_messages(
+                window.messages, job.user_id, custom_rules=window.custom_rules
+            )
+            request = build_digest_request(
+                user_id=job.user_id,
+                preprocessed=preprocessed,
+                messages=window.messages,
+                timezone=window.timezone,
+                channel_summaries=self._channel_summaries(job.team_id, window),
+                channel_weights=window.channel_weights,
+            )
+        return job, window.until, request
+
+    def _channel_summaries(self, team_id: str, window: _DigestWindow) -> List[Dict[str, Any]]:
+        by_channel: Dict[str, List[DigestMessage]] = {}
+        for msg in window.messages:
+            by_channel.setdefault(msg.channel_id, []).append(msg)
+        return [
+            self.summary_cache.get_or_compute(
+                team_id,
+                channel_id,
+                channel_messages,
+                partial(
+                    self.rollups.channel_summary,
+                    team_id,
+                    channel_id,
+                    channel_messages,
+                    window.since,
+                    window.until,
+                ),
+            )
+            for channel_id, channel_messages in by_channel.items()
+        ]
+
+    def _fetch(self, job: DigestJob) -> Optional[_DigestWindow]:
+        with session_scope() as session:
+            repo = Repository(session)
+            user = repo.get_user_with_prefs(job.team_id, job.user_id)
+            if not user:
+                return None
+            # Cut the window at the slot time so users sharing a slot see identical
+            # channel contents and hit the same cached summaries.
+            until = min(job.scheduled_for, dt.datetime.now(dt.timezone.utc))
+            since = user.last_digest_sent_at or until - dt.timedelta(days=1)
+            # Materialise plain tuples so the session closes before the LLM stage.
+            messages = list(
+                repo.stream_messages_for_user(job.team_id, job.user_id, since=since, until=until)
+            )
+            prefs = user.tracking_prefs
+            return _DigestWindow(
+                timezone=user.timezone,
+                since=since,
+                until=until,
+                messages=messages,
+                custom_rules=dict(prefs.custom_rules_json or {}) if prefs else {},
+                channel_weights=repo.channel_priority_weights(user),
+            )
+
+    @contextmanager
+    def _stage(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        yield
+        metrics.histogram(f"digest.{stage}.duration_ms").observe(
+            (time.perf_counter() - started) * 1000
+        )
+        metrics.counter(f"digest.{stage}.completed").inc()
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+        self.delivery.close()
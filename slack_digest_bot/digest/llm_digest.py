@@ -1,78 +1,205 @@
 from __future__ import annotations
 
+import json
 import logging
-from typing import Dict, Iterable, List, Optional
-
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Sequence
 
 from slack_digest_bot.app.settings import get_settings
+from slack_digest_bot.digest.payload import (
+    MESSAGE_FIELDS,
+    build_digest_payload,
+    chunk_messages,
+    dumps_compact,
+    fit_rows,
+    rows_tokens,
+)
 from slack_digest_bot.digest.preprocess import PreprocessResult
-from slack_digest_bot.nl.prompts import DIGEST_SYSTEM_PROMPT
-from slack_digest_bot.storage.models import Message
+from slack_digest_bot.llm.gateway import get_llm_gateway
+from slack_digest_bot.nl.prompts import CHANNEL_SUMMARY_SYSTEM_PROMPT, DIGEST_SYSTEM_PROMPT
+from slack_digest_bot.storage.models import DigestMessage
 
 log = logging.getLogger(__name__)
 
 settings = get_settings()
-openai_client = OpenAI(api_key=settings.openai_api_key.get_secret_value())
 
 
-def _serialize_message(msg: Message) -> Dict:
+@lru_cache
+def _chunk_executor() -> ThreadPoolExecutor:
+    """Map step of chunked summarisation; shared so concurrent digests stay bounded."""
+    return ThreadPoolExecutor(
+        max_workers=settings.digest_map_workers, thread_name_prefix="digest-map"
+    )
+
+
+DIGEST_INSTRUCTIONS = (
+    "messages are arrays in message_fields order; mentions_me, broadcasts, "
+    "unanswered_questions and custom_rule_matches list indices into messages. "
+    "Return JSON with overview, mentions_me, broadcasts, unanswered_questions, "
+    "suggested_actions; give items channel_id, ts, author and text."
+)
+
+
+DIGEST_FALLBACK: Dict[str, Any] = {
+    "overview": "Summary unavailable.",
+    "mentions_me": [],
+    "broadcasts": [],
+    "unanswered_questions": [],
+    "suggested_actions": [],
+}
+
+
+def _json_request(system_prompt: str, instruction: str, content: str) -> Dict[str, Any]:
+    """Keyword arguments for one JSON-mode ``chat.completions.create`` call."""
     return {
-        "channel_id": msg.channel_id,
-        "ts": msg.slack_ts,
-        "author": msg.user_id,
-        "text": msg.text,
-        "thread_ts": msg.thread_ts,
+        "model": settings.openai_model_digest,
+        "response_format": {"type": "json_object"},
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": instruction},
+            {"role": "user", "content": content},
+        ],
+        "temperature": 0.2,
     }
 
 
+def parse_json_content(raw_content: Optional[str], fallback: Dict[str, Any]) -> Dict:
+    try:
+        return json.loads(raw_content or "{}")
+    except Exception:
+        log.exception("Failed to parse model JSON; returning fallback")
+        return dict(fallback)
+
+
+def _complete_json(
+    system_prompt: str, instruction: str, content: str, fallback: Dict[str, Any]
+) -> Dict:
+    response = get_llm_gateway().chat(
+        "digest", **_json_request(system_prompt, instruction, content)
+    )
+    return parse_json_content(response.choices[0].message.content, fallback)
+
+
+def _summarize_chunk(channel_id: str, messages: Sequence[DigestMessage]) -> Dict:
+    rows, _, dropped = fit_rows(messages, settings.digest_token_budget)
+    if dropped:
+        log.warning("Channel %s summary dropped %s messages over budget", channel_id, dropped)
+    summary = _complete_json(
+        CHANNEL_SUMMARY_SYSTEM_PROMPT,
+        "Summarise this channel's messages. Only use the provided payload JSON.",
+        dumps_compact(
+            {"channel_id": channel_id, "message_fields": MESSAGE_FIELDS, "messages": rows}
+        ),
+        fallback={"summary": "Summary unavailable.", "highlights": []},
+    )
+    summary["channel_id"] = channel_id
+    return summary
+
+
+def summarize_chunks(messages: Sequence[DigestMessage], token_budget: int) -> List[Dict]:
+    """Map step: summarise channel/thread chunks of ``messages`` concurrently.
+
+    Chunks run on a bounded pool, so the wall time is close to the slowest chunk.
+    """
+    chunks = chunk_messages(messages, token_budget)
+    log.info("Summarising %s messages in %s chunks", len(messages), len(chunks))
+    return list(
+        _chunk_executor().map(lambda chunk: _summarize_chunk(chunk[0].channel_id, chunk), chunks)
+    )
+
+
+def summarize_channel(channel_id: str, messages: Sequence[DigestMessage]) -> Dict:
+    """Reader-independent summary of one channel's messages (shared across users).
+
+    Channels too large for one prompt are summarised in chunks and merged.
+    """
+    budget = settings.digest_token_budget
+    if rows_tokens(messages) <= budget:
+        return _summarize_chunk(channel_id, messages)
+    return merge_summaries(channel_id, summarize_chunks(messages, budget))
+
+
+def merge_summaries(channel_id: str, partials: Sequence[Dict]) -> Dict:
+    """Reduce step: fold partial summaries of one channel into a single summary."""
+    if len(partials) == 1:
+        return {**partials[0], "channel_id": channel_id}
+    summary = _complete_json(
+        CHANNEL_SUMMARY_SYSTEM_PROMPT,
+        "Merge these partial summaries of one channel into a single summary.",
+        dumps_compact({"channel_id": channel_id, "partial_summaries": list(partials)}),
+        fallback={"summary": "Summary unavailable.", "highlights": []},
+    )
+    summary["channel_id"] = channel_id
+    return summary
+
+
+def build_digest_request(
+    *,
+    user_id: str,
+    preprocessed: PreprocessResult,
+    messages: Sequence[DigestMessage],
+    timezone: Optional[str] = None,
+    channel_summaries: Optional[List[Dict]] = None,
+    channel_weights: Optional[Mapping[str, int]] = None,
+    token_budget: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Chat request for a user's digest (see ``generate_digest``); also used for batches."""
+    budget = token_budget or settings.digest_token_budget
+    if channel_summaries is None and rows_tokens(messages) > budget:
+        channel_summaries = summarize_chunks(messages, budget)
+    payload = build_digest_payload(
+        preprocessed=preprocessed,
+        messages=messages,
+        timezone=timezone,
+        instructions=DIGEST_INSTRUCTIONS,
+        token_budget=budget,
+        channel_summaries=channel_summaries,
+        channel_weights=channel_weights,
+    )
+    log.info(
+        "Digest payload for %s: ~%s tokens (saved ~%s, %s messages, %s over budget, "
+        "%s summaries trimmed)",
+        user_id,
+        payload.tokens,
+        payload.tokens_saved,
+        payload.included,
+        payload.dropped,
+        payload.trimmed_summaries,
+    )
+    return _json_request(
+        DIGEST_SYSTEM_PROMPT,
+        "Build a daily Slack digest for the requesting user. Only use the provided payload JSON.",
+        payload.content,
+    )
+
+
 def generate_digest(
     *,
     user_id: str,
     preprocessed: PreprocessResult,
-    messages: Iterable[Message],
+    messages: Sequence[DigestMessage],
     timezone: Optional[str] = None,
+    channel_summaries: Optional[List[Dict]] = None,
+    channel_weights: Optional[Mapping[str, int]] = None,
+    token_budget: Optional[int] = None,
 ) -> Dict:
-    """Call OpenAI to produce structured digest JSON."""
-    messages_payload = [_serialize_message(m) for m in messages]
-    payload = {
-        "timezone": timezone,
-        "messages": messages_payload,
-        "mentions_me": [_serialize_message(m) for m in preprocessed.mentions_me],
-        "broadcasts": [_serialize_message(m) for m in preprocessed.broadcasts],
-        "unanswered_questions": [_serialize_message(m) for m in preprocessed.unanswered_questions],
-        "instructions": "Return JSON with overview, mentions_me, broadcasts, unanswered_questions, suggested_actions.",
-    }
+    """Call OpenAI to produce structured digest JSON.
 
-    response = openai_client.chat.completions.create(
-        model=settings.openai_model_digest,
-        response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": DIGEST_SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": (
-                    "Build a daily Slack digest for the requesting user. "
-                    "Only use the provided payload JSON."
-                ),
-            },
-            {"role": "user", "content": str(payload)},
-        ],
-        temperature=0.2,
+    With ``channel_summaries`` the overview is personalised from those cached
+    per-channel summaries instead of re-reading every message; only the user's own
+    items (mentions, broadcasts, questions, rule matches) are sent verbatim.
+    Without them, a window too large for one prompt is map-reduced: chunks are
+    summarised concurrently and this call reduces them to the digest schema.
+    """
+    request = build_digest_request(
+        user_id=user_id,
+        preprocessed=preprocessed,
+        messages=messages,
+        timezone=timezone,
+        channel_summaries=channel_summaries,
+        channel_weights=channel_weights,
+        token_budget=token_budget,
     )
-
-    raw_content = response.choices[0].message.content or "{}"
-    try:
-        import json
-
-        digest_json = json.loads(raw_content)
-    except Exception:
-        log.exception("Failed to parse digest JSON; returning fallback")
-        digest_json = {
-            "overview": "Summary unavailable.",
-            "mentions_me": [],
-            "broadcasts": [],
-            "unanswered_questions": [],
-            "suggested_actions": [],
-        }
-    return digest_json
+    response = get_llm_gateway().chat("digest", **request)
+    return parse_json_content(response.choices[0].message.content, DIGEST_FALLBACK)
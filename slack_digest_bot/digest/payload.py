@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.digest.preprocess import PreprocessResult
+from slack_digest_bot.llm.tokens import estimate_tokens
+from slack_digest_bot.storage.models import DigestMessage
+
+log = logging.getLogger(__name__)
+
+MESSAGE_FIELDS = ["channel_id", "ts", "author", "text", "thread_ts"]
+
+# Priority points; a channel's priority_weight adds WEIGHT_POINTS per step.
+MENTION_POINTS = 100
+BROADCAST_POINTS = 50
+UNANSWERED_POINTS = 30
+CUSTOM_RULE_POINTS = 20
+WEIGHT_POINTS = 10
+
+MessageKey = Tuple[str, str]  # (channel_id, slack_ts)
+
+
+def dumps_compact(payload: Any) -> str:
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _key(msg: DigestMessage) -> MessageKey:
+    return (msg.channel_id, msg.slack_ts)
+
+
+def _row(msg: DigestMessage, max_chars: int) -> List[Optional[str]]:
+    text = msg.text or ""
+    if len(text) > max_chars:
+        text = text[:max_chars] + "…"
+    return [msg.channel_id, msg.slack_ts, msg.user_id, text, msg.thread_ts]
+
+
+def fit_rows(
+    messages: Iterable[DigestMessage], token_budget: int, max_chars: int = 2000
+) -> Tuple[List[List[Optional[str]]], List[DigestMessage], int]:
+    """Compact rows for ``messages`` (in the given order) that fit in ``token_budget``.
+
+    Returns ``(rows, included, dropped)``; a row that does not fit is skipped so
+    smaller later ones can still use the remaining budget.
+    """
+    rows: List[List[Optional[str]]] = []
+    included: List[DigestMessage] = []
+    dropped = 0
+    used = 0
+    for msg in messages:
+        row = _row(msg, max_chars)
+        cost = estimate_tokens(dumps_compact(row)) + 1
+        if used + cost > token_budget:
+            dropped += 1
+            continue
+        used += cost
+        rows.append(row)
+        included.append(msg)
+    return rows, included, dropped
+
+
+def rows_tokens(messages: Iterable[DigestMessage], max_chars: int = 2000) -> int:
+    return sum(estimate_tokens(dumps_compact(_row(m, max_chars))) + 1 for m in messages)
+
+
+def fit_summaries(
+    summaries: Iterable[Dict[str, Any]], token_budget: int
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Channel summaries (in the given order) cut down to ``token_budget``.
+
+    Returns ``(fitted, trimmed)``. The first summary that does not fit whole is
+    shortened to its ``summary`` text truncated to the remaining budget; summaries
+    after it are dropped. ``trimmed`` counts both.
+    """
+    fitted: List[Dict[str, Any]] = []
+    trimmed = 0
+    used = 0
+    for summary in summaries:
+        cost = estimate_tokens(dumps_compact(summary)) + 1
+        if used + cost <= token_budget:
+            fitted.append(summary)
+            used += cost
+            continue
+        trimmed += 1
+        if used >= token_budget:
+            continue
+        text = str(summary.get("summary") or "")
+        short = {"channel_id": summary.get("channel_id"), "summary": text}
+        while text and used + estimate_tokens(dumps_compact(short)) + 1 > token_budget:
+            text = text[: len(text) * 3 // 4]
+            short["summary"] = text + "…"
+        if text:
+            fitted.append(short)
+            used = token_budget  # nothing after a truncated summary
+    return fitted, trimmed
+
+
+def chunk_messages(
+    messages: Sequence[DigestMessage], token_budget: int, max_chars: int = 2000
+) -> List[List[DigestMessage]]:
+    """Split messages into chunks of at most ``token_budget`` row tokens.
+
+    A chunk never mixes channels. Threads (root plus replies) stay together unless a
+    single thread is itself larger than the budget.
+    """
+    groups: Dict[Tuple[str, str], List[DigestMessage]] = {}
+    for msg in sorted(messages, key=lambda m: float(m.slack_ts)):
+        groups.setdefault((msg.channel_id, msg.thread_ts or msg.slack_ts), []).append(msg)
+
+    chunks: List[List[DigestMessage]] = []
+    current: List[DigestMessage] = []
+    current_channel: Optional[str] = None
+    used = 0
+    for (channel_id, _), group in sorted(groups.items(), key=lambda item: item[0][0]):
+        cost = rows_tokens(group, max_chars)
+        if current and (channel_id != current_channel or used + cost > token_budget):
+            chunks.append(current)
+            current, used = [], 0
+        current_channel = channel_id
+        if cost <= token_budget:
+            current.extend(group)
+            used += cost
+            continue
+        for msg in group:  # oversized thread: split it in ts order
+            msg_cost = rows_tokens([msg], max_chars)
+            if current and used + msg_cost > token_budget:
+                chunks.append(current)
+                current, used = [], 0
+            current.append(msg)
+            used += msg_cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@dataclass
+class DigestPayload:
+    content: str  # compact JSON sent to the model
+    tokens: int
+    included: int
+    dropped: int
+    trimmed_summaries: int = 0
+    # Row tokens not repeated because category lists reference messages by index
+    tokens_saved: int = 0
+    # repr of the copied-message payload this replaces; only measured at DEBUG level
+    baseline_tokens: Optional[int] = None
+
+
+def legacy_payload_tokens(
+    preprocessed: PreprocessResult,
+    messages: Sequence[DigestMessage],
+    timezone: Optional[str],
+    channel_summaries: Optional[List[Dict[str, Any]]],
+) -> int:
+    def serialize(msg: DigestMessage) -> Dict[str, Any]:
+        return dict(zip(MESSAGE_FIELDS, _row(msg, max_chars=len(msg.text or "")), strict=True))
+
+    legacy: Dict[str, Any] = {"timezone": timezone}
+    if channel_summaries is not None:
+        legacy["channel_summaries"] = channel_summaries
+    else:
+        legacy["messages"] = [serialize(m) for m in messages]
+    legacy["mentions_me"] = [serialize(m) for m in preprocessed.mentions_me]
+    legacy["broadcasts"] = [serialize(m) for m in preprocessed.broadcasts]
+    legacy["unanswered_questions"] = [serialize(m) for m in preprocessed.unanswered_questions]
+    legacy["custom_rule_matches"] = {
+        name: [serialize(m) for m in msgs] for name, msgs in preprocessed.custom_matches.items()
+    }
+    return estimate_tokens(str(legacy))
+
+
+def build_digest_payload(
+    *,
+    preprocessed: PreprocessResult,
+    messages: Sequence[DigestMessage],
+    timezone: Optional[str],
+    instructions: str,
+    token_budget: int,
+    channel_summaries: Optional[List[Dict[str, Any]]] = None,
+    channel_weights: Optional[Mapping[str, int]] = None,
+    max_message_chars: int = 2000,
+) -> DigestPayload:
+    """Compact, token-budgeted JSON payload for the digest call.
+
+    Each message is sent once as an array in ``message_fields`` order; the category
+    lists hold indices into ``messages``. Messages are ordered by priority
+    (mentions, broadcasts, unanswered questions, custom rules, channel
+    ``priority_weight``) so the budget cuts the least important ones. With
+    ``channel_summaries`` only messages referenced by a category are included; the
+    summaries (highest channel weight first) get what is left of the budget after
+    room for the reader's mentions, and are trimmed by ``fit_summaries``.
+    """
+    weights = channel_weights or {}
+    categories: Dict[str, Sequence[DigestMessage]] = {
+        "mentions_me": preprocessed.mentions_me,
+        "broadcasts": preprocessed.broadcasts,
+        "unanswered_questions": preprocessed.unanswered_questions,
+    }
+    scores: Dict[MessageKey, int] = {}
+    for name, points in (
+        ("mentions_me", MENTION_POINTS),
+        ("broadcasts", BROADCAST_POINTS),
+        ("unanswered_questions", UNANSWERED_POINTS),
+    ):
+        for msg in categories[name]:
+            scores[_key(msg)] = scores.get(_key(msg), 0) + points
+    for msgs in preprocessed.custom_matches.values():
+        for msg in msgs:
+            scores[_key(msg)] = scores.get(_key(msg), 0) + CUSTOM_RULE_POINTS
+
+    if channel_summaries is None:
+        candidates = list(messages)
+    else:
+        referenced: Dict[MessageKey, DigestMessage] = {}
+        for msgs in [*categories.values(), *preprocessed.custom_matches.values()]:
+            for msg in msgs:
+                referenced.setdefault(_key(msg), msg)
+        candidates = list(referenced.values())
+    candidates.sort(
+        key=lambda m: (
+            -(scores.get(_key(m), 0) + weights.get(m.channel_id, 0) * WEIGHT_POINTS),
+            float(m.slack_ts),
+        )
+    )
+
+    payload: Dict[str, Any] = {"timezone": timezone, "instructions": instructions}
+    if channel_summaries is not None:
+        payload["channel_summaries"] = []
+    payload["message_fields"] = MESSAGE_FIELDS
+    # Reserve room for the envelope and for the index references of each category.
+    references = sum(scores.get(_key(m), 0) > 0 for m in candidates)
+    envelope = estimate_tokens(dumps_compact(payload)) + 64 + references * 2
+    trimmed = 0
+    if channel_summaries is not None:
+        available = max(token_budget - envelope, 0)
+        mention_keys = {_key(m) for m in preprocessed.mentions_me}
+        mentions = [m for m in candidates if _key(m) in mention_keys]
+        reserved = min(rows_tokens(mentions, max_message_chars), available // 2)
+        by_weight = sorted(
+            channel_summaries, key=lambda summary: -weights.get(summary.get("channel_id"), 0)
+        )
+        payload["channel_summaries"], trimmed = fit_summaries(by_weight, available - reserved)
+    overhead = estimate_tokens(dumps_compact(payload)) + 64 + references * 2
+    rows, included, dropped = fit_rows(
+        candidates, max(token_budget - overhead, 0), max_message_chars
+    )
+    index = {_key(msg): idx for idx, msg in enumerate(included)}
+
+    # A reference costs about one token where the legacy payload repeated the row.
+    row_savings = [estimate_tokens(dumps_compact(row)) for row in rows]
+    saved = 0
+
+    def refs(msgs: Sequence[DigestMessage]) -> List[int]:
+        nonlocal saved
+        found = [index[_key(m)] for m in msgs if _key(m) in index]
+        saved += sum(row_savings[idx] for idx in found)
+        return found
+
+    payload["messages"] = rows
+    for name, msgs in categories.items():
+        payload[name] = refs(msgs)
+    payload["custom_rule_matches"] = {
+        name: refs(msgs) for name, msgs in preprocessed.custom_matches.items()
+    }
+
+    content = dumps_compact(payload)
+    result = DigestPayload(
+        content=content,
+        tokens=estimate_tokens(content),
+        included=len(included),
+        dropped=dropped,
+        trimmed_summaries=trimmed,
+        tokens_saved=saved,
+    )
+    metrics.histogram("digest.payload.tokens").observe(result.tokens)
+    metrics.histogram("digest.payload.tokens_saved").observe(saved)
+    if dropped:
+        metrics.counter("digest.payload.dropped_messages").inc(dropped)
+    if trimmed:
+        metrics.counter("digest.payload.trimmed_summaries").inc(trimmed)
+    if log.isEnabledFor(logging.DEBUG):
+        # Re-serialises the whole legacy payload, so it is only worth it when debugging.
+        result.baseline_tokens = legacy_payload_tokens(
+            preprocessed, messages, timezone, channel_summaries
+        )
+        log.debug(
+            "Digest payload: ~%s tokens vs ~%s in the legacy format",
+            result.tokens,
+            result.baseline_tokens,
+        )
+    return result
@@ -1,90 +1,123 @@
 from __future__ import annotations
 
-import datetime as dt
-import re
-from dataclasses import dataclass
-from typing import Dict, Iterable, List
+from dataclasses import dataclass, field
+from itertools import pairwise
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
 
-from slack_digest_bot.storage.models import Message
+from slack_digest_bot.digest.classifier import (
+    MessageFlag,
+    classifier_for_rules,
+    decode_mentions,
+)
+from slack_digest_bot.storage.models import DigestMessage
 
-BROADCAST_TOKENS = {"<!here>", "<!channel>", "<!everyone>"}
-QUESTION_PREFIX = re.compile(r"^(who|what|when|where|why|how|can someone)", re.IGNORECASE)
+REPLY_WINDOW_SECONDS = 20 * 60
+REPLY_LOOKAHEAD = 5  # next messages in the channel considered as replies
 
 
 @dataclass
 class PreprocessResult:
-    mentions_me: List[Message]
-    broadcasts: List[Message]
-    question_candidates: List[Message]
-    unanswered_questions: List[Message]
+    mentions_me: List[DigestMessage]
+    broadcasts: List[DigestMessage]
+    question_candidates: List[DigestMessage]
+    unanswered_questions: List[DigestMessage]
+    custom_matches: Dict[str, List[DigestMessage]] = field(default_factory=dict)
 
 
 def contains_mention(text: str, user_id: str) -> bool:
-    return f"<@{user_id}>" in text
+    return user_id in classifier_for_rules().classify(text).mentions
 
 
 def is_broadcast(text: str) -> bool:
-    return any(token in text for token in BROADCAST_TOKENS)
+    return bool(classifier_for_rules().classify(text).flags & MessageFlag.BROADCAST)
 
 
 def is_question_candidate(text: str) -> bool:
-    normalized = text.strip()
-    if "?" in normalized:
-        return True
-    return bool(QUESTION_PREFIX.match(normalized))
-
-
-def detect_unanswered(all_messages: List[Message], question_candidates: List[Message]) -> List[Message]:
-    unanswered: List[Message] = []
-    messages_by_thread: Dict[str, List[Message]] = {}
+    return bool(classifier_for_rules().classify(text).flags & MessageFlag.QUESTION)
+
+
+def detect_unanswered(
+    all_messages: Sequence[DigestMessage], question_candidates: Sequence[DigestMessage]
+) -> List[DigestMessage]:
+    """Question candidates that nobody answered.
+
+    A thread starter is unanswered when its thread has no replies; a top-level message
+    when none of the next few messages in its channel arrived within the reply window.
+    Linear apart from one sort per channel, which is skipped when already in ts order.
+    """
+    candidate_ids = {id(m) for m in question_candidates}
+    unanswered: List[DigestMessage] = []
+    thread_starters: Dict[str, DigestMessage] = {}
+    thread_sizes: Dict[str, int] = {}
+    channel_buckets: Dict[str, List[DigestMessage]] = {}
     for msg in all_messages:
         if msg.thread_ts:
-            messages_by_thread.setdefault(msg.thread_ts, []).append(msg)
+            starter = thread_starters.get(msg.thread_ts)
+            if starter is None or msg.slack_ts < starter.slack_ts:
+                thread_starters[msg.thread_ts] = msg
+            thread_sizes[msg.thread_ts] = thread_sizes.get(msg.thread_ts, 0) + 1
+        else:
+            channel_buckets.setdefault(msg.channel_id, []).append(msg)
 
     # Threaded messages: unanswered if starter is a question with no replies
-    for thread_ts, msgs in messages_by_thread.items():
-        ordered = sorted(msgs, key=lambda m: m.slack_ts)
-        starter = ordered[0]
-        if starter not in question_candidates:
-            continue
-        if len(ordered) == 1:
+    for thread_ts, starter in thread_starters.items():
+        if id(starter) in candidate_ids and thread_sizes[thread_ts] == 1:
             unanswered.append(starter)
 
-    # Non-threaded: simple window heuristic using all messages
-    channel_buckets: Dict[str, List[Message]] = {}
-    for msg in all_messages:
-        if not msg.thread_ts:
-            channel_buckets.setdefault(msg.channel_id, []).append(msg)
+    # Non-threaded: a reply among the next few messages within the window answers it
     for msgs in channel_buckets.values():
-        ordered = sorted(msgs, key=lambda m: m.slack_ts)
-        for idx, msg in enumerate(ordered):
-            if msg not in question_candidates:
-                continue
-            window = ordered[idx + 1 : idx + 6]  # next few messages
-            if not window:
-                unanswered.append(msg)
+        if any(a.slack_ts > b.slack_ts for a, b in pairwise(msgs)):
+            msgs = sorted(msgs, key=lambda m: m.slack_ts)
+        times = [float(m.slack_ts) for m in msgs]
+        for idx, msg in enumerate(msgs):
+            if id(msg) not in candidate_ids:
                 continue
-            current_time = dt.datetime.fromtimestamp(float(msg.slack_ts))
-            replied = False
-            for nxt in window:
-                next_time = dt.datetime.fromtimestamp(float(nxt.slack_ts))
-                if (next_time - current_time) <= dt.timedelta(minutes=20):
-                    replied = True
-                    break
-            if not replied:
+            current = times[idx]
+            window = times[idx + 1 : idx + 1 + REPLY_LOOKAHEAD]
+            if not any(nxt - current <= REPLY_WINDOW_SECONDS for nxt in window):
                 unanswered.append(msg)
     return unanswered
 
 
-def preprocess_messages(messages: Iterable[Message], user_id: str) -> PreprocessResult:
-    messages_list = list(messages)
-    mentions = [m for m in messages_list if contains_mention(m.text, user_id)]
-    broadcasts = [m for m in messages_list if is_broadcast(m.text)]
-    question_candidates = [m for m in messages_list if is_question_candidate(m.text)]
+def preprocess_messages(
+    messages: Iterable[DigestMessage],
+    user_id: str,
+    custom_rules: Optional[Mapping[str, Any]] = None,
+) -> PreprocessResult:
+    """Classify every message in a single pass and collect the digest categories.
+
+    Messages carrying ingestion-time ``features`` skip the built-in scan; only the
+    user's custom rules (if any) are matched against their text.
+    """
+    classifier = classifier_for_rules(custom_rules)
+    custom_only = classifier_for_rules(custom_rules, builtin=False)
+    messages_list: List[DigestMessage] = []
+    mentions: List[DigestMessage] = []
+    broadcasts: List[DigestMessage] = []
+    question_candidates: List[DigestMessage] = []
+    custom_matches: Dict[str, List[DigestMessage]] = {}
+    for msg in messages:
+        messages_list.append(msg)
+        if msg.features is None:
+            features = classifier.classify(msg.text)
+            flags, mentioned, custom = features.flags, features.mentions, features.custom
+        else:
+            flags = MessageFlag(msg.features)
+            mentioned = decode_mentions(msg.mentioned_user_ids)
+            custom = custom_only.classify(msg.text).custom if custom_only.has_custom_rules else ()
+        if user_id in mentioned:
+            mentions.append(msg)
+        if flags & MessageFlag.BROADCAST:
+            broadcasts.append(msg)
+        if flags & MessageFlag.QUESTION:
+            question_candidates.append(msg)
+        for name in custom:
+            custom_matches.setdefault(name, []).append(msg)
     unanswered = detect_unanswered(messages_list, question_candidates)
     return PreprocessResult(
         mentions_me=mentions,
         broadcasts=broadcasts,
         question_candidates=question_candidates,
         unanswered_questions=unanswered,
+        custom_matches=custom_matches,
     )
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.digest.summary_cache import content_hash
+from slack_digest_bot.storage.db import session_scope
+from slack_digest_bot.storage.models import DigestMessage
+from slack_digest_bot.storage.repo import Repository
+
+log = logging.getLogger(__name__)
+
+_EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+
+Summarize = Callable[[str, Sequence[DigestMessage]], Dict]
+Merge = Callable[[str, Sequence[Dict]], Dict]
+
+
+class RollingChannelSummaries:
+    """Per-channel summaries of fixed time buckets, built during the day.
+
+    ``refresh`` runs on a periodic tick and summarises every closed bucket of each
+    tracked channel once, storing it with a hash of its messages. At digest time
+    ``channel_summary`` reuses stored buckets whose hash still matches (edits and
+    deletes change it) and only summarises the remaining delta before merging, so
+    a digest, manual or retried, does not start over.
+    """
+
+    def __init__(
+        self,
+        summarize: Summarize,
+        merge: Merge,
+        bucket_minutes: int = 30,
+        lookback_hours: int = 24,
+        db_slots: Optional[threading.Semaphore] = None,
+    ):
+        self.summarize = summarize
+        self.merge = merge
+        self.bucket = dt.timedelta(minutes=bucket_minutes)
+        self.lookback = dt.timedelta(hours=lookback_hours)
+        self._db_slots = db_slots
+        self._refreshed_until: Optional[dt.datetime] = None
+        self._reused = metrics.counter("digest.rollup.reused")
+        self._computed = metrics.counter("digest.rollup.computed")
+
+    def _floor(self, moment: dt.datetime) -> dt.datetime:
+        return moment - (moment - _EPOCH) % self.bucket
+
+    def _bucket_of(self, msg: DigestMessage) -> dt.datetime:
+        return self._floor(_EPOCH + dt.timedelta(seconds=float(msg.slack_ts)))
+
+    @contextmanager
+    def _repo(self) -> Iterator[Repository]:
+        with self._db_slots or nullcontext(), session_scope() as session:
+            yield Repository(session)
+
+    def channel_summary(
+        self,
+        team_id: str,
+        channel_id: str,
+        messages: Sequence[DigestMessage],
+        since: Optional[dt.datetime] = None,
+        until: Optional[dt.datetime] = None,
+    ) -> Dict:
+        """Summary of ``messages`` (one channel) built from stored buckets plus the delta."""
+        partials, _ = self._bucket_summaries(team_id, channel_id, messages, since, until)
+        if not partials:
+            return {"channel_id": channel_id, "summary": "", "highlights": []}
+        return self.merge(channel_id, partials)
+
+    def refresh(self, now: Optional[dt.datetime] = None) -> int:
+        """Summarise closed buckets since the last refresh; returns buckets computed."""
+        now = now or dt.datetime.now(dt.timezone.utc)
+        end = self._floor(now)
+        start = self._refreshed_until or self._floor(end - self.lookback)
+        if start >= end:
+            return 0
+        with self._repo() as repo:
+            pairs = repo.tracked_channel_pairs()
+        computed = 0
+        for team_id, channel_id in pairs:
+            try:
+                with self._repo() as repo:
+                    messages = list(repo.stream_channel_messages(team_id, channel_id, start, end))
+                if messages:
+                    computed += self._bucket_summaries(
+                        team_id, channel_id, messages, start, end, now=now
+                    )[1]
+            except Exception:
+                log.exception("Rolling summary refresh failed for %s/%s", team_id, channel_id)
+        self._refreshed_until = end
+        log.info("Rolling summaries refreshed up to %s; %s buckets computed", end, computed)
+        return computed
+
+    def _bucket_summaries(
+        self,
+        team_id: str,
+        channel_id: str,
+        messages: Sequence[DigestMessage],
+        since: Optional[dt.datetime],
+        until: Optional[dt.datetime],
+        now: Optional[dt.datetime] = None,
+    ) -> Tuple[List[Dict], int]:
+        now = now or dt.datetime.now(dt.timezone.utc)
+        buckets: Dict[dt.datetime, List[DigestMessage]] = {}
+        for msg in sorted(messages, key=lambda m: float(m.slack_ts)):
+            buckets.setdefault(self._bucket_of(msg), []).append(msg)
+        with self._repo() as repo:
+            stored = repo.partial_summaries(team_id, channel_id, list(buckets))
+
+        partials: List[Dict] = []
+        fresh = []
+        computed = 0
+        for start, bucket_messages in buckets.items():
+            digest = content_hash(bucket_messages)
+            hit = stored.get(start)
+            if hit is not None and hit[0] == digest:
+                self._reused.inc()
+                partials.append(hit[1])
+                continue
+            summary = self.summarize(channel_id, bucket_messages)
+            self._computed.inc()
+            computed += 1
+            partials.append(summary)
+            end = start + self.bucket
+            # Only closed buckets seen in full are stored; a window edge holds a subset.
+            inside = (since is None or start >= since) and (until is None or end <= until)
+            if end <= now and inside:
+                fresh.append((start, end, digest, len(bucket_messages), summary))
+
+        if fresh:
+            with self._repo() as repo:
+                for start, end, digest, count, summary in fresh:
+                    repo.save_partial_summary(
+                        team_id=team_id,
+                        channel_id=channel_id,
+                        bucket_start=start,
+                        bucket_end=end,
+                        content_hash=digest,
+                        message_count=count,
+                        summary=summary,
+                    )
+        return partials, computed
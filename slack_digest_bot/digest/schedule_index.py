@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import bisect
+import datetime as dt
+import logging
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+log = logging.getLogger(__name__)
+
+SlotKey = Tuple[str, str]  # (timezone, HH:MM local)
+UserKey = Tuple[str, str]  # (team_id, user_id)
+
+_EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def _to_minute(moment: dt.datetime) -> int:
+    return int((moment - _EPOCH).total_seconds() // 60)
+
+
+def _from_minute(minute: int) -> dt.datetime:
+    return _EPOCH + dt.timedelta(minutes=minute)
+
+
+def _zone(timezone: str) -> dt.tzinfo:
+    if not timezone or timezone == "UTC":
+        return dt.timezone.utc
+    try:
+        return ZoneInfo(timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        log.warning("Unknown timezone %r; scheduling in UTC", timezone)
+        return dt.timezone.utc
+
+
+def next_fire_minute(slot: SlotKey, after: dt.datetime) -> int:
+    """First UTC minute strictly after ``after`` at which the slot's local time occurs.
+
+    Resolved through zoneinfo for the actual local date, so DST shifts move the slot.
+    """
+    timezone, time_local = slot
+    tz = _zone(timezone)
+    hour, minute = map(int, time_local.split(":"))
+    local_date = after.astimezone(tz).date()
+    after_minute = _to_minute(after)
+    for offset in (-1, 0, 1, 2):
+        day = local_date + dt.timedelta(days=offset)
+        candidate = dt.datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz)
+        fire = _to_minute(candidate.astimezone(dt.timezone.utc))
+        if fire > after_minute:
+            return fire
+    raise ValueError(f"Could not resolve next fire time for {slot}")
+
+
+class ScheduleIndex:
+    """Digest schedule as a sorted index of UTC minutes.
+
+    Users are grouped by (timezone, local time); only groups are placed in the sorted
+    index, keyed by their next fire minute in UTC. Each group's minute is recomputed
+    after it fires, which keeps it correct across DST changes.
+    """
+
+    def __init__(self) -> None:
+        self._groups: Dict[SlotKey, Set[UserKey]] = {}
+        self._user_slot: Dict[UserKey, SlotKey] = {}
+        self._fire_minute: Dict[SlotKey, int] = {}
+        self._queue: List[Tuple[int, SlotKey]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._user_slot)
+
+    def user_keys(self) -> Set[UserKey]:
+        with self._lock:
+            return set(self._user_slot)
+
+    def upsert(
+        self,
+        team_id: str,
+        user_id: str,
+        timezone: Optional[str],
+        time_local: str,
+        now: Optional[dt.datetime] = None,
+    ) -> None:
+        user_key = (team_id, user_id)
+        slot = (timezone or "UTC", time_local)
+        with self._lock:
+            previous = self._user_slot.get(user_key)
+            if previous == slot:
+                return
+            if previous is not None:
+                self._discard(user_key, previous)
+            members = self._groups.setdefault(slot, set())
+            if not members:
+                moment = now or dt.datetime.now(dt.timezone.utc)
+                minute = next_fire_minute(slot, moment)
+                self._fire_minute[slot] = minute
+                bisect.insort(self._queue, (minute, slot))
+            members.add(user_key)
+            self._user_slot[user_key] = slot
+
+    def remove(self, team_id: str, user_id: str) -> None:
+        user_key = (team_id, user_id)
+        with self._lock:
+            slot = self._user_slot.get(user_key)
+            if slot is not None:
+                self._discard(user_key, slot)
+
+    def _discard(self, user_key: UserKey, slot: SlotKey) -> None:
+        self._user_slot.pop(user_key, None)
+        members = self._groups.get(slot)
+        if members is None:
+            return
+        members.discard(user_key)
+        if not members:
+            # Stale queue entries are skipped lazily in ``pop_due``.
+            del self._groups[slot]
+            self._fire_minute.pop(slot, None)
+
+    def pop_due(self, now: dt.datetime) -> List[Tuple[dt.datetime, List[UserKey]]]:
+        """Return (scheduled_for, users) for every group due at or before ``now``."""
+        now_minute = _to_minute(now)
+        due: List[Tuple[dt.datetime, List[UserKey]]] = []
+        with self._lock:
+            split = 0
+            while split < len(self._queue) and self._queue[split][0] <= now_minute:
+                split += 1
+            popped, self._queue = self._queue[:split], self._queue[split:]
+            for minute, slot in popped:
+                if self._fire_minute.get(slot) != minute:
+                    continue
+                due.append((_from_minute(minute), sorted(self._groups[slot])))
+                next_minute = next_fire_minute(slot, now)
+                self._fire_minute[slot] = next_minute
+                bisect.insort(self._queue, (next_minute, slot))
+        return due
+
+    def due_between(
+        self, start: dt.datetime, end: dt.datetime
+    ) -> List[Tuple[dt.datetime, List[UserKey]]]:
+        """Groups whose next run falls in ``[start, end)``, without popping them."""
+        first, last = _to_minute(start), _to_minute(end)
+        due: List[Tuple[dt.datetime, List[UserKey]]] = []
+        with self._lock:
+            for idx in range(bisect.bisect_left(self._queue, (first,)), len(self._queue)):
+                minute, slot = self._queue[idx]
+                if minute >= last:
+                    break
+                if self._fire_minute.get(slot) == minute:
+                    due.append((_from_minute(minute), sorted(self._groups[slot])))
+        return due
+
+    def next_due(self) -> Optional[dt.datetime]:
+        with self._lock:
+            for minute, slot in self._queue:
+                if self._fire_minute.get(slot) == minute:
+                    return _from_minute(minute)
+        return None
+
+
+schedule_index = ScheduleIndex()
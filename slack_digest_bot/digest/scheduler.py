@@ -2,75 +2,153 @@ from __future__ import annotations
 
 import datetime as dt
 import logging
-from zoneinfo import ZoneInfo
+from typing import Optional
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 from slack_digest_bot.app.settings import get_settings
-from slack_digest_bot.digest.delivery import deliver_digest
-from slack_digest_bot.digest.llm_digest import generate_digest
-from slack_digest_bot.digest.preprocess import preprocess_messages
+from slack_digest_bot.digest.batch import DigestBatchPlanner, build_batch_backend
+from slack_digest_bot.digest.engine import DigestEngine, DigestJob
+from slack_digest_bot.digest.schedule_index import ScheduleIndex, schedule_index
+from slack_digest_bot.llm.gateway import LLMGateway, get_llm_gateway
 from slack_digest_bot.slack.slack_client import SlackClient
-from slack_digest_bot.storage.db import session_scope
+from slack_digest_bot.storage.db import get_db_engine, session_scope
 from slack_digest_bot.storage.repo import Repository
+from slack_digest_bot.storage.retention import MessageRetention, drop_expired_partitions
+from slack_digest_bot.storage.schedule_changes import ScheduleChange, schedule_changes
 
 log = logging.getLogger(__name__)
 settings = get_settings()
 
 
 class DigestScheduler:
-    def __init__(self, slack_client: SlackClient):
+    def __init__(
+        self,
+        slack_client: SlackClient,
+        index: Optional[ScheduleIndex] = None,
+        gateway: Optional[LLMGateway] = None,
+    ):
         self.scheduler = BackgroundScheduler(timezone="UTC")
         self.slack_client = slack_client
+        self.index = index if index is not None else schedule_index
+        self.engine = DigestEngine(
+            slack_client,
+            workers=settings.digest_workers,
+            db_concurrency=settings.digest_db_concurrency,
+            llm_concurrency=settings.digest_llm_concurrency,
+            slack_posts_per_second=settings.digest_slack_posts_per_second,
+            rollup_bucket_minutes=settings.rollup_bucket_minutes,
+            use_prepared=settings.digest_batch_enabled,
+            delivery_workers=settings.digest_delivery_workers,
+            delivery_queue_size=settings.digest_delivery_queue_size,
+        )
+        self.batch_planner: Optional[DigestBatchPlanner] = None
+        if settings.digest_batch_enabled:
+            self.batch_planner = DigestBatchPlanner(
+                self.engine,
+                self.index,
+                build_batch_backend(gateway or get_llm_gateway()),
+                lead_minutes=settings.digest_batch_lead_minutes,
+            )
+        self.retention = MessageRetention(
+            batch_size=settings.message_retention_batch_size,
+            pause_seconds=settings.message_retention_pause_ms / 1000,
+        )
+        self._synced_until: Optional[dt.datetime] = None
 
     def start(self) -> None:
+        schedule_changes.subscribe(self._apply_schedule_change)
         self.scheduler.start()
-        self._schedule_retention_job()
-
-    def schedule_user(self, team_id: str, user_id: str, timezone: str, time_local: str) -> None:
-        hour, minute = map(int, time_local.split(":"))
-        tz = ZoneInfo(timezone) if timezone else dt.timezone.utc
-        trigger = CronTrigger(hour=hour, minute=minute, timezone=tz)
-        job_id = f"digest-{team_id}-{user_id}"
         self.scheduler.add_job(
-            self._run_digest_job,
-            id=job_id,
-            trigger=trigger,
+            self._tick, trigger=CronTrigger(second=0), id="digest-ticker", replace_existing=True
+        )
+        self.scheduler.add_job(
+            self._sync_changed_users,
+            trigger=IntervalTrigger(seconds=settings.schedule_sync_interval_seconds),
+            id="digest-schedule-sync",
             replace_existing=True,
-            args=[team_id, user_id],
         )
-        log.info("Scheduled digest for %s at %s %s", user_id, time_local, timezone or "UTC")
-
-    def _run_digest_job(self, team_id: str, user_id: str) -> None:
-        with session_scope() as session:
-            repo = Repository(session)
-            user = repo.get_user_with_prefs(team_id, user_id)
-            if not user:
-                return
-
-            now = dt.datetime.now(dt.timezone.utc)
-            since = user.last_digest_sent_at or now - dt.timedelta(days=1)
-            messages = repo.fetch_messages_for_user(team_id, user_id, since=since, until=now)
-
-            preprocessed = preprocess_messages(messages, user_id)
-            digest_json = generate_digest(
-                user_id=user_id, preprocessed=preprocessed, messages=messages, timezone=user.timezone
+        self.scheduler.add_job(
+            self._prune_removed_users,
+            trigger=IntervalTrigger(minutes=settings.schedule_prune_interval_minutes),
+            id="digest-schedule-prune",
+            replace_existing=True,
+        )
+        self.scheduler.add_job(
+            self.engine.rollups.refresh,
+            trigger=IntervalTrigger(minutes=settings.rollup_refresh_minutes),
+            id="digest-rollup-refresh",
+            replace_existing=True,
+        )
+        if self.batch_planner is not None:
+            self.scheduler.add_job(
+                self.batch_planner.prepare,
+                trigger=IntervalTrigger(minutes=settings.digest_batch_prepare_interval_minutes),
+                id="digest-batch-prepare",
+                replace_existing=True,
+            )
+            self.scheduler.add_job(
+                self.batch_planner.poll,
+                trigger=IntervalTrigger(seconds=settings.digest_batch_poll_interval_seconds),
+                id="digest-batch-poll",
+                replace_existing=True,
             )
-            deliver_digest(self.slack_client, user_id, digest_json)
-            user.last_digest_sent_at = now
+        self._schedule_retention_job()
+
+    def schedule_user(self, team_id: str, user_id: str, timezone: str, time_local: str) -> None:
+        self.index.upsert(team_id, user_id, timezone, time_local)
+        log.debug("Scheduled digest for %s at %s %s", user_id, time_local, timezone or "UTC")
+
+    def _apply_schedule_change(self, change: ScheduleChange) -> None:
+        team_id, user_id, timezone, time_local = change
+        if time_local is None:
+            self.index.remove(team_id, user_id)
+            log.debug("Unscheduled digest for %s", user_id)
+            return
+        self.schedule_user(team_id, user_id, timezone or "UTC", time_local)
+
+    def _tick(self) -> None:
+        now = dt.datetime.now(dt.timezone.utc)
+        for scheduled_for, users in self.index.pop_due(now):
+            if not users:
+                continue
+            jobs = [DigestJob(team_id, user_id, scheduled_for) for team_id, user_id in users]
+            # Run the slot on the APScheduler pool so the ticker never blocks on it.
+            self.scheduler.add_job(self.engine.run_slot, args=[jobs])
+            log.info("Dispatched %s digests scheduled for %s", len(jobs), scheduled_for)
 
     def bootstrap_from_db(self) -> None:
-        from sqlalchemy import select
-        from slack_digest_bot.storage.models import User
+        self._synced_until = None
+        count = self._sync_changed_users()
+        log.info("Loaded %s digest schedules into %s index entries", count, len(self.index))
+
+    def _sync_changed_users(self) -> int:
+        """Fold users created/updated since the last sync into the index.
 
+        Picks up digest time and timezone changes written by other processes;
+        in-process changes reach the index after commit via ``schedule_changes``.
+        """
         with session_scope() as session:
-            repo = Repository(session)
-            results = session.execute(select(User)).scalars().all()
-            for user in results:
-                prefs = repo._ensure_prefs(user)
-                tz = user.timezone or "UTC"
-                self.schedule_user(user.team_id, user.user_id, tz, user.digest_time_local)
+            rows = Repository(session).user_schedules(updated_since=self._synced_until)
+        for team_id, user_id, timezone, time_local, updated_at in rows:
+            self.index.upsert(team_id, user_id, timezone or "UTC", time_local)
+            if updated_at and (self._synced_until is None or updated_at > self._synced_until):
+                self._synced_until = updated_at
+        return len(rows)
+
+    def _prune_removed_users(self) -> int:
+        """Drop index entries for users deleted by other processes."""
+        indexed = self.index.user_keys()
+        with session_scope() as session:
+            existing = Repository(session).user_keys()
+        removed = indexed - existing
+        for team_id, user_id in removed:
+            self.index.remove(team_id, user_id)
+        if removed:
+            log.info("Removed %s deleted users from the digest schedule", len(removed))
+        return len(removed)
 
     def _schedule_retention_job(self) -> None:
         cutoff_days = settings.message_retention_days
@@ -82,8 +160,12 @@ class DigestScheduler:
         log.info("Retention job scheduled; pruning messages older than %s days", cutoff_days)
 
     def _run_retention(self) -> None:
-        cutoff = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=settings.message_retention_days)
-        with session_scope() as session:
-            repo = Repository(session)
-            deleted = repo.cleanup_old_messages(before=cutoff)
-            log.info("Retention cleanup removed %s messages", deleted)
+        now = dt.datetime.now(dt.timezone.utc)
+        cutoff = now - dt.timedelta(days=settings.message_retention_days)
+        if settings.message_retention_drop_partitions:
+            engine = get_db_engine().execution_options(isolation_level="AUTOCOMMIT")
+            with engine.connect() as conn:
+                dropped = drop_expired_partitions(conn, cutoff)
+            log.info("Retention dropped %s expired message partitions", len(dropped))
+        deleted = self.retention.run(before=cutoff)
+        log.info("Retention cleanup removed %s messages", deleted)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Sequence, Set, Tuple
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.app.settings import get_settings
+from slack_digest_bot.storage.models import DigestMessage
+
+log = logging.getLogger(__name__)
+settings = get_settings()
+
+CacheKey = Tuple[str, str, str]  # (team_id, channel_id, content hash)
+
+
+def content_hash(messages: Sequence[DigestMessage]) -> str:
+    """Hash of the messages a channel summary was built from.
+
+    Covers each message's ts plus a digest of its text, so an edit (new text) or a
+    delete (message gone) yields a different key even before ``invalidate`` runs.
+    """
+    digest = hashlib.sha256()
+    for msg in sorted(messages, key=lambda m: m.slack_ts):
+        text_digest = hashlib.sha1((msg.text or "").encode("utf-8")).hexdigest()
+        digest.update(f"{msg.slack_ts}|{msg.thread_ts or ''}|{text_digest}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass
+class _Entry:
+    value: Dict[str, Any]
+    expires_at: float
+
+
+@dataclass
+class _InFlight:
+    done: threading.Event = field(default_factory=threading.Event)
+    value: Optional[Dict[str, Any]] = None
+
+
+class ChannelSummaryCache:
+    """Per-(team, channel, message set) summaries shared by every user's digest.
+
+    Users tracking the same channel over the same window get the same key, so the
+    channel is summarised once. Concurrent misses for one key wait for the first
+    caller instead of issuing duplicate LLM calls. Entries are LRU-bounded, expire
+    after ``ttl_seconds`` and are dropped per channel on edits and deletes.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 86400.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[CacheKey, _Entry] = OrderedDict()
+        self._by_channel: Dict[Tuple[str, str], Set[CacheKey]] = {}
+        self._in_flight: Dict[CacheKey, _InFlight] = {}
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "invalidations": 0}
+        self._counters = {
+            name: metrics.counter(f"digest.summary_cache.{name}") for name in self._counts
+        }
+        self._size = metrics.gauge("digest.summary_cache.size")
+
+    def get_or_compute(
+        self,
+        team_id: str,
+        channel_id: str,
+        messages: Sequence[DigestMessage],
+        compute: Callable[[], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        key = (team_id, channel_id, content_hash(messages))
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._count("hits")
+                    return entry.value
+                pending = self._in_flight.get(key)
+                if pending is None:
+                    pending = self._in_flight[key] = _InFlight()
+                    self._count("misses")
+                    break
+            pending.done.wait()
+            if pending.value is not None:
+                with self._lock:
+                    self._count("hits")
+                return pending.value
+            # The computing caller failed; try again (possibly computing ourselves).
+
+        try:
+            value = compute()
+            pending.value = value
+            with self._lock:
+                self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            pending.done.set()
+
+    def _store(self, key: CacheKey, value: Dict[str, Any]) -> None:
+        self._entries[key] = _Entry(value=value, expires_at=time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        self._by_channel.setdefault(key[:2], set()).add(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._forget(evicted)
+        self._size.set(len(self._entries))
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        if amount:
+            self._counts[name] += amount
+            self._counters[name].inc(amount)
+
+    def _forget(self, key: CacheKey) -> None:
+        keys = self._by_channel.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_channel[key[:2]]
+
+    def invalidate(self, team_id: str, channel_id: str) -> int:
+        """Drop every cached summary of a channel (called on message edits/deletes)."""
+        with self._lock:
+            keys = self._by_channel.pop((team_id, channel_id), set())
+            for key in keys:
+                self._entries.pop(key, None)
+            self._count("invalidations", len(keys))
+            self._size.set(len(self._entries))
+        return len(keys)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counts for this cache; the same counts also go to ``metrics``."""
+        with self._lock:
+            counts = dict(self._counts)
+            size = len(self._entries)
+        total = counts["hits"] + counts["misses"]
+        return {
+            **counts,
+            "hit_rate": counts["hits"] / total if total else 0.0,
+            "size": size,
+        }
+
+
+channel_summaries = ChannelSummaryCache(
+    max_entries=settings.summary_cache_max_entries,
+    ttl_seconds=settings.summary_cache_ttl_seconds,
+)
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Optional
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.app.ratelimit import TokenBucket
+from slack_digest_bot.app.settings import get_settings
+from slack_digest_bot.llm.response_cache import LLMResponseCache, build_response_cache
+from slack_digest_bot.llm.tokens import estimate_prompt_tokens
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+log = logging.getLogger(__name__)
+settings = get_settings()
+
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 20.0
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def is_retryable(exc: Exception) -> bool:
+    from openai import APIConnectionError, APIStatusError
+
+    if isinstance(exc, APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return isinstance(exc, APIConnectionError)  # includes timeouts
+
+
+class LLMGateway:
+    """Single entry point for OpenAI chat calls from the router and the digest pipeline.
+
+    All calls share one ``AsyncOpenAI`` client (one pooled, keep-alive HTTP
+    transport) running on a background event loop, so a waiting call costs a
+    coroutine rather than a socket per thread. Calls are capped by a concurrency
+    semaphore, paced by request- and token-per-minute buckets, and retried with
+    jittered exponential backoff on 429/5xx and connection errors. Threads use
+    ``chat``; ``submit`` returns a future for callers that fan out. With a
+    ``response_cache``, identical requests are answered without an API call.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        max_concurrency: int = 16,
+        requests_per_minute: float = 500,
+        tokens_per_minute: float = 200_000,
+        max_retries: int = 4,
+        timeout: float = 60.0,
+        response_cache: Optional[LLMResponseCache] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.response_cache = response_cache
+        self._requests = TokenBucket(rate=requests_per_minute / 60, capacity=requests_per_minute)
+        self._tokens = TokenBucket(rate=tokens_per_minute / 60, capacity=tokens_per_minute)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[AsyncOpenAI] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def submit(
+        self, purpose: str, *, cache: bool = True, **request: Any
+    ) -> concurrent.futures.Future:
+        """Schedule a ``chat.completions.create`` call; ``purpose`` labels its metrics.
+
+        ``cache=False`` bypasses the response cache for this call.
+        """
+        use_cache = cache and self.response_cache is not None
+        if use_cache:
+            cached = self.response_cache.get(purpose, request)
+            if cached is not None:
+                future: concurrent.futures.Future = concurrent.futures.Future()
+                future.set_result(cached)
+                return future
+        return asyncio.run_coroutine_threadsafe(
+            self._chat(purpose, request, use_cache=use_cache), self._ensure_loop()
+        )
+
+    def chat(self, purpose: str, *, cache: bool = True, **request: Any) -> Any:
+        """Blocking ``chat.completions.create`` through the gateway."""
+        return self.submit(purpose, cache=cache, **request).result()
+
+    async def _chat(self, purpose: str, request: dict, *, use_cache: bool = False) -> Any:
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            # Created on the gateway loop; retries are handled here, not by the SDK.
+            self._client = AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url, max_retries=0, timeout=self.timeout
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        await self._throttle(purpose, estimate_prompt_tokens(request.get("messages") or []))
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                async with self._semaphore:
+                    response = await self._client.chat.completions.create(**request)
+            except Exception as exc:
+                if not is_retryable(exc) or attempt >= self.max_retries:
+                    metrics.counter(f"llm.{purpose}.errors").inc()
+                    raise
+                delay = random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2**attempt))
+                delay = max(delay, _retry_after(exc) or 0.0)
+                attempt += 1
+                metrics.counter(f"llm.{purpose}.retries").inc()
+                log.warning(
+                    "LLM %s call failed (%s); retry %s in %.2fs", purpose, exc, attempt, delay
+                )
+                await asyncio.sleep(delay)
+                continue
+            self._record(purpose, response, (time.perf_counter() - started) * 1000)
+            if use_cache:
+                # The SQL backend blocks; keep it off the event loop.
+                await asyncio.to_thread(self.response_cache.put, purpose, request, response)
+            return response
+
+    async def _throttle(self, purpose: str, prompt_tokens: int) -> None:
+        waited = 0.0
+        for bucket, amount in ((self._requests, 1), (self._tokens, prompt_tokens)):
+            while True:
+                delay = bucket.try_acquire(amount)
+                if delay <= 0:
+                    break
+                waited += delay
+                await asyncio.sleep(delay)
+        if waited:
+            metrics.histogram(f"llm.{purpose}.throttled_ms").observe(waited * 1000)
+
+    def _record(self, purpose: str, response: Any, latency_ms: float) -> None:
+        metrics.counter(f"llm.{purpose}.requests").inc()
+        metrics.histogram(f"llm.{purpose}.latency_ms").observe(latency_ms)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            metrics.histogram(f"llm.{purpose}.prompt_tokens").observe(usage.prompt_tokens or 0)
+            metrics.histogram(f"llm.{purpose}.completion_tokens").observe(
+                usage.completion_tokens or 0
+            )
+
+    def close(self) -> None:
+        loop = self._loop
+        if loop is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.close(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        self._loop = None
+        self._client = None
+
+
+@lru_cache
+def get_llm_gateway() -> LLMGateway:
+    """The process-wide gateway, built on first use."""
+    return LLMGateway(
+        api_key=settings.openai_api_key.get_secret_value(),
+        base_url=settings.openai_base_url,
+        max_concurrency=settings.openai_max_concurrency,
+        requests_per_minute=settings.openai_requests_per_minute,
+        tokens_per_minute=settings.openai_tokens_per_minute,
+        max_retries=settings.openai_max_retries,
+        timeout=settings.openai_timeout_seconds,
+        response_cache=build_response_cache(),
+    )
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Tuple
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.app.settings import get_settings
+from slack_digest_bot.storage.db import session_scope
+from slack_digest_bot.storage.repo import Repository
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletion
+
+log = logging.getLogger(__name__)
+settings = get_settings()
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Truncated or filtered answers are not worth replaying.
+CACHEABLE_FINISH_REASONS = {"stop", "tool_calls"}
+
+
+def _normalise(value: Any) -> Any:
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip()
+    if isinstance(value, Mapping):
+        return {k: _normalise(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalise(v) for v in value]
+    return value
+
+
+def request_key(request: Mapping[str, Any]) -> str:
+    """Content address of a chat request: model, messages, tools and sampling options.
+
+    Strings are whitespace-normalised and ``None`` options dropped, so a retried
+    job or a DM repeated with different spacing maps to the same key.
+    """
+    canonical = json.dumps(
+        _normalise(request), sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCacheBackend(ABC):
+    """Stores serialised chat completions by request key."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The stored completion, or None when missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, purpose: str, value: Dict[str, Any], ttl_seconds: float) -> None:
+        """Store ``value`` for ``ttl_seconds``; ``purpose`` is the gateway call site."""
+
+    @abstractmethod
+    def size(self) -> int:
+        """Number of entries currently held."""
+
+
+class MemoryResponseCache(ResponseCacheBackend):
+    """In-process LRU; entries also expire after their TTL."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Tuple[float, Dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, purpose: str, value: Dict[str, Any], ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class SQLResponseCache(ResponseCacheBackend):
+    """``llm_responses`` table, shared by every process on the same database.
+
+    Expired rows are ignored on read and pruned, together with the oldest rows
+    above ``max_entries``, every ``prune_every`` writes.
+    """
+
+    def __init__(self, max_entries: int = 50_000, prune_every: int = 100):
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with session_scope() as session:
+            return Repository(session).cached_llm_response(key, dt.datetime.now(dt.timezone.utc))
+
+    def set(self, key: str, purpose: str, value: Dict[str, Any], ttl_seconds: float) -> None:
+        now = dt.datetime.now(dt.timezone.utc)
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        with session_scope() as session:
+            repo = Repository(session)
+            repo.store_llm_response(
+                key, purpose, value, expires_at=now + dt.timedelta(seconds=ttl_seconds)
+            )
+            if prune:
+                repo.prune_llm_responses(now, self.max_entries)
+
+    def size(self) -> int:
+        with session_scope() as session:
+            return Repository(session).llm_response_count()
+
+
+class LLMResponseCache:
+    """Content-addressed cache of chat completions in front of the LLM gateway.
+
+    Identical requests (retried jobs, users with the same subscriptions and no new
+    messages, repeated DM phrasings) are answered from ``backend`` instead of the
+    API. Hits and misses are counted per purpose under ``llm.cache.<purpose>``.
+    Backend errors are logged and treated as misses.
+    """
+
+    def __init__(self, backend: ResponseCacheBackend, ttl_seconds: float = 3600.0):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0}
+
+    def get(self, purpose: str, request: Mapping[str, Any]) -> Optional[ChatCompletion]:
+        try:
+            value = self.backend.get(request_key(request))
+        except Exception:
+            log.exception("LLM response cache lookup failed")
+            value = None
+        self._count(purpose, "misses" if value is None else "hits")
+        if value is None:
+            return None
+        from openai.types.chat import ChatCompletion
+
+        return ChatCompletion.model_validate(value)
+
+    def put(self, purpose: str, request: Mapping[str, Any], response: Any) -> None:
+        choices = getattr(response, "choices", None) or []
+        if not choices or any(c.finish_reason not in CACHEABLE_FINISH_REASONS for c in choices):
+            return
+        try:
+            self.backend.set(
+                request_key(request), purpose, response.model_dump(mode="json"), self.ttl_seconds
+            )
+        except Exception:
+            log.exception("LLM response cache store failed")
+
+    def _count(self, purpose: str, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+        metrics.counter(f"llm.cache.{purpose}.{name}").inc()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self._counts)
+        total = counts["hits"] + counts["misses"]
+        return {**counts, "hit_rate": counts["hits"] / total if total else 0.0}
+
+
+def build_response_cache() -> Optional[LLMResponseCache]:
+    """Cache configured by ``LLM_CACHE_*`` settings, or None when disabled."""
+    if not settings.llm_cache_enabled:
+        return None
+    if settings.llm_cache_backend == "sql":
+        backend: ResponseCacheBackend = SQLResponseCache(max_entries=settings.llm_cache_max_entries)
+    else:
+        backend = MemoryResponseCache(max_entries=settings.llm_cache_max_entries)
+    return LLMResponseCache(backend, ttl_seconds=settings.llm_cache_ttl_seconds)
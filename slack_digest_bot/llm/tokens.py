@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from typing import Any, Iterable, Mapping
+
+
+def estimate_tokens(text: str) -> int:
+    """Local token estimate (~4 characters per token for chat text); no tokenizer needed."""
+    return (len(text) + 3) // 4
+
+
+def estimate_prompt_tokens(messages: Iterable[Mapping[str, Any]]) -> int:
+    """Estimate for a chat request: message contents plus a few tokens of framing each."""
+    return sum(estimate_tokens(str(m.get("content") or "")) + 4 for m in messages)
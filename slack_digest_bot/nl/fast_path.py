@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# (tool name, arguments) in the shape of the tools in ``tool_schemas``.
+ToolCall = Tuple[str, Dict[str, Any]]
+
+_LIST = re.compile(
+    r"(list|ls|status|config|configuration|settings|"
+    r"show( me)?( my)?( current)? (config|configuration|settings|channels|subscriptions)|"
+    r"what (channels )?am i (tracking|following|subscribed to))",
+    re.I,
+)
+_ADD = re.compile(r"(add|track|follow|watch|subscribe( me)?( to)?)( channels?)? (?P<rest>.+)", re.I)
+_REMOVE = re.compile(
+    r"(remove|untrack|unfollow|unwatch|unsubscribe( me)?( from)?|stop (tracking|following)|drop)"
+    r"( channels?)? (?P<rest>.+)",
+    re.I,
+)
+_TIME = re.compile(
+    r"(set )?(my )?(daily )?(digest )?time( to)? (?P<hour>\d{1,2})(:(?P<minute>\d{2}))?"
+    r" ?(?P<ampm>am|pm)?",
+    re.I,
+)
+_MAX = re.compile(r"(set )?max( channels)?( to)? (?P<count>\d+)", re.I)
+_TOGGLE = re.compile(
+    r"(?P<verb>enable|disable|turn on|turn off|include|exclude) (the )?"
+    r"(?P<section>overview|mentions|broadcasts|unanswered( questions)?|(suggested )?actions)"
+    r"( section)?",
+    re.I,
+)
+
+_SECTIONS = {
+    "overview": "include_overview",
+    "mentions": "include_mentions_me",
+    "broadcasts": "include_broadcasts",
+    "unanswered": "include_unanswered_questions",
+    "unanswered questions": "include_unanswered_questions",
+    "actions": "include_suggested_actions",
+    "suggested actions": "include_suggested_actions",
+}
+
+# Slack renders a typed #channel as <#C123|name>; bare IDs and #names are accepted too.
+_CHANNEL_MENTION = re.compile(r"<#(C[A-Z0-9]{7,})(\|[^>]*)?>")
+_CHANNEL_ID = re.compile(r"C[A-Z0-9]{7,}")
+_CHANNEL_NAME = re.compile(r"#[a-z0-9][a-z0-9_-]{0,79}")
+_SEPARATORS = re.compile(r"\s*(?:,|\band\b|\s)\s*")
+
+
+def _normalise(text: str) -> str:
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(".!?").strip()
+
+
+def _channels(rest: str, *, allow_names: bool) -> Optional[List[str]]:
+    """Every token of ``rest`` as a channel ID or #name, or None if any token is not one."""
+    channels: List[str] = []
+    for token in _SEPARATORS.split(rest):
+        if not token:
+            continue
+        mention = _CHANNEL_MENTION.fullmatch(token)
+        if mention:
+            channels.append(mention.group(1))
+        elif _CHANNEL_ID.fullmatch(token):
+            channels.append(token)
+        elif allow_names and _CHANNEL_NAME.fullmatch(token.lower()):
+            channels.append(token.lower())
+        else:
+            return None
+    return channels or None
+
+
+def _time(match: re.Match) -> Optional[str]:
+    hour, minute = int(match["hour"]), int(match["minute"] or 0)
+    if match["ampm"]:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if match["ampm"].lower() == "pm" else 0)
+    elif match["minute"] is None:
+        return None  # "set time 8" is ambiguous
+    if hour > 23 or minute > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+
+def parse_command(text: str) -> Optional[List[ToolCall]]:
+    """Tool calls for a DM that is unambiguously one of the common commands.
+
+    Handles listing, adding/removing channels, digest time, max channels and
+    section toggles. Returns None for anything else (or anything only partly
+    understood) so the caller falls back to the LLM.
+    """
+    text = _normalise(text)
+    if not text:
+        return None
+
+    if _LIST.fullmatch(text):
+        return [("list_configuration", {})]
+
+    match = _ADD.fullmatch(text)
+    if match:
+        channels = _channels(match["rest"], allow_names=True)
+        return [("add_channels", {"channels": channels})] if channels else None
+
+    match = _REMOVE.fullmatch(text)
+    if match:
+        # remove_channels takes channel IDs as-is, so #names go through the LLM.
+        channels = _channels(match["rest"], allow_names=False)
+        return [("remove_channels", {"channels": channels})] if channels else None
+
+    match = _TIME.fullmatch(text)
+    if match:
+        time_local = _time(match)
+        return [("set_digest_time", {"time_local": time_local})] if time_local else None
+
+    match = _MAX.fullmatch(text)
+    if match:
+        count = int(match["count"])
+        return [("set_max_channels", {"max_channels": count})] if 1 <= count <= 50 else None
+
+    match = _TOGGLE.fullmatch(text)
+    if match:
+        enabled = match["verb"].lower() in ("enable", "turn on", "include")
+        return [("set_preferences", {_SECTIONS[match["section"].lower()]: enabled})]
+
+    return None
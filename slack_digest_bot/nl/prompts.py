@@ -9,3 +9,9 @@ You are generating a structured daily digest for a Slack user.
 Use only the provided messages and enrichment items. Do not invent facts.
 Return short, skimmable summaries.
 """
+
+CHANNEL_SUMMARY_SYSTEM_PROMPT = """
+You are summarising one Slack channel for a digest shared by many readers.
+Use only the provided messages. Do not invent facts or address any specific reader.
+Return JSON with "summary" (2-4 sentences) and "highlights" (short bullet strings).
+"""
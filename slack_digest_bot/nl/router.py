@@ -2,11 +2,13 @@ from __future__ import annotations
 
 import json
 import logging
-from typing import Dict, List, Tuple
-
-from openai import OpenAI
+import time
+from typing import List, Optional, Tuple
 
+from slack_digest_bot.app.metrics import metrics
 from slack_digest_bot.app.settings import get_settings
+from slack_digest_bot.llm.gateway import get_llm_gateway
+from slack_digest_bot.nl.fast_path import ToolCall, parse_command
 from slack_digest_bot.nl.prompts import DM_SYSTEM_PROMPT
 from slack_digest_bot.nl.tool_schemas import tool_definitions
 from slack_digest_bot.slack.slack_client import SlackClient
@@ -16,15 +18,14 @@ from slack_digest_bot.storage.repo import Repository
 log = logging.getLogger(__name__)
 
 settings = get_settings()
-openai_client = OpenAI(api_key=settings.openai_api_key.get_secret_value())
 
 
 def resolve_channels(
-    slack_client: SlackClient, channels: List[str]
+    slack_client: SlackClient, team_id: str, channels: List[str]
 ) -> Tuple[List[str], List[str]]:
     resolved, failed = [], []
     for ch in channels:
-        cid = slack_client.resolve_channel_id(ch)
+        cid = slack_client.resolve_channel_id(team_id, ch)
         if cid:
             resolved.append(cid)
         else:
@@ -48,29 +49,60 @@ def format_configuration(repo: Repository, team_id: str, user_id: str) -> str:
     return "\n".join(lines)
 
 
+def _llm_tool_calls(text: str) -> List[ToolCall]:
+    completion = get_llm_gateway().chat(
+        "nl",
+        model=settings.openai_model_nl,
+        messages=[
+            {"role": "system", "content": DM_SYSTEM_PROMPT},
+            {"role": "user", "content": text},
+        ],
+        tools=tool_definitions(),
+    )
+    message = completion.choices[0].message
+    return [
+        (call.function.name, json.loads(call.function.arguments or "{}"))
+        for call in message.tool_calls or []
+    ]
+
+
 def handle_dm_message(team_id: str, user_id: str, text: str, slack_client: SlackClient) -> str:
+    """Apply a DM's configuration commands and reply with the resulting configuration.
+
+    Common commands are parsed locally by ``fast_path``; anything else goes through
+    an LLM tool-calling round trip. Each path counts its DMs and latency under
+    ``nl.dm.<path>``.
+    """
+    started = time.perf_counter()
+    tool_calls = parse_command(text)
+    path = "fast" if tool_calls is not None else "llm"
+    try:
+        return _handle_dm_message(team_id, user_id, text, slack_client, tool_calls)
+    finally:
+        metrics.counter(f"nl.dm.{path}").inc()
+        metrics.histogram(f"nl.dm.{path}.latency_ms").observe(
+            (time.perf_counter() - started) * 1000
+        )
+
+
+def _handle_dm_message(
+    team_id: str,
+    user_id: str,
+    text: str,
+    slack_client: SlackClient,
+    tool_calls: Optional[List[ToolCall]],
+) -> str:
     with session_scope() as session:
         repo = Repository(session)
         repo.get_or_create_user(team_id, user_id)
 
-        completion = openai_client.chat.completions.create(
-            model=settings.openai_model_nl,
-            messages=[
-                {"role": "system", "content": DM_SYSTEM_PROMPT},
-                {"role": "user", "content": text},
-            ],
-            tools=tool_definitions(),
-        )
-
-        message = completion.choices[0].message
-        tool_calls = message.tool_calls or []
+        if tool_calls is None:
+            tool_calls = _llm_tool_calls(text)
         logs: List[str] = []
 
-        for call in tool_calls:
-            name = call.function.name
-            args = json.loads(call.function.arguments or "{}")
+        for name, args in tool_calls:
             if name == "add_channels":
-                resolved, failed = resolve_channels(slack_client, args.get("channels", []))
+                resolved, failed = resolve_channels(slack_client, team_id, args.get("channels", []))
                 added, skipped = repo.add_channels(user=repo.get_or_create_user(team_id, user_id), channels=resolved)
                 if added:
                     logs.append(f"Added: {', '.join(added)}")
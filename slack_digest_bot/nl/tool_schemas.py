@@ -74,7 +74,13 @@ def tool_definitions() -> list[dict]:
                         "include_broadcasts": {"type": "boolean"},
                         "include_unanswered_questions": {"type": "boolean"},
                         "include_suggested_actions": {"type": "boolean"},
-                        "custom_rules_json": {"type": "object"},
+                        "custom_rules_json": {
+                            "type": "object",
+                            "description": (
+                                "Custom highlight rules as regex patterns by name, "
+                                'e.g. {"patterns": {"incidents": "sev[12]|outage"}}'
+                            ),
+                        },
                     },
                 },
             },
@@ -1,19 +1,33 @@
 from __future__ import annotations
 
 import logging
+from typing import Optional
 
 from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 
 from slack_digest_bot.app.settings import Settings
+from slack_digest_bot.slack.event_queue import EventWorkerPool
 from slack_digest_bot.slack.handlers_dm import register_dm_handlers
-from slack_digest_bot.slack.handlers_events import register_message_handlers
+from slack_digest_bot.slack.handlers_events import (
+    register_channel_handlers,
+    register_message_handlers,
+)
 from slack_digest_bot.slack.slack_client import SlackClient
+from slack_digest_bot.storage.ingest import MessageIngestBuffer
 
 log = logging.getLogger(__name__)
 
 
-def build_bolt_app(settings: Settings) -> tuple[App, SlackClient]:
+def build_bolt_app(
+    settings: Settings,
+    ingest_buffer: Optional[MessageIngestBuffer] = None,
+    event_pool: Optional[EventWorkerPool] = None,
+    dm_pool: Optional[EventWorkerPool] = None,
+) -> tuple[App, SlackClient]:
+    # Listeners only filter and enqueue onto the worker pools, so processing before
+    # the response still acks quickly. Because the response is sent after the listener
+    # returns, a full queue can answer 503 instead of the ack and Slack redelivers.
     app = App(
         token=settings.slack_bot_token.get_secret_value(),
         signing_secret=settings.slack_signing_secret.get_secret_value()
@@ -22,10 +36,15 @@ def build_bolt_app(settings: Settings) -> tuple[App, SlackClient]:
         process_before_response=True,
     )
 
-    slack_client = SlackClient(settings.slack_bot_token.get_secret_value())
+    slack_client = SlackClient(
+        settings.slack_bot_token.get_secret_value(),
+        base_url=settings.slack_api_base_url,
+        max_rate_limit_waits=settings.slack_max_rate_limit_waits,
+    )
 
-    register_message_handlers(app)
-    register_dm_handlers(app, slack_client)
+    register_message_handlers(app, ingest_buffer, event_pool)
+    register_channel_handlers(app, slack_client.channel_directory, event_pool)
+    register_dm_handlers(app, slack_client, dm_pool)
 
     @app.error
     def handle_errors(error, body, logger):
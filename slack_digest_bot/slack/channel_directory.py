@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.storage.db import session_scope
+from slack_digest_bot.storage.repo import Repository
+
+log = logging.getLogger(__name__)
+
+ChannelRow = Tuple[str, str, bool]  # (channel_id, name, is_archived)
+ChannelCrawler = Callable[[str], Iterable[ChannelRow]]
+
+
+def looks_like_channel_id(value: str) -> bool:
+    return value.startswith("C") and len(value) >= 8
+
+
+@dataclass
+class _TeamDirectory:
+    ids_by_name: Dict[str, str] = field(default_factory=dict)
+    names_by_id: Dict[str, str] = field(default_factory=dict)
+    last_crawl: float = 0.0
+
+    def put(self, channel_id: str, name: str, *, is_archived: bool) -> None:
+        self.remove(channel_id)
+        if not is_archived:
+            self.ids_by_name[name] = channel_id
+            self.names_by_id[channel_id] = name
+
+    def remove(self, channel_id: str) -> None:
+        old = self.names_by_id.pop(channel_id, None)
+        if old is not None and self.ids_by_name.get(old) == channel_id:
+            del self.ids_by_name[old]
+
+
+class ChannelDirectory:
+    """Per-team channel name -> ID map for ``#name`` lookups.
+
+    A team is loaded from the ``slack_channels`` table, or crawled once through
+    ``crawl`` (``conversations.list``) and persisted when the table has no rows
+    for it, so restarts do not re-crawl. Channel created/rename/archive events
+    keep both copies current. An unknown name triggers at most one re-crawl per
+    ``miss_recrawl_seconds``, covering events missed while the bot was down.
+    """
+
+    def __init__(self, crawl: ChannelCrawler, miss_recrawl_seconds: float = 300.0):
+        self.crawl = crawl
+        self.miss_recrawl_seconds = miss_recrawl_seconds
+        self._teams: Dict[str, _TeamDirectory] = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._hits = metrics.counter("slack.channel_directory.hits")
+        self._misses = metrics.counter("slack.channel_directory.misses")
+        self._crawls = metrics.counter("slack.channel_directory.crawls")
+
+    def resolve(self, team_id: str, name_or_id: str) -> Optional[str]:
+        """Channel ID for '#name' (or the input if it already looks like an ID)."""
+        if looks_like_channel_id(name_or_id):
+            return name_or_id
+        name = name_or_id.lstrip("#").lower()
+        directory = self._team(team_id)
+        channel_id = directory.ids_by_name.get(name)
+        if channel_id is None and self._may_recrawl(directory):
+            self._recrawl(team_id)
+            channel_id = self._team(team_id).ids_by_name.get(name)
+        (self._hits if channel_id else self._misses).inc()
+        return channel_id
+
+    def _team(self, team_id: str) -> _TeamDirectory:
+        directory = self._teams.get(team_id)
+        if directory is not None:
+            return directory
+        with self._load_lock:
+            directory = self._teams.get(team_id)
+            if directory is not None:
+                return directory
+            with session_scope() as session:
+                rows = Repository(session).channel_directory(team_id)
+            if rows:
+                directory = _TeamDirectory()
+                for channel_id, name, is_archived in rows:
+                    directory.put(channel_id, name, is_archived=is_archived)
+                with self._lock:
+                    self._teams[team_id] = directory
+                log.info("Loaded %s channels for %s from the database", len(rows), team_id)
+                return directory
+            return self._crawl_locked(team_id)
+
+    def _may_recrawl(self, directory: _TeamDirectory) -> bool:
+        return time.monotonic() - directory.last_crawl > self.miss_recrawl_seconds
+
+    def _recrawl(self, team_id: str) -> None:
+        with self._load_lock:
+            if self._may_recrawl(self._teams[team_id]):
+                self._crawl_locked(team_id)
+
+    def _crawl_locked(self, team_id: str) -> _TeamDirectory:
+        rows = list(self.crawl(team_id))
+        self._crawls.inc()
+        with session_scope() as session:
+            Repository(session).replace_channel_directory(team_id, rows)
+        directory = _TeamDirectory(last_crawl=time.monotonic())
+        for channel_id, name, is_archived in rows:
+            directory.put(channel_id, name, is_archived=is_archived)
+        with self._lock:
+            self._teams[team_id] = directory
+        log.info("Crawled %s channels for %s", len(rows), team_id)
+        return directory
+
+    # Channel events --------------------------------------------------------
+    def channel_upserted(
+        self,
+        team_id: str,
+        channel_id: str,
+        name: Optional[str] = None,
+        *,
+        is_archived: Optional[bool] = None,
+    ) -> None:
+        """Apply channel_created/rename/archive/unarchive to the DB and memory."""
+        self._team(team_id)  # a partial stored directory would never be crawled
+        with session_scope() as session:
+            row = Repository(session).upsert_slack_channel(
+                team_id, channel_id, name=name, is_archived=is_archived
+            )
+        with self._lock:
+            directory = self._teams.get(team_id)
+            if directory is not None and row is not None:
+                directory.put(row[0], row[1], is_archived=row[2])
+
+    def channel_deleted(self, team_id: str, channel_id: str) -> None:
+        self._team(team_id)
+        with session_scope() as session:
+            Repository(session).delete_slack_channel(team_id, channel_id)
+        with self._lock:
+            directory = self._teams.get(team_id)
+            if directory is not None:
+                directory.remove(channel_id)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.storage.db import session_scope
+from slack_digest_bot.storage.repo import Repository
+
+log = logging.getLogger(__name__)
+
+UserKey = Tuple[str, str]  # (team_id, user_id)
+
+
+class DMChannelCache:
+    """IM channel ID per user, so deliveries skip ``conversations.open``.
+
+    A bounded in-process LRU sits in front of ``users.dm_channel_id``; the ID is
+    learned from ``open_dm`` or from an incoming DM and only dropped when Slack
+    reports ``channel_not_found``.
+    """
+
+    def __init__(self, open_dm: Callable[[str], str], max_entries: int = 10_000):
+        self.open_dm = open_dm
+        self.max_entries = max_entries
+        self._entries: OrderedDict[UserKey, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = metrics.counter("slack.dm_channel.hits")
+        self._opens = metrics.counter("slack.dm_channel.opens")
+
+    def get(self, team_id: str, user_id: str) -> str:
+        key = (team_id, user_id)
+        with self._lock:
+            channel_id = self._entries.get(key)
+            if channel_id is not None:
+                self._entries.move_to_end(key)
+        if channel_id is None:
+            with session_scope() as session:
+                channel_id = Repository(session).dm_channel_id(team_id, user_id)
+            if channel_id is not None:
+                self._put(key, channel_id)
+        if channel_id is not None:
+            self._hits.inc()
+            return channel_id
+        channel_id = self.open_dm(user_id)
+        self._opens.inc()
+        self.remember(team_id, user_id, channel_id)
+        return channel_id
+
+    def remember(self, team_id: str, user_id: str, channel_id: str) -> None:
+        key = (team_id, user_id)
+        with self._lock:
+            known = self._entries.get(key) == channel_id
+        if known:
+            return
+        self._put(key, channel_id)
+        with session_scope() as session:
+            Repository(session).set_dm_channel_id(team_id, user_id, channel_id)
+
+    def invalidate(self, team_id: str, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop((team_id, user_id), None)
+        with session_scope() as session:
+            Repository(session).set_dm_channel_id(team_id, user_id, None)
+        log.info("Dropped cached DM channel of %s/%s", team_id, user_id)
+
+    def _put(self, key: UserKey, channel_id: str) -> None:
+        with self._lock:
+            self._entries[key] = channel_id
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def is_channel_not_found(exc: Exception) -> bool:
+    response = getattr(exc, "response", None)
+    return response is not None and response.get("error") == "channel_not_found"
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from slack_bolt.request import BoltRequest
+from slack_bolt.response import BoltResponse
+
+from slack_digest_bot.app.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+
+def retry_num_from_request(request: Optional[BoltRequest]) -> int:
+    """Read Slack's ``X-Slack-Retry-Num`` header (0 for first deliveries / Socket Mode)."""
+    if request is None:
+        return 0
+    values = request.headers.get("x-slack-retry-num") or []
+    try:
+        return int(values[0]) if values else 0
+    except ValueError:
+        return 0
+
+
+class EventQueueFullError(Exception):
+    """The pool's queue stayed full for ``put_timeout``; the event was not accepted."""
+
+
+class _RecentEventIds:
+    """Bounded insertion-ordered set of event IDs already accepted."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._ids: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, event_id: str) -> bool:
+        with self._lock:
+            if event_id in self._ids:
+                return False
+            self._ids[event_id] = None
+            if len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+            return True
+
+    def discard(self, event_id: str) -> None:
+        with self._lock:
+            self._ids.pop(event_id, None)
+
+
+@dataclass
+class _Job:
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...]
+    enqueued_at: float
+
+
+class EventWorkerPool:
+    """Bounded queue plus worker threads that process Slack events after the ack.
+
+    Bolt listeners stay cheap: they filter and ``submit``. When the queue is full,
+    ``submit`` blocks for up to ``put_timeout`` seconds (slowing intake) and then raises
+    ``EventQueueFullError`` so the listener can refuse the event and Slack redelivers it.
+    Redeliveries of an already accepted ``event_id`` are skipped.
+    """
+
+    def __init__(
+        self,
+        name: str = "events",
+        workers: int = 4,
+        max_queue: int = 1000,
+        put_timeout: float = 0.5,
+        dedup_window: int = 10000,
+    ):
+        self.name = name
+        self.workers = workers
+        self.put_timeout = put_timeout
+        self._queue: queue.Queue[Optional[_Job]] = queue.Queue(maxsize=max_queue)
+        self._seen = _RecentEventIds(dedup_window)
+        self._threads: List[threading.Thread] = []
+        self._depth = metrics.gauge(f"{name}.queue_depth")
+        self._wait = metrics.histogram(f"{name}.queue_wait_ms")
+        self._duplicates = metrics.counter(f"{name}.duplicates")
+        self._retries = metrics.counter(f"{name}.retries")
+        self._rejected = metrics.counter(f"{name}.rejected")
+        self._errors = metrics.counter(f"{name}.errors")
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        for idx in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"{self.name}-worker-{idx}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        event_id: Optional[str] = None,
+        retry_num: int = 0,
+    ) -> bool:
+        """Queue ``fn(*args)``; False for a duplicate ``event_id``, EventQueueFullError if full."""
+        if retry_num:
+            self._retries.inc()
+        if event_id and not self._seen.add(event_id):
+            self._duplicates.inc()
+            log.debug("Skipping duplicate event %s (retry %s)", event_id, retry_num)
+            return False
+        try:
+            self._queue.put(_Job(fn, args, time.monotonic()), timeout=self.put_timeout)
+        except queue.Full:
+            self._rejected.inc()
+            if event_id:
+                # Let a later Slack retry of this event through.
+                self._seen.discard(event_id)
+            log.warning("%s queue full; refusing event %s for redelivery", self.name, event_id)
+            raise EventQueueFullError(self.name) from None
+        self._depth.set(self._queue.qsize())
+        return True
+
+    def submit_event(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        body: Dict[str, Any],
+        request: Optional[BoltRequest],
+    ) -> Optional[BoltResponse]:
+        """``submit`` for a Bolt listener; returns the response the listener must return.
+
+        On a full queue that is a 503, which overrides the listener's ``ack()``: Slack sees
+        the event as undelivered (HTTP and Socket Mode alike) and retries it later.
+        """
+        try:
+            self.submit(
+                fn,
+                *args,
+                event_id=body.get("event_id"),
+                retry_num=retry_num_from_request(request),
+            )
+        except EventQueueFullError:
+            return BoltResponse(status=503, body="")
+        return None
+
+    def join(self) -> None:
+        """Block until every queued job has been processed."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Drain queued jobs and stop the workers (shutdown hook)."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._wait.observe((time.monotonic() - job.enqueued_at) * 1000)
+                self._depth.set(self._queue.qsize())
+                job.fn(*job.args)
+            except Exception:
+                self._errors.inc()
+                log.exception("%s worker failed to process event", self.name)
+            finally:
+                self._queue.task_done()
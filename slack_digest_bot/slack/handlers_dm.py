@@ -1,23 +1,44 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from slack_bolt import App
+from slack_bolt.request import BoltRequest
 
 from slack_digest_bot.nl.router import handle_dm_message
+from slack_digest_bot.slack.event_queue import EventWorkerPool
 from slack_digest_bot.slack.slack_client import SlackClient
 
 log = logging.getLogger(__name__)
 
 
-def register_dm_handlers(app: App, slack_client: SlackClient) -> None:
-    @app.event("message")
-    def handle_dm(body: Dict[str, Any], event, ack, logger):
-        # Filter for direct messages only
-        channel_type = event.get("channel_type")
-        if channel_type != "im":
-            return
+def _reply_to_dm(
+    slack_client: SlackClient, team_id: str, user_id: str, text: str, channel: Optional[str]
+) -> None:
+    try:
+        response_text = handle_dm_message(team_id, user_id, text, slack_client)
+        if channel:
+            slack_client.dm_channels.remember(team_id, user_id, channel)
+        dm_channel = channel or slack_client.dm_channel_id(team_id, user_id)
+        slack_client.post_message(dm_channel, response_text)
+    except Exception:
+        log.exception("Failed to process DM")
+        slack_client.post_message(
+            channel or slack_client.dm_channel_id(team_id, user_id),
+            "Sorry, I hit a snag while updating your settings.",
+        )
+
+
+def _is_dm(event: Dict[str, Any]) -> bool:
+    return event.get("channel_type") == "im"
+
+
+def register_dm_handlers(
+    app: App, slack_client: SlackClient, worker_pool: Optional[EventWorkerPool] = None
+) -> None:
+    @app.event("message", matchers=[_is_dm])
+    def handle_dm(body: Dict[str, Any], event, ack, logger, request: Optional[BoltRequest] = None):
         ack()
 
         team_id = body.get("team") or event.get("team")
@@ -26,13 +47,10 @@ def register_dm_handlers(app: App, slack_client: SlackClient) -> None:
         if not (team_id and user_id and text):
             return
 
-        try:
-            response_text = handle_dm_message(team_id, user_id, text, slack_client)
-            dm_channel = event.get("channel") or slack_client.open_dm(user_id)
-            slack_client.post_message(dm_channel, response_text)
-        except Exception:
-            logger.exception("Failed to process DM")
-            slack_client.post_message(
-                event.get("channel") or slack_client.open_dm(user_id),
-                "Sorry, I hit a snag while updating your settings.",
-            )
+        channel = event.get("channel")
+        if worker_pool is None:
+            _reply_to_dm(slack_client, team_id, user_id, text, channel)
+            return
+        return worker_pool.submit_event(
+            _reply_to_dm, slack_client, team_id, user_id, text, channel, body=body, request=request
+        )
@@ -1,15 +1,24 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Union
 
 from slack_bolt import App
+from slack_bolt.request import BoltRequest
 
+from slack_digest_bot.digest.classifier import ingestion_features
+from slack_digest_bot.digest.summary_cache import channel_summaries
+from slack_digest_bot.slack.channel_directory import ChannelDirectory
+from slack_digest_bot.slack.event_queue import EventWorkerPool
+from slack_digest_bot.storage.channel_index import tracked_channels
 from slack_digest_bot.storage.db import session_scope
+from slack_digest_bot.storage.ingest import MessageIngestBuffer
 from slack_digest_bot.storage.repo import Repository
 
 log = logging.getLogger(__name__)
 
+MessageSink = Union[Repository, MessageIngestBuffer]
+
 
 def _extract_team_id(body: Dict[str, Any]) -> str:
     team_id = body.get("team_id") or body.get("team")
@@ -18,12 +27,78 @@ def _extract_team_id(body: Dict[str, Any]) -> str:
     return team_id
 
 
-def register_message_handlers(app: App) -> None:
-    @app.event("message")
-    def handle_message_events(body: Dict[str, Any], ack, logger, event):
-        if event.get("channel_type") == "im":
-            # DM messages are handled by the DM router; avoid double-ack
-            return
+def _store_event(sink: MessageSink, team_id: str, channel_id: str, event: Dict[str, Any]) -> None:
+    subtype = event.get("subtype")
+    if subtype == "message_deleted":
+        deleted_ts = event.get("deleted_ts") or event.get("previous_message", {}).get("ts")
+        if deleted_ts:
+            sink.mark_message_deleted(team_id, channel_id, deleted_ts)
+            channel_summaries.invalidate(team_id, channel_id)
+        return
+
+    if subtype == "message_changed":
+        message = event.get("message", {})
+        text = message.get("text", "")
+        features, mentioned_user_ids = ingestion_features(text)
+        sink.upsert_message(
+            team_id=team_id,
+            channel_id=channel_id,
+            slack_ts=message.get("ts"),
+            user_id=message.get("user"),
+            text=text,
+            thread_ts=message.get("thread_ts"),
+            subtype=message.get("subtype"),
+            raw_json=message,
+            features=features,
+            mentioned_user_ids=mentioned_user_ids,
+        )
+        channel_summaries.invalidate(team_id, channel_id)
+        return
+
+    text = event.get("text", "")
+    features, mentioned_user_ids = ingestion_features(text)
+    sink.upsert_message(
+        team_id=team_id,
+        channel_id=channel_id,
+        slack_ts=event.get("ts"),
+        user_id=event.get("user"),
+        text=text,
+        thread_ts=event.get("thread_ts"),
+        subtype=subtype,
+        raw_json=event,
+        features=features,
+        mentioned_user_ids=mentioned_user_ids,
+    )
+
+
+def _persist_event(
+    ingest_buffer: Optional[MessageIngestBuffer],
+    team_id: str,
+    channel_id: str,
+    event: Dict[str, Any],
+) -> None:
+    if ingest_buffer is not None:
+        _store_event(ingest_buffer, team_id, channel_id, event)
+        return
+
+    with session_scope() as session:
+        _store_event(Repository(session), team_id, channel_id, event)
+
+
+def _is_channel_message(event: Dict[str, Any]) -> bool:
+    # DM messages are handled by the DM router
+    return event.get("channel_type") != "im"
+
+
+def register_message_handlers(
+    app: App,
+    ingest_buffer: Optional[MessageIngestBuffer] = None,
+    worker_pool: Optional[EventWorkerPool] = None,
+) -> None:
+    @app.event("message", matchers=[_is_channel_message])
+    def handle_message_events(
+        body: Dict[str, Any], ack, logger, event, request: Optional[BoltRequest] = None
+    ):
         ack()
         team_id = _extract_team_id(body)
         if not team_id:
@@ -34,43 +109,71 @@ def register_message_handlers(app: App) -> None:
         if not channel_id:
             return
 
-        subtype = event.get("subtype")
         if event.get("bot_id"):
             return
 
-        with session_scope() as session:
-            repo = Repository(session)
-            tracked_channels = repo.tracked_channels_for_team(team_id)
-            if channel_id not in tracked_channels:
-                return
-
-            if subtype == "message_deleted":
-                deleted_ts = event.get("deleted_ts") or event.get("previous_message", {}).get("ts")
-                if deleted_ts:
-                    repo.mark_message_deleted(team_id, channel_id, deleted_ts)
-                return
-
-            if subtype == "message_changed":
-                message = event.get("message", {})
-                repo.upsert_message(
-                    team_id=team_id,
-                    channel_id=channel_id,
-                    slack_ts=message.get("ts"),
-                    user_id=message.get("user"),
-                    text=message.get("text", ""),
-                    thread_ts=message.get("thread_ts"),
-                    subtype=message.get("subtype"),
-                    raw_json=message,
-                )
-                return
-
-            repo.upsert_message(
-                team_id=team_id,
-                channel_id=channel_id,
-                slack_ts=event.get("ts"),
-                user_id=event.get("user"),
-                text=event.get("text", ""),
-                thread_ts=event.get("thread_ts"),
-                subtype=subtype,
-                raw_json=event,
-            )
+        if not tracked_channels.is_tracked(team_id, channel_id):
+            return
+
+        if worker_pool is None:
+            _persist_event(ingest_buffer, team_id, channel_id, event)
+            return
+        return worker_pool.submit_event(
+            _persist_event,
+            ingest_buffer,
+            team_id,
+            channel_id,
+            event,
+            body=body,
+            request=request,
+        )
+
+
+def _apply_channel_event(directory: ChannelDirectory, team_id: str, event: Dict[str, Any]) -> None:
+    kind = event.get("type", "")
+    channel = event.get("channel")
+    if isinstance(channel, dict):
+        # channel_created / channel_rename / group_rename carry {"id", "name"}
+        directory.channel_upserted(team_id, channel["id"], name=channel.get("name"))
+    elif kind.endswith("_deleted"):
+        directory.channel_deleted(team_id, channel)
+    elif kind.endswith("_unarchive"):
+        directory.channel_upserted(team_id, channel, is_archived=False)
+    elif kind.endswith("_archive"):
+        directory.channel_upserted(team_id, channel, is_archived=True)
+
+
+CHANNEL_EVENTS = (
+    "channel_created",
+    "channel_rename",
+    "channel_archive",
+    "channel_unarchive",
+    "channel_deleted",
+    "group_rename",
+    "group_archive",
+    "group_unarchive",
+    "group_deleted",
+)
+
+
+def register_channel_handlers(
+    app: App, directory: ChannelDirectory, worker_pool: Optional[EventWorkerPool] = None
+) -> None:
+    """Keep the channel directory current from channel lifecycle events."""
+
+    def handle_channel_event(
+        body: Dict[str, Any], ack, logger, event, request: Optional[BoltRequest] = None
+    ):
+        ack()
+        team_id = _extract_team_id(body)
+        if not team_id or not event.get("channel"):
+            return
+        if worker_pool is None:
+            _apply_channel_event(directory, team_id, event)
+            return
+        return worker_pool.submit_event(
+            _apply_channel_event, directory, team_id, event, body=body, request=request
+        )
+
+    for event_type in CHANNEL_EVENTS:
+        app.event(event_type)(handle_channel_event)
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.app.ratelimit import TokenBucket
+from slack_digest_bot.app.settings import get_settings
+
+log = logging.getLogger(__name__)
+settings = get_settings()
+
+# Lower value is served first.
+INTERACTIVE = 0
+BULK = 1
+
+# Requests per minute per workspace (https://api.slack.com/apis/rate-limits). chat.postMessage
+# is limited per channel rather than by tier; "post" caps it workspace-wide.
+TIER_RATES_PER_MINUTE: Dict[str, float] = {
+    "tier1": 1,
+    "tier2": 20,
+    "tier3": 50,
+    "tier4": 100,
+    "post": 300,
+}
+
+METHOD_TIERS: Dict[str, str] = {
+    "auth.test": "tier4",
+    "chat.postMessage": "post",
+    "chat.update": "tier3",
+    "conversations.history": "tier3",
+    "conversations.info": "tier3",
+    "conversations.list": "tier2",
+    "conversations.open": "tier3",
+    "users.info": "tier4",
+}
+DEFAULT_TIER = "tier3"
+
+# Seconds of traffic a lane may send in one burst.
+BURST_SECONDS = 3.0
+
+
+class _Lane:
+    """Token bucket of one (team, tier) plus its waiting callers, best priority first."""
+
+    def __init__(self, rate_per_minute: float):
+        rate = rate_per_minute / 60
+        self.bucket = TokenBucket(rate=rate, capacity=max(1.0, rate * BURST_SECONDS))
+        self.cond = threading.Condition()
+        self.waiting: List[Tuple[int, int]] = []  # heap of (priority, arrival)
+        self.blocked_until = 0.0  # monotonic time set from Retry-After
+
+
+class SlackRateLimiter:
+    """Client-side pacing of Slack Web API calls per (team, method tier).
+
+    Callers queue in ``acquire`` until their lane has a token instead of being
+    sent and rejected; interactive calls (DM replies) are served before bulk ones
+    (digest posts) waiting in the same lane. A 429 blocks the whole lane for the
+    exact ``Retry-After``. Queue depth and throttle wait are exported per tier as
+    ``slack.<tier>.queue_depth`` and ``slack.<tier>.throttle_wait_ms``.
+    """
+
+    def __init__(
+        self,
+        tier_rates: Optional[Mapping[str, float]] = None,
+        method_tiers: Optional[Mapping[str, str]] = None,
+    ):
+        self.tier_rates = {**TIER_RATES_PER_MINUTE, **(tier_rates or {})}
+        self.method_tiers = {**METHOD_TIERS, **(method_tiers or {})}
+        self._lanes: Dict[Tuple[str, str], _Lane] = {}
+        self._depth: Dict[str, int] = {}
+        self._arrivals = itertools.count()
+        self._lock = threading.Lock()
+
+    def tier_of(self, method: str) -> str:
+        return self.method_tiers.get(method, DEFAULT_TIER)
+
+    def _lane(self, team_id: str, tier: str) -> _Lane:
+        key = (team_id, tier)
+        lane = self._lanes.get(key)
+        if lane is None:
+            with self._lock:
+                lane = self._lanes.get(key)
+                if lane is None:
+                    lane = self._lanes[key] = _Lane(self.tier_rates[tier])
+        return lane
+
+    def _track_depth(self, tier: str, delta: int) -> None:
+        with self._lock:
+            depth = self._depth[tier] = self._depth.get(tier, 0) + delta
+        metrics.gauge(f"slack.{tier}.queue_depth").set(depth)
+
+    def acquire(self, team_id: str, method: str, priority: int = INTERACTIVE) -> float:
+        """Block until ``method`` may be called for ``team_id``; returns seconds waited."""
+        tier = self.tier_of(method)
+        lane = self._lane(team_id, tier)
+        ticket = (priority, next(self._arrivals))
+        started = time.monotonic()
+        self._track_depth(tier, 1)
+        with lane.cond:
+            heapq.heappush(lane.waiting, ticket)
+            lane.cond.notify_all()  # a sleeping head may have lost its place
+            try:
+                while True:
+                    timeout: Optional[float] = None
+                    if lane.waiting[0] == ticket:
+                        timeout = lane.blocked_until - time.monotonic()
+                        if timeout <= 0:
+                            timeout = lane.bucket.try_acquire()
+                            if timeout <= 0:
+                                break
+                    lane.cond.wait(timeout)
+            finally:
+                lane.waiting.remove(ticket)
+                heapq.heapify(lane.waiting)
+                lane.cond.notify_all()
+        self._track_depth(tier, -1)
+        waited = time.monotonic() - started
+        metrics.histogram(f"slack.{tier}.throttle_wait_ms").observe(waited * 1000)
+        return waited
+
+    def retry_after(self, team_id: str, method: str, seconds: float) -> None:
+        """Hold every call in ``method``'s lane for ``seconds`` (from a 429)."""
+        tier = self.tier_of(method)
+        lane = self._lane(team_id, tier)
+        with lane.cond:
+            lane.blocked_until = max(lane.blocked_until, time.monotonic() + seconds)
+            lane.cond.notify_all()
+        metrics.counter(f"slack.{tier}.rate_limited").inc()
+
+
+slack_rate_limiter = SlackRateLimiter(tier_rates=settings.slack_tier_rates_per_minute)
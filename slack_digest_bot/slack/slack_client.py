@@ -1,68 +1,134 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, Optional
+from urllib.error import URLError
 
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from tenacity import (
     retry,
-    retry_if_exception_type,
+    retry_if_exception,
     stop_after_attempt,
     wait_exponential_jitter,
 )
 
+from slack_digest_bot.slack.channel_directory import ChannelDirectory, ChannelRow
+from slack_digest_bot.slack.dm_channels import DMChannelCache
+from slack_digest_bot.slack.rate_limits import INTERACTIVE, SlackRateLimiter, slack_rate_limiter
+
 
 log = logging.getLogger(__name__)
 
+TRANSIENT_ERRORS = {"internal_error", "fatal_error", "service_unavailable", "request_timeout"}
+
+
+def _is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, SlackApiError):
+        status = getattr(exc.response, "status_code", 0) or 0
+        return status >= 500 or exc.response.get("error") in TRANSIENT_ERRORS
+    return isinstance(exc, (URLError, ConnectionError, TimeoutError))
+
+
+def _retry_after(exc: SlackApiError) -> Optional[float]:
+    """Seconds from the Retry-After header of a 429, else None."""
+    if getattr(exc.response, "status_code", None) != 429:
+        return None
+    for name, value in (getattr(exc.response, "headers", None) or {}).items():
+        if name.lower() == "retry-after":
+            value = value[0] if isinstance(value, list) else value
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                break
+    return 1.0
+
 
 class SlackClient:
-    """Thin wrapper around Slack WebClient with retry logic."""
+    """Thin wrapper around Slack WebClient with rate limiting and retry logic.
 
-    def __init__(self, bot_token: str):
-        self.client = WebClient(token=bot_token)
+    Calls wait in ``rate_limiter`` for their (team, method tier) lane, so bursts
+    queue instead of failing; a 429 pauses the lane for its exact Retry-After and
+    the call is queued again (up to ``max_rate_limit_waits`` times). Transient
+    server and connection errors are retried with exponential jitter.
+    """
+
+    def __init__(
+        self,
+        bot_token: str,
+        team_id: Optional[str] = None,
+        base_url: Optional[str] = None,
+        rate_limiter: Optional[SlackRateLimiter] = None,
+        max_rate_limit_waits: int = 10,
+    ):
+        kwargs = {"base_url": base_url} if base_url else {}
+        self.client = WebClient(token=bot_token, **kwargs)
+        # A bot token belongs to one workspace; team_id only labels its rate-limit lanes.
+        self.team_id = team_id or "default"
+        self.rate_limiter = rate_limiter or slack_rate_limiter
+        self.max_rate_limit_waits = max_rate_limit_waits
+        self.channel_directory = ChannelDirectory(crawl=self.list_channels)
+        self.dm_channels = DMChannelCache(open_dm=self.open_dm)
 
     @retry(
         reraise=True,
         stop=stop_after_attempt(3),
         wait=wait_exponential_jitter(initial=1, max=6),
-        retry=retry_if_exception_type(SlackApiError),
+        retry=retry_if_exception(_is_transient),
     )
-    def call(self, method: str, **kwargs: Any) -> Dict[str, Any]:
-        try:
-            return self.client.api_call(method, json=kwargs)
-        except SlackApiError:
-            log.exception("Slack API call failed: %s", method)
-            raise
+    def call(self, method: str, priority: int = INTERACTIVE, **kwargs: Any) -> Dict[str, Any]:
+        """Call ``method``; ``priority`` is INTERACTIVE (user-facing) or BULK."""
+        rate_limited = 0
+        while True:
+            self.rate_limiter.acquire(self.team_id, method, priority)
+            try:
+                return self.client.api_call(method, json=kwargs)
+            except SlackApiError as exc:
+                retry_after = _retry_after(exc)
+                if retry_after is None or rate_limited >= self.max_rate_limit_waits:
+                    log.exception("Slack API call failed: %s", method)
+                    raise
+                rate_limited += 1
+                log.warning("Slack rate-limited %s; retrying in %.1fs", method, retry_after)
+                self.rate_limiter.retry_after(self.team_id, method, retry_after)
 
     def open_dm(self, user_id: str) -> str:
         resp = self.call("conversations.open", users=user_id)
         return resp["channel"]["id"]
 
-    def post_message(self, channel: str, text: str, blocks: Optional[list] = None) -> None:
+    def dm_channel_id(self, team_id: str, user_id: str) -> str:
+        """The user's IM channel, opened once and then served from ``dm_channels``."""
+        return self.dm_channels.get(team_id, user_id)
+
+    def post_message(
+        self,
+        channel: str,
+        text: str,
+        blocks: Optional[list] = None,
+        priority: int = INTERACTIVE,
+    ) -> None:
         payload: Dict[str, Any] = {"channel": channel, "text": text}
         if blocks:
             payload["blocks"] = blocks
-        self.call("chat.postMessage", **payload)
+        self.call("chat.postMessage", priority=priority, **payload)
 
-    def resolve_channel_id(self, name_or_id: str) -> Optional[str]:
-        """Resolve '#name' to channel ID; return input if already looks like an ID."""
-        if name_or_id.startswith("C") and len(name_or_id) >= 8:
-            return name_or_id
-        target = name_or_id.lstrip("#")
+    def list_channels(self, team_id: str) -> Iterator[ChannelRow]:
+        """Page through every non-archived channel visible to the bot token."""
         cursor = None
         while True:
             resp = self.call(
                 "conversations.list",
                 exclude_archived=True,
                 types="public_channel,private_channel",
-                limit=200,
+                limit=1000,
                 cursor=cursor,
             )
             for ch in resp.get("channels", []):
-                if ch.get("name") == target:
-                    return ch.get("id")
+                yield ch["id"], ch.get("name", ""), bool(ch.get("is_archived"))
             cursor = resp.get("response_metadata", {}).get("next_cursor")
             if not cursor:
                 break
-        return None
+
+    def resolve_channel_id(self, team_id: str, name_or_id: str) -> Optional[str]:
+        """Resolve '#name' to channel ID; return input if already looks like an ID."""
+        return self.channel_directory.resolve(team_id, name_or_id)
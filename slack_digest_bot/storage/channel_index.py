@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from slack_digest_bot.app.settings import get_settings
+
+log = logging.getLogger(__name__)
+settings = get_settings()
+
+ChannelLoader = Callable[[str], Iterable[str]]
+# (team_id, channels added) or (team_id, None) to invalidate the team's entry
+PendingChange = Tuple[str, Optional[List[str]]]
+
+_PENDING_KEY = "tracked_channel_changes"
+
+
+def _load_from_db(team_id: str) -> Iterable[str]:
+    from slack_digest_bot.storage.db import session_scope
+    from slack_digest_bot.storage.repo import Repository
+
+    with session_scope() as session:
+        return Repository(session).tracked_channels_for_team(team_id)
+
+
+@dataclass
+class _TeamEntry:
+    channels: Set[str]
+    expires_at: float
+
+
+class TrackedChannelIndex:
+    """Process-local set of tracked channel IDs per team.
+
+    Lets the message event hot path drop untracked channels without touching the
+    database. Entries are rebuilt from the DB once older than ``ttl_seconds`` or after
+    ``invalidate``; ``add`` patches an already loaded entry in place. Repository
+    writes go through ``record_add``/``record_invalidate`` so the index only changes
+    once their transaction commits.
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0, loader: Optional[ChannelLoader] = None):
+        self.ttl_seconds = ttl_seconds
+        self.loader = loader or _load_from_db
+        self._entries: Dict[str, _TeamEntry] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def is_tracked(self, team_id: str, channel_id: str) -> bool:
+        entry = self._entries.get(team_id)
+        if entry is None or entry.expires_at <= time.monotonic():
+            entry = self._rebuild(team_id)
+        return channel_id in entry.channels
+
+    def add(self, team_id: str, channels: Iterable[str]) -> None:
+        with self._lock:
+            self._versions[team_id] = self._versions.get(team_id, 0) + 1
+            entry = self._entries.get(team_id)
+            if entry is not None:
+                entry.channels.update(channels)
+
+    def invalidate(self, team_id: Optional[str] = None) -> None:
+        with self._lock:
+            if team_id is None:
+                self._entries.clear()
+                return
+            self._versions[team_id] = self._versions.get(team_id, 0) + 1
+            self._entries.pop(team_id, None)
+
+    def record_add(self, session: Session, team_id: str, channels: Iterable[str]) -> None:
+        session.info.setdefault(_PENDING_KEY, []).append((team_id, list(channels)))
+
+    def record_invalidate(self, session: Session, team_id: str) -> None:
+        session.info.setdefault(_PENDING_KEY, []).append((team_id, None))
+
+    def _rebuild(self, team_id: str) -> _TeamEntry:
+        with self._lock:
+            version = self._versions.get(team_id, 0)
+        channels = set(self.loader(team_id))
+        with self._lock:
+            # A concurrent add/remove raced the load: serve it once, reload next time.
+            fresh = self._versions.get(team_id, 0) == version
+            expires_at = time.monotonic() + self.ttl_seconds if fresh else 0.0
+            entry = _TeamEntry(channels=channels, expires_at=expires_at)
+            self._entries[team_id] = entry
+        log.debug("Rebuilt tracked channel index for %s (%s channels)", team_id, len(channels))
+        return entry
+
+
+tracked_channels = TrackedChannelIndex(ttl_seconds=settings.tracked_channel_cache_ttl_seconds)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session: Session) -> None:
+    changes: List[PendingChange] = session.info.pop(_PENDING_KEY, None) or []
+    for team_id, channels in changes:
+        if channels is None:
+            tracked_channels.invalidate(team_id)
+        else:
+            tracked_channels.add(team_id, channels)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
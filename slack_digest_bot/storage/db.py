@@ -1,33 +1,114 @@
 from __future__ import annotations
 
+import threading
 from contextlib import contextmanager
-from typing import Iterator
+from typing import Any, Dict, Iterator, Optional
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
-from slack_digest_bot.app.settings import get_settings
+from slack_digest_bot.app.settings import Settings, get_settings
 
 Base = declarative_base()
 
 
-def get_engine():
+def sqlite_pragmas(settings: Settings) -> Dict[str, Any]:
+    """Per-connection PRAGMAs for SQLite, in the order they are applied.
+
+    WAL lets readers run alongside the single writer, synchronous=NORMAL drops the
+    fsync per commit (still durable across application crashes), busy_timeout makes
+    a writer wait for the lock instead of failing, and mmap_size serves reads from
+    the page cache.
+    """
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "mmap_size": settings.sqlite_mmap_size,
+    }
+
+
+def _apply_pragmas(engine: Engine, pragmas: Dict[str, Any]) -> None:
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def get_engine(
+    database_url: Optional[str] = None, pragmas: Optional[Dict[str, Any]] = None
+) -> Engine:
+    """Build the engine for ``database_url`` (default: settings.database_url).
+
+    Server databases get a QueuePool sized by the ``db_pool_*`` settings, with
+    pre-ping and recycling so connections dropped by the server or a proxy are
+    replaced rather than handed out. SQLite gets ``pragmas`` (default:
+    ``sqlite_pragmas``) on every new connection.
+    """
     settings = get_settings()
-    connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
-    return create_engine(settings.database_url, connect_args=connect_args, future=True)
+    url = make_url(database_url or settings.database_url)
+    if url.get_backend_name() == "sqlite":
+        engine = create_engine(
+            url,
+            connect_args={
+                "check_same_thread": False,
+                "timeout": settings.sqlite_busy_timeout_ms / 1000,
+            },
+            future=True,
+        )
+        _apply_pragmas(engine, sqlite_pragmas(settings) if pragmas is None else pragmas)
+        return engine
+    return create_engine(
+        url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        future=True,
+    )
+
+
+# Built on first use (once per process) so importing the package does not touch the
+# database; tests and tools may assign either one beforehand to inject their own.
+engine: Optional[Engine] = None
+SessionLocal: Optional[sessionmaker] = None
+_init_lock = threading.Lock()
+
+
+def get_db_engine() -> Engine:
+    global engine
+    if engine is None:
+        with _init_lock:
+            if engine is None:
+                engine = get_engine()
+    return engine
 
 
-engine = get_engine()
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
+def get_session_factory() -> sessionmaker:
+    global SessionLocal
+    if SessionLocal is None:
+        bind = get_db_engine()
+        with _init_lock:
+            if SessionLocal is None:
+                SessionLocal = sessionmaker(
+                    bind=bind, autoflush=False, autocommit=False, expire_on_commit=False
+                )
+    return SessionLocal
 
 
 def init_db() -> None:
-    Base.metadata.create_all(engine)
+    Base.metadata.create_all(get_db_engine())
 
 
 @contextmanager
 def session_scope() -> Iterator[Session]:
-    session = SessionLocal()
+    session = get_session_factory()()
     try:
         yield session
         session.commit()
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.storage.db import session_scope
+from slack_digest_bot.storage.repo import Repository
+
+log = logging.getLogger(__name__)
+
+MessageKey = Tuple[str, str, str]
+SessionFactory = Callable[[], AbstractContextManager[Session]]
+
+# Columns an edit may change; author and created_at stick with the first write.
+_UPDATABLE = ("text", "thread_ts", "subtype", "raw_json", "features", "mentioned_user_ids")
+
+MAX_RETRY_DELAY_SECONDS = 30.0
+
+
+@dataclass
+class _PendingOp:
+    key: MessageKey
+    values: Optional[Dict[str, Any]]  # None means "mark deleted"
+    attempts: int = 0  # flushes that failed on a transient database error
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Connection loss, lock timeouts and the like: the same rows may succeed later."""
+    return isinstance(exc, (OperationalError, InterfaceError)) or bool(
+        getattr(exc, "connection_invalidated", False)
+    )
+
+
+def _coalesce_ops(
+    ops: List[_PendingOp],
+) -> Tuple[List[Dict[str, Any]], List[MessageKey]]:
+    """Fold queued ops per message key in arrival order.
+
+    Returns rows for ``bulk_upsert_messages`` and keys that only need a soft delete.
+    """
+    rows: Dict[MessageKey, Dict[str, Any]] = {}
+    deletes: Dict[MessageKey, None] = {}
+    for op in ops:
+        if op.values is None:
+            if op.key in rows:
+                rows[op.key]["is_deleted"] = True
+            else:
+                deletes[op.key] = None
+            continue
+        deletes.pop(op.key, None)
+        row = rows.get(op.key)
+        if row is None:
+            rows[op.key] = {**op.values, "is_deleted": False}
+        else:
+            row.update({col: op.values[col] for col in _UPDATABLE})
+            row["is_deleted"] = False
+    return list(rows.values()), list(deletes)
+
+
+class MessageIngestBuffer:
+    """Collects message events and bulk-writes them every N ms or M rows.
+
+    Exposes the same ``upsert_message``/``mark_message_deleted`` calls as ``Repository``
+    so event handlers can write through either one. At ``max_pending`` queued ops
+    producers block, which backs up the event queue and, in turn, Slack.
+
+    A batch failing on a transient error (connection, lock) is put back in front and
+    retried with backoff; ops still failing after ``max_attempts`` flushes are
+    dead-lettered. Any other error is narrowed down by bisecting the batch, so only
+    the rows that fail on their own (e.g. a NULL ``slack_ts``) are dead-lettered and
+    the rest are written. Dead letters are logged and kept in ``dead_letters``.
+    """
+
+    def __init__(
+        self,
+        flush_interval_ms: int = 200,
+        max_rows: int = 500,
+        session_factory: SessionFactory = session_scope,
+        max_pending: int = 10_000,
+        max_attempts: int = 10,
+    ):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_rows = max_rows
+        self.session_factory = session_factory
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.dead_letters: Deque[_PendingOp] = deque(maxlen=1000)
+        self._pending: List[_PendingOp] = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._failures = 0  # consecutive flushes that hit a transient error
+        self._depth = metrics.gauge("ingest.queue_depth")
+        self._latency = metrics.histogram("ingest.flush_latency_ms")
+        self._written = metrics.counter("ingest.rows_written")
+        self._errors = metrics.counter("ingest.flush_errors")
+        self._dead = metrics.counter("ingest.dead_letters")
+
+    # Producer API ----------------------------------------------------------
+    def upsert_message(
+        self,
+        *,
+        team_id: str,
+        channel_id: str,
+        slack_ts: str,
+        user_id: Optional[str],
+        text: str,
+        thread_ts: Optional[str],
+        subtype: Optional[str],
+        raw_json: Optional[dict] = None,
+        created_at: Optional[dt.datetime] = None,
+        features: Optional[int] = None,
+        mentioned_user_ids: Optional[str] = None,
+    ) -> None:
+        values = {
+            "team_id": team_id,
+            "channel_id": channel_id,
+            "slack_ts": slack_ts,
+            "user_id": user_id,
+            "text": text,
+            "thread_ts": thread_ts,
+            "subtype": subtype,
+            "raw_json": raw_json,
+            "created_at": created_at or dt.datetime.now(dt.timezone.utc),
+            "features": features,
+            "mentioned_user_ids": mentioned_user_ids,
+        }
+        self._enqueue(_PendingOp(key=(team_id, channel_id, slack_ts), values=values))
+
+    def mark_message_deleted(self, team_id: str, channel_id: str, slack_ts: str) -> None:
+        self._enqueue(_PendingOp(key=(team_id, channel_id, slack_ts), values=None))
+
+    def _enqueue(self, op: _PendingOp) -> None:
+        with self._cond:
+            while len(self._pending) >= self.max_pending and not self._closed:
+                self._cond.wait()
+            self._pending.append(op)
+            depth = len(self._pending)
+            self._depth.set(depth)
+            if depth >= self.max_rows:
+                self._cond.notify()
+
+    # Lifecycle -------------------------------------------------------------
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="message-ingest", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stop the flusher and write whatever is still queued (shutdown hook)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if self._failures:
+                    delay = self.flush_interval * 2**self._failures
+                    self._cond.wait(min(delay, MAX_RETRY_DELAY_SECONDS))
+                elif not self._closed and len(self._pending) < self.max_rows:
+                    self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                log.exception("Message ingest flush failed")
+
+    def flush(self) -> int:
+        """Write everything queued; returns the number of ops written."""
+        with self._flush_lock:
+            with self._cond:
+                ops, self._pending = self._pending, []
+                self._depth.set(0)
+                self._cond.notify_all()  # wake producers blocked on max_pending
+            if not ops:
+                return 0
+
+            started = time.perf_counter()
+            written, retry = self._write_isolating(ops)
+            if retry:
+                self._failures += 1
+                self._requeue(retry)
+            else:
+                self._failures = 0
+            self._latency.observe((time.perf_counter() - started) * 1000)
+            return written
+
+    def _write(self, ops: List[_PendingOp]) -> None:
+        rows, deletes = _coalesce_ops(ops)
+        with self.session_factory() as session:
+            repo = Repository(session)
+            repo.bulk_upsert_messages(rows)
+            repo.mark_messages_deleted(deletes)
+        self._written.inc(len(rows) + len(deletes))
+
+    def _write_isolating(self, ops: List[_PendingOp]) -> Tuple[int, List[_PendingOp]]:
+        """Write ``ops`` in order; returns (ops written, ops to retry later)."""
+        try:
+            self._write(ops)
+            return len(ops), []
+        except Exception as exc:
+            self._errors.inc()
+            if _is_transient(exc):
+                log.warning("Message ingest flush of %s ops failed; will retry: %s", len(ops), exc)
+                return 0, ops
+            if len(ops) == 1:
+                self._dead_letter(ops[0], exc)
+                return 0, []
+        middle = len(ops) // 2
+        written, retry = self._write_isolating(ops[:middle])
+        if retry:  # keep arrival order: nothing after a retried op may be written first
+            return written, retry + ops[middle:]
+        more, retry = self._write_isolating(ops[middle:])
+        return written + more, retry
+
+    def _requeue(self, ops: List[_PendingOp]) -> None:
+        keep = []
+        for op in ops:
+            op.attempts += 1
+            if op.attempts >= self.max_attempts:
+                self._dead_letter(op, "retries exhausted")
+            else:
+                keep.append(op)
+        with self._cond:
+            # Put the batch back in front so ordering survives the retry.
+            self._pending[:0] = keep
+            self._depth.set(len(self._pending))
+
+    def _dead_letter(self, op: _PendingOp, reason: Any) -> None:
+        self._dead.inc()
+        self.dead_letters.append(op)
+        log.error("Dead-lettering message op %s after %s attempts: %s", op.key, op.attempts, reason)
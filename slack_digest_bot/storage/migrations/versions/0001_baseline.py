@@ -0,0 +1,116 @@
+"""Baseline schema (tables created by init_db before migrations existed).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _timestamps() -> list:
+    return [
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "installations",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("team_id", sa.String(64), nullable=False),
+        sa.Column("enterprise_id", sa.String(64), nullable=True),
+        sa.Column("bot_token_encrypted", sa.String(512), nullable=False),
+        sa.Column("installed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_installations_team_id", "installations", ["team_id"])
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("team_id", sa.String(64), nullable=False),
+        sa.Column("user_id", sa.String(64), nullable=False),
+        sa.Column("timezone", sa.String(64), nullable=True),
+        sa.Column("digest_time_local", sa.String(5), nullable=False),
+        sa.Column("last_digest_sent_at", sa.DateTime(timezone=True), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_users_team_id", "users", ["team_id"])
+    op.create_index("ix_users_user_id", "users", ["user_id"])
+    op.create_index("ix_users_team_user", "users", ["team_id", "user_id"])
+
+    op.create_table(
+        "channel_subscriptions",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("team_id", sa.String(64), nullable=False),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("channel_id", sa.String(64), nullable=False),
+        sa.Column("enabled", sa.Boolean, nullable=False),
+        sa.Column("priority_weight", sa.Integer, nullable=False),
+        *_timestamps(),
+        sa.UniqueConstraint("team_id", "user_id", "channel_id", name="uq_sub_per_user_channel"),
+    )
+    op.create_index("ix_channel_subscriptions_team_id", "channel_subscriptions", ["team_id"])
+    op.create_index("ix_channel_subscriptions_channel_id", "channel_subscriptions", ["channel_id"])
+    op.create_index(
+        "ix_channel_sub_team_channel", "channel_subscriptions", ["team_id", "channel_id"]
+    )
+
+    op.create_table(
+        "tracking_prefs",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("team_id", sa.String(64), nullable=False),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("include_overview", sa.Boolean, nullable=False),
+        sa.Column("include_mentions_me", sa.Boolean, nullable=False),
+        sa.Column("include_broadcasts", sa.Boolean, nullable=False),
+        sa.Column("include_unanswered_questions", sa.Boolean, nullable=False),
+        sa.Column("include_suggested_actions", sa.Boolean, nullable=False),
+        sa.Column("max_channels", sa.Integer, nullable=False),
+        sa.Column("custom_rules_json", sa.JSON, nullable=False),
+        *_timestamps(),
+    )
+    op.create_index("ix_tracking_prefs_team_id", "tracking_prefs", ["team_id"])
+    op.create_index("ix_tracking_prefs_team_user", "tracking_prefs", ["team_id", "user_id"])
+
+    op.create_table(
+        "messages",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("team_id", sa.String(64), nullable=False),
+        sa.Column("channel_id", sa.String(64), nullable=False),
+        sa.Column("slack_ts", sa.String(32), nullable=False),
+        sa.Column("user_id", sa.String(64), nullable=True),
+        sa.Column("text", sa.Text, nullable=False),
+        sa.Column("thread_ts", sa.String(32), nullable=True),
+        sa.Column("subtype", sa.String(32), nullable=True),
+        sa.Column("is_deleted", sa.Boolean, nullable=False),
+        sa.Column("raw_json", sa.JSON, nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("team_id", "channel_id", "slack_ts", name="uq_message_ts"),
+    )
+    op.create_index("ix_messages_team_id", "messages", ["team_id"])
+    op.create_index("ix_messages_channel_id", "messages", ["channel_id"])
+    op.create_index("ix_messages_slack_ts", "messages", ["slack_ts"])
+    op.create_index("ix_messages_thread_ts", "messages", ["thread_ts"])
+    op.create_index(
+        "ix_messages_team_user_created", "messages", ["team_id", "user_id", "created_at"]
+    )
+    op.create_index("ix_messages_team_thread", "messages", ["team_id", "thread_ts"])
+
+
+def downgrade() -> None:
+    op.drop_table("messages")
+    op.drop_table("tracking_prefs")
+    op.drop_table("channel_subscriptions")
+    op.drop_table("users")
+    op.drop_table("installations")
@@ -0,0 +1,29 @@
+"""Store ingestion-time message features.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable: existing rows are classified from their text at digest time.
+    with op.batch_alter_table("messages") as batch:
+        batch.add_column(sa.Column("features", sa.Integer, nullable=True))
+        batch.add_column(sa.Column("mentioned_user_ids", sa.String(512), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("messages") as batch:
+        batch.drop_column("mentioned_user_ids")
+        batch.drop_column("features")
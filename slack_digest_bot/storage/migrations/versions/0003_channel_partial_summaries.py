@@ -0,0 +1,42 @@
+"""Rolling per-channel bucket summaries.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "channel_partial_summaries",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("team_id", sa.String(64), nullable=False),
+        sa.Column("channel_id", sa.String(64), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("bucket_end", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("message_count", sa.Integer, nullable=False),
+        sa.Column("summary_json", sa.JSON, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint(
+            "team_id", "channel_id", "bucket_start", name="uq_partial_summary_bucket"
+        ),
+    )
+    op.create_index(
+        "ix_channel_partial_summaries_bucket_end", "channel_partial_summaries", ["bucket_end"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("channel_partial_summaries")
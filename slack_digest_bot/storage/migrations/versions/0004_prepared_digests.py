@@ -0,0 +1,39 @@
+"""Digests prepared ahead of their slot through the Batch API.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "prepared_digests",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("team_id", sa.String(64), nullable=False),
+        sa.Column("user_id", sa.String(64), nullable=False),
+        sa.Column("scheduled_for", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("window_until", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("batch_id", sa.String(128), nullable=True),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("digest_json", sa.JSON, nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("team_id", "user_id", "scheduled_for", name="uq_prepared_digest_slot"),
+    )
+    op.create_index("ix_prepared_digests_scheduled_for", "prepared_digests", ["scheduled_for"])
+    op.create_index("ix_prepared_digests_batch_id", "prepared_digests", ["batch_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("prepared_digests")
@@ -0,0 +1,33 @@
+"""Cached LLM chat completions keyed by normalised request hash.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "llm_responses",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("cache_key", sa.String(64), nullable=False, unique=True),
+        sa.Column("purpose", sa.String(32), nullable=False),
+        sa.Column("response_json", sa.JSON, nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_llm_responses_expires_at", "llm_responses", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("llm_responses")
@@ -0,0 +1,34 @@
+"""Persisted channel directory (name -> ID per team).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "slack_channels",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("team_id", sa.String(64), nullable=False),
+        sa.Column("channel_id", sa.String(64), nullable=False),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("is_archived", sa.Boolean, nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("team_id", "channel_id", name="uq_slack_channel"),
+    )
+    op.create_index("ix_slack_channels_team_name", "slack_channels", ["team_id", "name"])
+
+
+def downgrade() -> None:
+    op.drop_table("slack_channels")
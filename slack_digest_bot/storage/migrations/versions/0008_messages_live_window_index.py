@@ -0,0 +1,39 @@
+"""Partial (team_id, channel_id, created_at) index over non-deleted messages.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps ingest writing while Postgres builds the index; it cannot
+    # run inside the migration transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_messages_team_channel_created_live",
+            "messages",
+            ["team_id", "channel_id", "created_at"],
+            postgresql_where=sa.text("is_deleted IS false"),
+            postgresql_concurrently=True,
+            sqlite_where=sa.text("is_deleted IS 0"),
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_messages_team_channel_created_live",
+            table_name="messages",
+            postgresql_concurrently=True,
+        )
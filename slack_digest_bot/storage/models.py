@@ -1,12 +1,11 @@
 from __future__ import annotations
 
 import datetime as dt
-from typing import Optional
+from typing import NamedTuple, Optional
 
 from sqlalchemy import (
     JSON,
     Boolean,
-    Column,
     DateTime,
     ForeignKey,
     Index,
@@ -16,6 +15,7 @@ from sqlalchemy import (
     UniqueConstraint,
     func,
 )
+from sqlalchemy import text as sql_text  # ``text`` is also a Message column
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from slack_digest_bot.storage.db import Base
@@ -43,6 +43,8 @@ class User(Base):
     timezone: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     digest_time_local: Mapped[str] = mapped_column(String(5), default="09:00")  # HH:MM
     last_digest_sent_at: Mapped[Optional[dt.datetime]] = mapped_column(DateTime(timezone=True))
+    # IM channel with the bot, cached from conversations.open / incoming DMs.
+    dm_channel_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=func.now())
     updated_at: Mapped[dt.datetime] = mapped_column(
         DateTime(timezone=True), default=func.now(), onupdate=func.now()
@@ -116,10 +118,116 @@ class Message(Base):
     subtype: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
     is_deleted: Mapped[bool] = mapped_column(Boolean, default=False)
     raw_json: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    # MessageFlag bitmask computed at ingestion; NULL for rows stored before it existed.
+    features: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # Mentioned user IDs as ",U1,U2," so "mentions me" is a LIKE filter in SQL.
+    mentioned_user_ids: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=func.now())
 
     __table_args__ = (
         UniqueConstraint("team_id", "channel_id", "slack_ts", name="uq_message_ts"),
         Index("ix_messages_team_user_created", "team_id", "user_id", "created_at"),
         Index("ix_messages_team_thread", "team_id", "thread_ts"),
+        # Digest window reads; the predicate matches ``is_deleted.is_(False)`` as each
+        # dialect renders it, so the planner can prove the partial index applies.
+        Index(
+            "ix_messages_team_channel_created_live",
+            "team_id",
+            "channel_id",
+            "created_at",
+            postgresql_where=sql_text("is_deleted IS false"),
+            sqlite_where=sql_text("is_deleted IS 0"),
+        ),
     )
+
+
+class ChannelPartialSummary(Base):
+    """LLM summary of one channel's messages in a fixed time bucket, built ahead of digests."""
+
+    __tablename__ = "channel_partial_summaries"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    team_id: Mapped[str] = mapped_column(String(64))
+    channel_id: Mapped[str] = mapped_column(String(64))
+    bucket_start: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True))
+    bucket_end: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), index=True)
+    content_hash: Mapped[str] = mapped_column(String(64))
+    message_count: Mapped[int] = mapped_column(Integer, default=0)
+    summary_json: Mapped[dict] = mapped_column(JSON, default=dict)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=func.now())
+    updated_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        UniqueConstraint("team_id", "channel_id", "bucket_start", name="uq_partial_summary_bucket"),
+    )
+
+
+class PreparedDigest(Base):
+    """Digest built ahead of its slot through the Batch API, delivered at ``scheduled_for``."""
+
+    __tablename__ = "prepared_digests"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    team_id: Mapped[str] = mapped_column(String(64))
+    user_id: Mapped[str] = mapped_column(String(64))
+    scheduled_for: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), index=True)
+    window_until: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True))
+    batch_id: Mapped[Optional[str]] = mapped_column(String(128), nullable=True, index=True)
+    # pending -> ready | failed, then delivered (ready) or expired (not ready in time)
+    status: Mapped[str] = mapped_column(String(16), default="pending")
+    digest_json: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=func.now())
+    updated_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        UniqueConstraint("team_id", "user_id", "scheduled_for", name="uq_prepared_digest_slot"),
+    )
+
+
+class SlackChannel(Base):
+    """Workspace channel directory (name -> ID), kept current from channel events."""
+
+    __tablename__ = "slack_channels"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    team_id: Mapped[str] = mapped_column(String(64))
+    channel_id: Mapped[str] = mapped_column(String(64))
+    name: Mapped[str] = mapped_column(String(255))
+    is_archived: Mapped[bool] = mapped_column(Boolean, default=False)
+    updated_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        UniqueConstraint("team_id", "channel_id", name="uq_slack_channel"),
+        Index("ix_slack_channels_team_name", "team_id", "name"),
+    )
+
+
+class LLMResponse(Base):
+    """Cached chat completion, keyed by the hash of its normalised request."""
+
+    __tablename__ = "llm_responses"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    cache_key: Mapped[str] = mapped_column(String(64), unique=True)
+    purpose: Mapped[str] = mapped_column(String(32))
+    response_json: Mapped[dict] = mapped_column(JSON)
+    expires_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), index=True)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=func.now())
+
+
+class DigestMessage(NamedTuple):
+    """Column subset of ``Message`` that the digest pipeline reads; no ORM state."""
+
+    channel_id: str
+    slack_ts: str
+    user_id: Optional[str]
+    text: str
+    thread_ts: Optional[str]
+    features: Optional[int] = None
+    mentioned_user_ids: Optional[str] = None
@@ -1,13 +1,26 @@
 from __future__ import annotations
 
 import datetime as dt
-from typing import Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
 
-from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy import and_, bindparam, func, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
 
-from slack_digest_bot.storage.models import ChannelSubscription, Message, TrackingPreferences, User
+from slack_digest_bot.storage.channel_index import tracked_channels
+from slack_digest_bot.storage.models import (
+    ChannelPartialSummary,
+    ChannelSubscription,
+    DigestMessage,
+    LLMResponse,
+    Message,
+    PreparedDigest,
+    SlackChannel,
+    TrackingPreferences,
+    User,
+)
+from slack_digest_bot.storage.schedule_changes import schedule_changes
 
 
 class Repository:
@@ -28,11 +41,15 @@ class Repository:
         if user:
             if timezone and user.timezone != timezone:
                 user.timezone = timezone
+                schedule_changes.record(
+                    self.session, team_id, user_id, timezone, user.digest_time_local
+                )
             return user
 
         user = User(team_id=team_id, user_id=user_id, timezone=timezone)
         self.session.add(user)
         self.session.flush()
+        schedule_changes.record(self.session, team_id, user_id, timezone, user.digest_time_local)
         # Ensure preferences exist
         prefs = TrackingPreferences(team_id=team_id, user_id=user.id)
         self.session.add(prefs)
@@ -53,6 +70,56 @@ class Repository:
 
     def set_digest_time(self, user: User, time_local: str) -> None:
         user.digest_time_local = time_local
+        schedule_changes.record(self.session, user.team_id, user.user_id, user.timezone, time_local)
+
+    def delete_user(self, team_id: str, user_id: str) -> bool:
+        user = (
+            self.session.execute(
+                select(User).where(and_(User.team_id == team_id, User.user_id == user_id))
+            )
+            .scalars()
+            .first()
+        )
+        if user is None:
+            return False
+        self.session.delete(user)
+        schedule_changes.record(self.session, team_id, user_id, None, None)
+        return True
+
+    def user_keys(self) -> Set[Tuple[str, str]]:
+        rows = self.session.execute(select(User.team_id, User.user_id))
+        return {(team_id, user_id) for team_id, user_id in rows}
+
+    def user_schedules(
+        self, updated_since: Optional[dt.datetime] = None
+    ) -> List[Tuple[str, str, Optional[str], str, Optional[dt.datetime]]]:
+        """(team_id, user_id, timezone, digest_time_local, updated_at) rows, oldest change first."""
+        stmt = select(
+            User.team_id, User.user_id, User.timezone, User.digest_time_local, User.updated_at
+        )
+        if updated_since is not None:
+            # One second of overlap: SQLite stores func.now() at second precision.
+            stmt = stmt.where(User.updated_at >= updated_since - dt.timedelta(seconds=1))
+        return [tuple(row) for row in self.session.execute(stmt.order_by(User.updated_at))]
+
+    def mark_digest_sent(self, team_id: str, user_id: str, sent_at: dt.datetime) -> None:
+        self.session.execute(
+            update(User)
+            .where(and_(User.team_id == team_id, User.user_id == user_id))
+            .values(last_digest_sent_at=sent_at)
+        )
+
+    def dm_channel_id(self, team_id: str, user_id: str) -> Optional[str]:
+        return self.session.execute(
+            select(User.dm_channel_id).where(and_(User.team_id == team_id, User.user_id == user_id))
+        ).scalar()
+
+    def set_dm_channel_id(self, team_id: str, user_id: str, channel_id: Optional[str]) -> None:
+        self.session.execute(
+            update(User).where(and_(User.team_id == team_id, User.user_id == user_id))
+            # Keep updated_at: it drives the schedule index sync.
+            .values(dm_channel_id=channel_id, updated_at=User.updated_at)
+        )
 
     def set_max_channels(self, user: User, max_channels: int) -> None:
         prefs = self._ensure_prefs(user)
@@ -81,6 +148,11 @@ class Repository:
             if sub.enabled
         ]
 
+    def channel_priority_weights(self, user: User) -> Dict[str, int]:
+        return {
+            sub.channel_id: sub.priority_weight or 0 for sub in user.subscriptions if sub.enabled
+        }
+
     def add_channels(self, user: User, channels: Sequence[str]) -> Tuple[List[str], List[str]]:
         prefs = self._ensure_prefs(user)
         existing_ids = {sub.channel_id for sub in user.subscriptions}
@@ -98,6 +170,7 @@ class Repository:
             added.append(channel)
         if added:
             self.session.flush()
+            tracked_channels.record_add(self.session, user.team_id, added)
         return added, skipped
 
     def remove_channels(self, user: User, channels: Sequence[str]) -> List[str]:
@@ -108,6 +181,8 @@ class Repository:
                 removed.append(sub.channel_id)
         if removed:
             self.session.flush()
+            # Other users may still track these channels; let the index reload.
+            tracked_channels.record_invalidate(self.session, user.team_id)
         return removed
 
     def tracked_channels_for_team(self, team_id: str) -> List[str]:
@@ -118,6 +193,15 @@ class Repository:
         )
         return [row[0] for row in result.all()]
 
+    def tracked_channel_pairs(self) -> List[Tuple[str, str]]:
+        """Distinct (team_id, channel_id) tracked by at least one user."""
+        result = self.session.execute(
+            select(ChannelSubscription.team_id, ChannelSubscription.channel_id)
+            .where(ChannelSubscription.enabled.is_(True))
+            .distinct()
+        )
+        return [(row[0], row[1]) for row in result.all()]
+
     # Messages ------------------------------------------------------------
     def upsert_message(
         self,
@@ -131,7 +215,12 @@ class Repository:
         subtype: Optional[str],
         raw_json: Optional[dict] = None,
         created_at: Optional[dt.datetime] = None,
+        features: Optional[int] = None,
+        mentioned_user_ids: Optional[str] = None,
     ) -> Message:
+        """Insert or update one message; ``features``/``mentioned_user_ids`` come from
+        the caller's classifier and stay NULL when not given (classified on read).
+        """
         existing = (
             self.session.execute(
                 select(Message).where(
@@ -151,6 +240,8 @@ class Repository:
             existing.subtype = subtype
             existing.raw_json = raw_json
             existing.is_deleted = False
+            existing.features = features
+            existing.mentioned_user_ids = mentioned_user_ids
             return existing
 
         message = Message(
@@ -162,6 +253,8 @@ class Repository:
             thread_ts=thread_ts,
             subtype=subtype,
             raw_json=raw_json,
+            features=features,
+            mentioned_user_ids=mentioned_user_ids,
             created_at=created_at or dt.datetime.now(dt.timezone.utc),
         )
         self.session.add(message)
@@ -198,6 +291,76 @@ class Repository:
             .values(is_deleted=True)
         )
 
+    def bulk_upsert_messages(self, rows: Sequence[Dict[str, Any]]) -> int:
+        """Insert-or-update many messages in one statement keyed on (team, channel, ts).
+
+        Mirrors ``upsert_message``: an existing row keeps its author and created_at and
+        takes the new text/thread/subtype/raw_json/is_deleted values and features.
+        """
+        if not rows:
+            return 0
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(Message)
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(Message)
+        else:
+            for row in rows:
+                message = self.upsert_message(**{k: v for k, v in row.items() if k != "is_deleted"})
+                message.is_deleted = bool(row.get("is_deleted"))
+            return len(rows)
+
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Message.team_id, Message.channel_id, Message.slack_ts],
+            set_={
+                col: getattr(stmt.excluded, col)
+                for col in (
+                    "text",
+                    "thread_ts",
+                    "subtype",
+                    "raw_json",
+                    "is_deleted",
+                    "features",
+                    "mentioned_user_ids",
+                )
+            },
+        )
+        now = dt.datetime.now(dt.timezone.utc)
+        params = []
+        for row in rows:
+            params.append(
+                {
+                    **row,
+                    "created_at": row.get("created_at") or now,
+                    "is_deleted": bool(row.get("is_deleted")),
+                    "features": row.get("features"),
+                    "mentioned_user_ids": row.get("mentioned_user_ids"),
+                }
+            )
+        self.session.execute(stmt, params)
+        return len(params)
+
+    def mark_messages_deleted(self, keys: Sequence[Tuple[str, str, str]]) -> None:
+        """Bulk variant of ``mark_message_deleted`` for (team_id, channel_id, slack_ts) keys."""
+        if not keys:
+            return
+        table = Message.__table__
+        stmt = (
+            table.update()
+            .where(
+                and_(
+                    table.c.team_id == bindparam("b_team_id"),
+                    table.c.channel_id == bindparam("b_channel_id"),
+                    table.c.slack_ts == bindparam("b_slack_ts"),
+                )
+            )
+            .values(is_deleted=True)
+        )
+        self.session.execute(
+            stmt,
+            [{"b_team_id": t, "b_channel_id": c, "b_slack_ts": ts} for t, c, ts in keys],
+        )
+
     def fetch_messages_for_user(
         self,
         team_id: str,
@@ -227,8 +390,396 @@ class Repository:
             self.session.execute(stmt.order_by(Message.created_at.asc())).scalars().all()
         )
 
+    def stream_messages_for_user(
+        self,
+        team_id: str,
+        user_id: str,
+        since: dt.datetime,
+        until: Optional[dt.datetime] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[DigestMessage]:
+        """Yield digest columns for the user's tracked channels, by (created_at, id).
+
+        Unlike ``fetch_messages_for_user`` this skips ORM objects and ``raw_json`` and
+        reads keyset pages of ``batch_size`` rows, each resuming after the last
+        (created_at, id) seen, so every page is a range read on
+        ``ix_messages_team_channel_created_live`` and no cursor stays open between
+        pages; consume it while the session is open.
+        """
+        channel_ids = [
+            row[0]
+            for row in self.session.execute(
+                select(ChannelSubscription.channel_id)
+                .join(User, ChannelSubscription.user_id == User.id)
+                .where(
+                    and_(
+                        User.team_id == team_id,
+                        User.user_id == user_id,
+                        ChannelSubscription.enabled.is_(True),
+                    )
+                )
+            )
+        ]
+        if not channel_ids:
+            return
+
+        stmt = (
+            _digest_columns()
+            .add_columns(Message.created_at, Message.id)
+            .where(
+                and_(
+                    Message.team_id == team_id,
+                    Message.channel_id.in_(channel_ids),
+                    Message.created_at >= since,
+                    Message.is_deleted.is_(False),
+                )
+            )
+        )
+        if until:
+            stmt = stmt.where(Message.created_at < until)
+        stmt = stmt.order_by(Message.created_at.asc(), Message.id.asc()).limit(batch_size)
+        page = stmt
+        while True:
+            rows = self.session.execute(page).all()
+            for row in rows:
+                yield DigestMessage(*row[:-2])
+            if len(rows) < batch_size:
+                return
+            last_created_at, last_id = rows[-1][-2:]
+            page = stmt.where(
+                tuple_(Message.created_at, Message.id) > tuple_(last_created_at, last_id)
+            )
+
+    def stream_channel_messages(
+        self,
+        team_id: str,
+        channel_id: str,
+        since: dt.datetime,
+        until: dt.datetime,
+        batch_size: int = 1000,
+    ) -> Iterator[DigestMessage]:
+        stmt = (
+            _digest_columns()
+            .where(
+                and_(
+                    Message.team_id == team_id,
+                    Message.channel_id == channel_id,
+                    Message.created_at >= since,
+                    Message.created_at < until,
+                    Message.is_deleted.is_(False),
+                )
+            )
+            .order_by(Message.created_at.asc())
+            .execution_options(yield_per=batch_size)
+        )
+        for row in self.session.execute(stmt):
+            yield DigestMessage(*row)
+
     def cleanup_old_messages(self, before: dt.datetime) -> int:
+        """Delete everything older than ``before`` in one statement per table.
+
+        Fine for small tables; the scheduled job uses ``storage.retention`` instead.
+        """
         result = self.session.execute(
             Message.__table__.delete().where(Message.created_at < before)
         )
+        self.cleanup_derived_rows(before)
+        return result.rowcount or 0
+
+    def message_id_bounds(self) -> Optional[Tuple[int, int]]:
+        low, high = self.session.execute(select(func.min(Message.id), func.max(Message.id))).one()
+        return None if low is None else (low, high)
+
+    def delete_messages_in_id_range(self, start_id: int, end_id: int, before: dt.datetime) -> int:
+        """Delete messages with ``start_id <= id < end_id`` created before ``before``."""
+        result = self.session.execute(
+            Message.__table__.delete().where(
+                Message.id >= start_id, Message.id < end_id, Message.created_at < before
+            )
+        )
         return result.rowcount or 0
+
+    def first_message_from(self, start_id: int) -> Optional[Tuple[int, dt.datetime]]:
+        """``(id, created_at)`` of the lowest message id at or above ``start_id``."""
+        row = self.session.execute(
+            select(Message.id, Message.created_at)
+            .where(Message.id >= start_id)
+            .order_by(Message.id)
+            .limit(1)
+        ).first()
+        return None if row is None else (row[0], row[1])
+
+    def cleanup_derived_rows(self, before: dt.datetime) -> None:
+        """Drop partial summaries and prepared digests older than ``before``."""
+        self.session.execute(
+            ChannelPartialSummary.__table__.delete().where(
+                ChannelPartialSummary.bucket_end < before
+            )
+        )
+        self.session.execute(
+            PreparedDigest.__table__.delete().where(PreparedDigest.scheduled_for < before)
+        )
+
+    # Rolling channel summaries -------------------------------------------
+    def partial_summaries(
+        self, team_id: str, channel_id: str, bucket_starts: Sequence[dt.datetime]
+    ) -> Dict[dt.datetime, Tuple[str, dict]]:
+        """Stored ``(content_hash, summary_json)`` per bucket start (UTC)."""
+        if not bucket_starts:
+            return {}
+        rows = self.session.execute(
+            select(
+                ChannelPartialSummary.bucket_start,
+                ChannelPartialSummary.content_hash,
+                ChannelPartialSummary.summary_json,
+            ).where(
+                and_(
+                    ChannelPartialSummary.team_id == team_id,
+                    ChannelPartialSummary.channel_id == channel_id,
+                    ChannelPartialSummary.bucket_start.in_(list(bucket_starts)),
+                )
+            )
+        )
+        return {_as_utc(start): (content_hash, summary) for start, content_hash, summary in rows}
+
+    def save_partial_summary(
+        self,
+        *,
+        team_id: str,
+        channel_id: str,
+        bucket_start: dt.datetime,
+        bucket_end: dt.datetime,
+        content_hash: str,
+        message_count: int,
+        summary: dict,
+    ) -> None:
+        row = (
+            self.session.execute(
+                select(ChannelPartialSummary).where(
+                    and_(
+                        ChannelPartialSummary.team_id == team_id,
+                        ChannelPartialSummary.channel_id == channel_id,
+                        ChannelPartialSummary.bucket_start == bucket_start,
+                    )
+                )
+            )
+            .scalars()
+            .first()
+        )
+        if row is None:
+            row = ChannelPartialSummary(
+                team_id=team_id, channel_id=channel_id, bucket_start=bucket_start
+            )
+            self.session.add(row)
+        row.bucket_end = bucket_end
+        row.content_hash = content_hash
+        row.message_count = message_count
+        row.summary_json = summary
+        self.session.flush()
+
+    # Prepared (batch) digests --------------------------------------------
+    def prepared_digest_users(self, scheduled_for: dt.datetime) -> Set[Tuple[str, str]]:
+        rows = self.session.execute(
+            select(PreparedDigest.team_id, PreparedDigest.user_id).where(
+                PreparedDigest.scheduled_for == scheduled_for
+            )
+        )
+        return {(team_id, user_id) for team_id, user_id in rows}
+
+    def add_prepared_digests(
+        self,
+        *,
+        batch_id: str,
+        scheduled_for: dt.datetime,
+        window_until: Mapping[Tuple[str, str], dt.datetime],
+    ) -> None:
+        self.session.add_all(
+            PreparedDigest(
+                team_id=team_id,
+                user_id=user_id,
+                scheduled_for=scheduled_for,
+                window_until=until,
+                batch_id=batch_id,
+                status="pending",
+            )
+            for (team_id, user_id), until in window_until.items()
+        )
+        self.session.flush()
+
+    def pending_digest_batches(self) -> List[str]:
+        rows = self.session.execute(
+            select(PreparedDigest.batch_id)
+            .where(PreparedDigest.status == "pending", PreparedDigest.batch_id.is_not(None))
+            .distinct()
+        )
+        return [row[0] for row in rows]
+
+    def pending_prepared_digests(self, batch_id: str) -> List[PreparedDigest]:
+        return list(
+            self.session.execute(
+                select(PreparedDigest).where(
+                    PreparedDigest.batch_id == batch_id, PreparedDigest.status == "pending"
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+    def claim_prepared_digest(
+        self, team_id: str, user_id: str, scheduled_for: dt.datetime
+    ) -> Optional[Tuple[dict, dt.datetime]]:
+        """Take a ready digest for delivery; a still-pending one is expired instead.
+
+        Returns ``(digest_json, window_until)`` or None when the caller must fall back
+        to the realtime path.
+        """
+        row = (
+            self.session.execute(
+                select(PreparedDigest).where(
+                    PreparedDigest.team_id == team_id,
+                    PreparedDigest.user_id == user_id,
+                    PreparedDigest.scheduled_for == scheduled_for,
+                )
+            )
+            .scalars()
+            .first()
+        )
+        if row is None:
+            return None
+        if row.status == "ready" and row.digest_json is not None:
+            row.status = "delivered"
+            return row.digest_json, _as_utc(row.window_until)
+        if row.status == "pending":
+            row.status = "expired"  # a late batch result is ignored
+        return None
+
+    # Channel directory ----------------------------------------------------
+    def channel_directory(self, team_id: str) -> List[Tuple[str, str, bool]]:
+        """Stored ``(channel_id, name, is_archived)`` rows of a team."""
+        rows = self.session.execute(
+            select(SlackChannel.channel_id, SlackChannel.name, SlackChannel.is_archived).where(
+                SlackChannel.team_id == team_id
+            )
+        )
+        return [(channel_id, name, bool(archived)) for channel_id, name, archived in rows]
+
+    def replace_channel_directory(
+        self, team_id: str, channels: Iterable[Tuple[str, str, bool]]
+    ) -> int:
+        """Replace a team's stored directory with a fresh ``conversations.list`` crawl."""
+        self.session.execute(SlackChannel.__table__.delete().where(SlackChannel.team_id == team_id))
+        rows = [
+            SlackChannel(team_id=team_id, channel_id=channel_id, name=name, is_archived=archived)
+            for channel_id, name, archived in channels
+        ]
+        self.session.add_all(rows)
+        self.session.flush()
+        return len(rows)
+
+    def upsert_slack_channel(
+        self,
+        team_id: str,
+        channel_id: str,
+        name: Optional[str] = None,
+        *,
+        is_archived: Optional[bool] = None,
+    ) -> Optional[Tuple[str, str, bool]]:
+        """Apply a channel event and return the stored row.
+
+        Unknown channels are only stored once a name is known.
+        """
+        row = (
+            self.session.execute(
+                select(SlackChannel).where(
+                    SlackChannel.team_id == team_id, SlackChannel.channel_id == channel_id
+                )
+            )
+            .scalars()
+            .first()
+        )
+        if row is None:
+            if name is None:
+                return None
+            row = SlackChannel(team_id=team_id, channel_id=channel_id, is_archived=False)
+            self.session.add(row)
+        if name is not None:
+            row.name = name
+        if is_archived is not None:
+            row.is_archived = is_archived
+        self.session.flush()
+        return row.channel_id, row.name, bool(row.is_archived)
+
+    def delete_slack_channel(self, team_id: str, channel_id: str) -> None:
+        self.session.execute(
+            SlackChannel.__table__.delete().where(
+                SlackChannel.team_id == team_id, SlackChannel.channel_id == channel_id
+            )
+        )
+
+    # LLM response cache ---------------------------------------------------
+    def cached_llm_response(self, cache_key: str, now: dt.datetime) -> Optional[dict]:
+        return self.session.execute(
+            select(LLMResponse.response_json).where(
+                LLMResponse.cache_key == cache_key, LLMResponse.expires_at > now
+            )
+        ).scalar()
+
+    def store_llm_response(
+        self, cache_key: str, purpose: str, response: dict, expires_at: dt.datetime
+    ) -> None:
+        row = (
+            self.session.execute(select(LLMResponse).where(LLMResponse.cache_key == cache_key))
+            .scalars()
+            .first()
+        )
+        if row is None:
+            row = LLMResponse(cache_key=cache_key)
+            self.session.add(row)
+        row.purpose = purpose
+        row.response_json = response
+        row.expires_at = expires_at
+        try:
+            self.session.flush()
+        except IntegrityError:
+            # Another worker cached the same request first; keep its answer.
+            self.session.rollback()
+
+    def prune_llm_responses(self, now: dt.datetime, max_entries: int) -> int:
+        """Delete expired cached responses and the oldest ones above ``max_entries``."""
+        deleted = (
+            self.session.execute(
+                LLMResponse.__table__.delete().where(LLMResponse.expires_at <= now)
+            ).rowcount
+            or 0
+        )
+        cutoff = self.session.execute(
+            select(LLMResponse.id).order_by(LLMResponse.id.desc()).offset(max_entries).limit(1)
+        ).scalar()
+        if cutoff is not None:
+            deleted += (
+                self.session.execute(
+                    LLMResponse.__table__.delete().where(LLMResponse.id <= cutoff)
+                ).rowcount
+                or 0
+            )
+        return deleted
+
+    def llm_response_count(self) -> int:
+        return self.session.execute(select(func.count(LLMResponse.id))).scalar() or 0
+
+
+def _digest_columns():
+    return select(
+        Message.channel_id,
+        Message.slack_ts,
+        Message.user_id,
+        Message.text,
+        Message.thread_ts,
+        Message.features,
+        Message.mentioned_user_ids,
+    )
+
+
+def _as_utc(moment: dt.datetime) -> dt.datetime:
+    # SQLite returns naive datetimes even for timezone-aware columns.
+    return moment if moment.tzinfo else moment.replace(tzinfo=dt.timezone.utc)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import re
+import time
+from contextlib import AbstractContextManager
+from typing import Callable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.storage.db import session_scope
+from slack_digest_bot.storage.repo import Repository
+
+log = logging.getLogger(__name__)
+
+SessionFactory = Callable[[], AbstractContextManager[Session]]
+
+# "FOR VALUES FROM ('2026-01-01 00:00:00+00') TO ('2026-01-02 00:00:00+00')"
+_RANGE_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def _as_utc(moment: dt.datetime) -> dt.datetime:
+    return moment if moment.tzinfo else moment.replace(tzinfo=dt.timezone.utc)
+
+
+def _parse_bound(value: str) -> dt.datetime:
+    if re.search(r"[+-]\d\d$", value):  # Postgres prints "+00"; fromisoformat wants "+00:00"
+        value += ":00"
+    return _as_utc(dt.datetime.fromisoformat(value))
+
+
+class MessageRetention:
+    """Deletes expired messages in bounded id-range batches, one transaction each.
+
+    Message ids follow insertion order, and ``created_at`` defaults to insert time,
+    so id order matches ``created_at`` order; the walk relies on that, starting at
+    the lowest id and stopping at the first batch boundary whose message is newer
+    than the cutoff. Rows written with an explicit, older ``created_at`` (backfills)
+    break the assumption and may outlive the cutoff until a later run reaches them.
+    Each batch deletes at most ``batch_size`` ids' worth of rows and commits before
+    a ``pause_seconds`` sleep, so locks are short and ingest and vacuum keep up
+    between batches.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 5000,
+        pause_seconds: float = 0.1,
+        session_factory: SessionFactory = session_scope,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.session_factory = session_factory
+        self._sleep = sleep
+        self._deleted = metrics.counter("retention.messages_deleted")
+        self._batch_ms = metrics.histogram("retention.batch_ms")
+
+    def run(self, before: dt.datetime) -> int:
+        with self.session_factory() as session:
+            bounds = Repository(session).message_id_bounds()
+        deleted = 0
+        start_id = bounds[0] if bounds else None
+        while start_id is not None and start_id <= bounds[1]:
+            end_id = start_id + self.batch_size
+            started = time.perf_counter()
+            with self.session_factory() as session:
+                repo = Repository(session)
+                batch = repo.delete_messages_in_id_range(start_id, end_id, before)
+                following = repo.first_message_from(end_id)
+            self._batch_ms.observe((time.perf_counter() - started) * 1000)
+            self._deleted.inc(batch)
+            deleted += batch
+            if following is None or _as_utc(following[1]) >= before:
+                break
+            start_id = following[0]  # skip id gaps left by earlier runs
+            self._sleep(self.pause_seconds)
+
+        with self.session_factory() as session:
+            Repository(session).cleanup_derived_rows(before)
+        return deleted
+
+
+def expired_partitions(conn: Connection, before: dt.datetime) -> List[Tuple[str, dt.datetime]]:
+    """Postgres range partitions of ``messages`` whose upper bound is at or before ``before``.
+
+    Empty unless ``messages`` is a table partitioned on ``created_at``; the
+    application schema does not create that layout, but retention honours it.
+    """
+    if conn.dialect.name != "postgresql":
+        return []
+    rows = conn.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'messages'::regclass"
+        )
+    ).all()
+    expired = []
+    for name, bound in rows:
+        match = _RANGE_BOUND.search(bound or "")
+        if match is None:  # DEFAULT partition
+            continue
+        upper = _parse_bound(match.group(1))
+        if upper <= before:
+            expired.append((name, upper))
+    return sorted(expired, key=lambda item: item[1])
+
+
+def drop_expired_partitions(conn: Connection, before: dt.datetime) -> List[str]:
+    """Detach and drop expired ``messages`` partitions; returns their names.
+
+    ``conn`` must be in autocommit mode: ``DETACH ... CONCURRENTLY`` cannot run in
+    a transaction block, and it only waits for queries on that partition.
+    """
+    dropped = []
+    for name, _ in expired_partitions(conn, before):
+        conn.execute(text(f'ALTER TABLE messages DETACH PARTITION "{name}" CONCURRENTLY'))
+        conn.execute(text(f'DROP TABLE "{name}"'))
+        log.info("Dropped expired messages partition %s", name)
+        dropped.append(name)
+    return dropped
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+log = logging.getLogger(__name__)
+
+# (team_id, user_id, timezone, digest_time_local); a time of None means the user is gone.
+ScheduleChange = Tuple[str, str, Optional[str], Optional[str]]
+ScheduleListener = Callable[[ScheduleChange], None]
+
+_PENDING_KEY = "schedule_changes"
+
+
+class ScheduleChangeFeed:
+    """Publishes digest schedule changes once the transaction that wrote them commits.
+
+    Repository writes record changes on their session; listeners (the digest
+    scheduler's index) only hear about them after commit, and a rollback drops them.
+    """
+
+    def __init__(self) -> None:
+        self._listeners: List[ScheduleListener] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: ScheduleListener) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: ScheduleListener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def record(
+        self,
+        session: Session,
+        team_id: str,
+        user_id: str,
+        timezone: Optional[str],
+        time_local: Optional[str],
+    ) -> None:
+        session.info.setdefault(_PENDING_KEY, []).append((team_id, user_id, timezone, time_local))
+
+    def publish(self, session: Session) -> None:
+        changes = session.info.pop(_PENDING_KEY, None)
+        if not changes:
+            return
+        with self._lock:
+            listeners = list(self._listeners)
+        for change in changes:
+            for listener in listeners:
+                try:
+                    listener(change)
+                except Exception:
+                    log.exception("Schedule listener failed for %s/%s", change[0], change[1])
+
+    def discard(self, session: Session) -> None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+schedule_changes = ScheduleChangeFeed()
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session) -> None:
+    schedule_changes.publish(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    schedule_changes.discard(session)
@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from slack_digest_bot.storage import db
+from slack_digest_bot.storage.db import Base
+
+
+@pytest.fixture
+def db_engine():
+    """In-memory SQLite with the full schema, one connection shared across threads."""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(db_engine):
+    return sessionmaker(bind=db_engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+def db_session(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def committed_sessions():
+    """Sessions committed through ``scoped_sessions``, in commit order."""
+    return []
+
+
+@pytest.fixture
+def scoped_sessions(session_factory, committed_sessions):
+    """A ``session_scope``-style factory bound to the test database."""
+
+    @contextmanager
+    def scope():
+        session = session_factory()
+        try:
+            yield session
+            session.commit()
+            committed_sessions.append(session)
+        finally:
+            session.close()
+
+    return scope
+
+
+@pytest.fixture
+def inmemory_db(monkeypatch, db_engine, session_factory):
+    """Points ``storage.db`` (and so ``session_scope``) at the test database."""
+    monkeypatch.setattr(db, "engine", db_engine)
+    monkeypatch.setattr(db, "SessionLocal", session_factory)
+    return session_factory
@@ -0,0 +1,85 @@
+import datetime as dt
+
+import pytest
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.digest import delivery as delivery_mod
+from slack_digest_bot.digest import engine as engine_mod
+from slack_digest_bot.digest.batch import BatchBackend, DigestBatchPlanner
+from slack_digest_bot.digest.engine import DigestEngine, DigestJob
+from slack_digest_bot.digest.schedule_index import ScheduleIndex
+from slack_digest_bot.digest.summary_cache import ChannelSummaryCache
+from slack_digest_bot.storage import db
+from slack_digest_bot.storage.repo import Repository
+
+
+class FakeBackend(BatchBackend):
+    def __init__(self, answer_for):
+        self.answer_for = answer_for
+        self.submitted = {}
+
+    def submit(self, requests):
+        self.submitted.update(requests)
+        return "batch-1"
+
+    def poll(self, batch_id):
+        return {
+            cid: '{"overview": "batched"}'
+            for cid, request in self.submitted.items()
+            if request["user"] in self.answer_for
+        }
+
+
+@pytest.mark.usefixtures("inmemory_db")
+def test_prepared_digests_are_delivered_and_missing_ones_fall_back(monkeypatch):
+    with db.session_scope() as session:
+        for user_id in ("U1", "U2"):
+            Repository(session).get_or_create_user("T1", user_id)
+
+    monkeypatch.setattr(
+        engine_mod, "build_digest_request", lambda **kwargs: {"user": kwargs["user_id"]}
+    )
+    monkeypatch.setattr(engine_mod, "generate_digest", lambda **kwargs: {"overview": "realtime"})
+    delivered = {}
+    monkeypatch.setattr(
+        delivery_mod,
+        "deliver_rendered",
+        lambda client, team_id, user_id, text, blocks: delivered.__setitem__(
+            user_id, blocks[0]["text"]["text"]
+        ),
+    )
+
+    now = dt.datetime.now(dt.timezone.utc)
+    slot = (now + dt.timedelta(hours=1)).strftime("%H:%M")
+    index = ScheduleIndex()
+    for user_id in ("U1", "U2"):
+        index.upsert("T1", user_id, "UTC", slot, now=now)
+    digest_engine = DigestEngine(
+        slack_client=None,
+        workers=2,
+        db_concurrency=1,
+        slack_posts_per_second=100,
+        summary_cache=ChannelSummaryCache(),
+        use_prepared=True,
+    )
+    planner = DigestBatchPlanner(digest_engine, index, FakeBackend(answer_for={"U1"}))
+
+    gaps_before = metrics.histogram("digest.batch.window_gap_minutes").count
+    assert planner.prepare(now) == 2
+    assert planner.prepare(now) == 0  # already prepared for this slot
+    assert planner.poll() == 1
+
+    ((scheduled_for, users),) = index.due_between(now, now + dt.timedelta(hours=2))
+    report = digest_engine.run_slot([DigestJob(t, u, scheduled_for) for t, u in users])
+    digest_engine.shutdown()
+
+    assert report.succeeded == 2
+    assert delivered == {"U1": "*Overview*\nbatched", "U2": "*Overview*\nrealtime"}
+    # The prepared window ended at build time, an hour before the slot; the gap is
+    # recorded and the rest of the hour opens U1's next digest.
+    gap = metrics.histogram("digest.batch.window_gap_minutes")
+    assert gap.count - gaps_before == 1
+    assert 59 <= gap.percentile(100) <= 61
+    with db.session_scope() as session:
+        sent = Repository(session).get_user_with_prefs("T1", "U1").last_digest_sent_at
+    assert sent.replace(tzinfo=dt.timezone.utc) < scheduled_for - dt.timedelta(minutes=59)
@@ -0,0 +1,52 @@
+import pytest
+
+from slack_digest_bot.slack.channel_directory import ChannelDirectory
+from slack_digest_bot.slack.handlers_events import _apply_channel_event
+
+
+class Crawler:
+    def __init__(self, channels):
+        self.channels = channels
+        self.calls = 0
+
+    def __call__(self, team_id):
+        self.calls += 1
+        return list(self.channels)
+
+
+@pytest.mark.usefixtures("inmemory_db")
+def test_directory_crawls_once_and_survives_restarts():
+    crawler = Crawler([("C00000001", "general", False), ("C00000002", "random", False)])
+    directory = ChannelDirectory(crawl=crawler)
+
+    assert directory.resolve("T1", "#general") == "C00000001"
+    assert directory.resolve("T1", "random") == "C00000002"
+    assert directory.resolve("T1", "C00000009") == "C00000009"
+    assert crawler.calls == 1
+
+    restarted = ChannelDirectory(crawl=crawler, miss_recrawl_seconds=3600)
+    assert restarted.resolve("T1", "#general") == "C00000001"
+    assert crawler.calls == 1  # loaded from the database
+
+
+@pytest.mark.usefixtures("inmemory_db")
+def test_channel_events_update_the_directory():
+    crawler = Crawler([("C00000001", "general", False)])
+    directory = ChannelDirectory(crawl=crawler, miss_recrawl_seconds=3600)
+
+    events = [
+        {"type": "channel_created", "channel": {"id": "C00000003", "name": "launch"}},
+        {"type": "channel_rename", "channel": {"id": "C00000001", "name": "announcements"}},
+        {"type": "channel_archive", "channel": "C00000003"},
+    ]
+    for event in events:
+        _apply_channel_event(directory, "T1", event)
+
+    assert directory.resolve("T1", "#announcements") == "C00000001"
+    assert directory.resolve("T1", "#general") is None
+    assert directory.resolve("T1", "#launch") is None
+
+    _apply_channel_event(directory, "T1", {"type": "channel_unarchive", "channel": "C00000003"})
+    reloaded = ChannelDirectory(crawl=crawler, miss_recrawl_seconds=3600)
+    assert reloaded.resolve("T1", "#launch") == "C00000003"
+    assert crawler.calls == 1
@@ -0,0 +1,62 @@
+from slack_digest_bot.storage import channel_index
+from slack_digest_bot.storage.channel_index import TrackedChannelIndex
+from slack_digest_bot.storage.repo import Repository
+
+
+class CountingLoader:
+    def __init__(self, channels):
+        self.channels = channels
+        self.calls = 0
+
+    def __call__(self, team_id: str):
+        self.calls += 1
+        return list(self.channels.get(team_id, []))
+
+
+def test_lookups_are_served_from_memory_until_ttl():
+    loader = CountingLoader({"T1": ["C1"]})
+    index = TrackedChannelIndex(ttl_seconds=60, loader=loader)
+
+    assert index.is_tracked("T1", "C1")
+    assert not index.is_tracked("T1", "C2")
+    assert loader.calls == 1
+
+    expired = TrackedChannelIndex(ttl_seconds=0, loader=loader)
+    expired.is_tracked("T1", "C1")
+    expired.is_tracked("T1", "C1")
+    assert loader.calls == 3
+
+
+def test_add_patches_loaded_team_and_invalidate_forces_reload():
+    loader = CountingLoader({"T1": ["C1"]})
+    index = TrackedChannelIndex(ttl_seconds=60, loader=loader)
+    index.is_tracked("T1", "C1")
+
+    index.add("T1", ["C2"])
+    assert index.is_tracked("T1", "C2")
+    assert loader.calls == 1
+
+    loader.channels["T1"] = []
+    index.invalidate("T1")
+    assert not index.is_tracked("T1", "C1")
+    assert loader.calls == 2
+
+
+def test_repository_changes_reach_the_index_only_on_commit(monkeypatch, db_session):
+    loader = CountingLoader({"T1": ["C1"]})
+    index = TrackedChannelIndex(ttl_seconds=60, loader=loader)
+    monkeypatch.setattr(channel_index, "tracked_channels", index)
+    repo = Repository(db_session)
+    user = repo.get_or_create_user("T1", "U1")
+    db_session.commit()
+    index.is_tracked("T1", "C1")
+
+    repo.add_channels(user, ["C2"])
+    assert not index.is_tracked("T1", "C2")  # flushed, not committed
+    db_session.rollback()
+    assert not index.is_tracked("T1", "C2")
+    assert loader.calls == 1
+
+    repo.add_channels(repo.get_or_create_user("T1", "U1"), ["C3"])
+    db_session.commit()
+    assert index.is_tracked("T1", "C3")
@@ -0,0 +1,21 @@
+from sqlalchemy import text
+
+from slack_digest_bot.storage.db import get_engine
+
+
+def test_sqlite_engine_applies_pragmas(tmp_path):
+    engine = get_engine(f"sqlite:///{tmp_path / 'digest.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA mmap_size")).scalar() > 0
+    engine.dispose()
+
+
+def test_postgres_engine_uses_pool_settings():
+    engine = get_engine("postgresql+psycopg://digest@localhost/digest")
+    assert engine.pool.size() == 10
+    assert engine.pool._max_overflow == 10
+    assert engine.pool._pre_ping is True
+    assert engine.pool._recycle == 1800
@@ -0,0 +1,93 @@
+import datetime as dt
+import threading
+import time
+from concurrent.futures import wait
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+from slack_digest_bot.digest import delivery as delivery_mod
+from slack_digest_bot.digest.delivery import DeliveryPool, RenderedDigest, deliver_rendered
+from slack_digest_bot.slack.dm_channels import DMChannelCache
+from slack_digest_bot.storage import db
+from slack_digest_bot.storage.repo import Repository
+
+
+class FakeSlackClient:
+    def __init__(self, closed=()):
+        self.opened = 0
+        self.posts = []
+        self.closed = set(closed)
+        self.dm_channels = DMChannelCache(open_dm=self.open_dm)
+
+    def open_dm(self, user_id):
+        self.opened += 1
+        return f"D{self.opened}"
+
+    def dm_channel_id(self, team_id, user_id):
+        return self.dm_channels.get(team_id, user_id)
+
+    def post_message(self, channel, text, blocks=None, priority=None):
+        if channel in self.closed:
+            raise SlackApiError("closed", {"ok": False, "error": "channel_not_found"})
+        self.posts.append(channel)
+
+
+@pytest.mark.usefixtures("inmemory_db")
+def test_dm_channel_is_opened_once_and_persisted():
+    with db.session_scope() as session:
+        Repository(session).get_or_create_user("T1", "U1")
+
+    client = FakeSlackClient()
+    deliver_rendered(client, "T1", "U1", "digest", [])
+    deliver_rendered(client, "T1", "U1", "digest", [])
+    assert client.opened == 1
+
+    restarted = FakeSlackClient()
+    deliver_rendered(restarted, "T1", "U1", "digest", [])
+    assert restarted.opened == 0
+    assert restarted.posts == ["D1"]
+
+
+@pytest.mark.usefixtures("inmemory_db")
+def test_channel_not_found_reopens_the_dm():
+    with db.session_scope() as session:
+        Repository(session).get_or_create_user("T1", "U1")
+    client = FakeSlackClient(closed={"D1"})
+
+    deliver_rendered(client, "T1", "U1", "digest", [])
+
+    assert client.posts == ["D2"]
+    with db.session_scope() as session:
+        assert Repository(session).dm_channel_id("T1", "U1") == "D2"
+
+
+@pytest.mark.usefixtures("inmemory_db")
+def test_delivery_pool_posts_concurrently_and_records_results(monkeypatch):
+    with db.session_scope() as session:
+        for idx in range(8):
+            Repository(session).get_or_create_user("T1", f"U{idx}")
+
+    def slow_post(client, team_id, user_id, text, blocks):
+        time.sleep(0.05)
+        if user_id == "U7":
+            raise RuntimeError("slack down")
+
+    monkeypatch.setattr(delivery_mod, "deliver_rendered", slow_post)
+    pool = DeliveryPool(None, workers=4, posts_per_second=100, db_slots=threading.Semaphore(1))
+    until = dt.datetime(2026, 1, 1, 9, tzinfo=dt.timezone.utc)
+
+    started = time.monotonic()
+    futures = [
+        pool.submit(RenderedDigest("T1", f"U{idx}", until, until, "digest")) for idx in range(8)
+    ]
+    wait(futures)
+    elapsed = time.monotonic() - started
+    pool.close()
+
+    assert elapsed < 0.3  # 8 x 50ms posts on 4 workers
+    assert [f.exception() is None for f in futures] == [True] * 7 + [False]
+    with db.session_scope() as session:
+        repo = Repository(session)
+        assert repo.get_user_with_prefs("T1", "U0").last_digest_sent_at is not None
+        assert repo.get_user_with_prefs("T1", "U7").last_digest_sent_at is None
@@ -0,0 +1,115 @@
+import datetime as dt
+import threading
+import time
+
+import pytest
+
+from slack_digest_bot.digest import delivery as delivery_mod
+from slack_digest_bot.digest import engine as engine_mod
+from slack_digest_bot.digest.engine import DigestEngine, DigestJob
+from slack_digest_bot.digest.summary_cache import ChannelSummaryCache
+from slack_digest_bot.storage import db
+from slack_digest_bot.storage.repo import Repository
+
+
+class PeakTracker:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return {"overview": "ok"}
+
+
+@pytest.mark.usefixtures("inmemory_db")
+def test_run_slot_caps_llm_concurrency_and_records_delivery(monkeypatch):
+    with db.session_scope() as session:
+        repo = Repository(session)
+        for idx in range(6):
+            repo.get_or_create_user("T1", f"U{idx}")
+
+    tracker = PeakTracker()
+    delivered = []
+    monkeypatch.setattr(engine_mod, "generate_digest", tracker)
+    monkeypatch.setattr(
+        delivery_mod,
+        "deliver_rendered",
+        lambda client, team_id, user_id, text, blocks: delivered.append(user_id),
+    )
+
+    digest_engine = DigestEngine(
+        slack_client=None,
+        workers=6,
+        db_concurrency=1,  # the shared in-memory connection is not concurrent
+        llm_concurrency=2,
+        slack_posts_per_second=100,
+        summary_cache=ChannelSummaryCache(),
+    )
+    scheduled_for = dt.datetime.now(dt.timezone.utc)
+    report = digest_engine.run_slot([DigestJob("T1", f"U{idx}", scheduled_for) for idx in range(6)])
+    digest_engine.shutdown()
+
+    assert report.succeeded == 6
+    assert tracker.peak <= 2
+    assert sorted(delivered) == [f"U{idx}" for idx in range(6)]
+    assert report.stage_throughput["deliver"] > 0
+    with db.session_scope() as session:
+        user = Repository(session).get_user_with_prefs("T1", "U0")
+        assert user.last_digest_sent_at is not None
+
+
+@pytest.mark.usefixtures("inmemory_db")
+def test_channel_summary_is_shared_between_users(monkeypatch):
+    with db.session_scope() as session:
+        repo = Repository(session)
+        for user_id in ("U1", "U2", "U3"):
+            repo.add_channels(repo.get_or_create_user("T1", user_id), ["C1"])
+        repo.upsert_message(
+            team_id="T1",
+            channel_id="C1",
+            slack_ts="1.0",
+            user_id="U9",
+            text="ship it",
+            thread_ts=None,
+            subtype=None,
+        )
+
+    summarized = []
+    personalised = []
+    monkeypatch.setattr(
+        engine_mod,
+        "summarize_channel",
+        lambda channel_id, msgs: summarized.append(channel_id) or {"summary": "shipped"},
+    )
+    monkeypatch.setattr(
+        engine_mod,
+        "generate_digest",
+        lambda **kwargs: personalised.append(kwargs["channel_summaries"]) or {},
+    )
+    monkeypatch.setattr(delivery_mod, "deliver_rendered", lambda *args: None)
+
+    cache = ChannelSummaryCache()
+    digest_engine = DigestEngine(
+        slack_client=None,
+        workers=3,
+        db_concurrency=1,
+        slack_posts_per_second=100,
+        summary_cache=cache,
+    )
+    scheduled_for = dt.datetime.now(dt.timezone.utc)
+    report = digest_engine.run_slot(
+        [DigestJob("T1", user_id, scheduled_for) for user_id in ("U1", "U2", "U3")]
+    )
+    digest_engine.shutdown()
+
+    assert report.succeeded == 3
+    assert summarized == ["C1"]
+    assert personalised == [[{"summary": "shipped", "channel_id": "C1"}]] * 3
+    assert cache.stats()["hits"] == 2
@@ -0,0 +1,103 @@
+import json
+import threading
+
+import pytest
+from slack_bolt import App
+from slack_bolt.authorization import AuthorizeResult
+from slack_bolt.request import BoltRequest
+
+from slack_digest_bot.slack import handlers_events
+from slack_digest_bot.slack.event_queue import (
+    EventQueueFullError,
+    EventWorkerPool,
+    retry_num_from_request,
+)
+
+
+def test_pool_processes_events_once_per_event_id():
+    seen = []
+    pool = EventWorkerPool("test-dedup", workers=2)
+    pool.start()
+
+    assert pool.submit(seen.append, "a", event_id="Ev1")
+    assert not pool.submit(seen.append, "a-retry", event_id="Ev1", retry_num=1)
+    assert pool.submit(seen.append, "b", event_id="Ev2")
+    pool.join()
+    pool.close()
+
+    assert sorted(seen) == ["a", "b"]
+
+
+def test_full_queue_rejects_and_allows_later_retry():
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait()
+
+    pool = EventWorkerPool("test-backpressure", workers=1, max_queue=1, put_timeout=0.01)
+    pool.start()
+
+    assert pool.submit(block, event_id="Ev1")
+    started.wait()
+    assert pool.submit(lambda: None, event_id="Ev2")  # fills the queue
+    with pytest.raises(EventQueueFullError):
+        pool.submit(lambda: None, event_id="Ev3")
+    release.set()
+    pool.join()
+
+    assert pool.submit(lambda: None, event_id="Ev3", retry_num=1)
+    pool.join()
+    pool.close()
+
+
+def test_retry_num_from_request_header():
+    request = BoltRequest(body="{}", headers={"X-Slack-Retry-Num": "2"})
+    assert retry_num_from_request(request) == 2
+    assert retry_num_from_request(BoltRequest(body="{}")) == 0
+
+
+def message_request(event_id, retry_num=None):
+    body = {
+        "type": "event_callback",
+        "team_id": "T1",
+        "event_id": event_id,
+        "event": {"type": "message", "channel": "C1", "user": "U1", "text": "hi", "ts": "1.0"},
+    }
+    headers = {"content-type": "application/json"}
+    if retry_num is not None:
+        headers["x-slack-retry-num"] = str(retry_num)
+    return BoltRequest(body=json.dumps(body), headers=headers)
+
+
+def test_event_refused_by_full_queue_is_not_acked_and_survives_redelivery(monkeypatch):
+    """A full queue answers 503 instead of the ack, so Slack's retry still gets processed."""
+    stored = []
+    monkeypatch.setattr(handlers_events.tracked_channels, "is_tracked", lambda team, ch: True)
+    monkeypatch.setattr(
+        handlers_events, "_persist_event", lambda buffer, team, ch, event: stored.append(event)
+    )
+    app = App(
+        signing_secret="secret",
+        authorize=lambda **kwargs: AuthorizeResult(
+            enterprise_id=None, team_id="T1", bot_token="xoxb-test", bot_user_id="UBOT"
+        ),
+        request_verification_enabled=False,
+        process_before_response=True,
+    )
+    pool = EventWorkerPool("test-nack", workers=1, max_queue=1, put_timeout=0.01)
+    handlers_events.register_message_handlers(app, worker_pool=pool)
+    started, release = threading.Event(), threading.Event()
+    pool.start()
+    pool.submit(lambda: (started.set(), release.wait()), event_id="EvBusy")
+    started.wait()
+    pool.submit(lambda: None, event_id="EvFill")
+
+    assert app.dispatch(message_request("Ev1")).status == 503
+    release.set()
+    pool.join()
+    assert app.dispatch(message_request("Ev1", retry_num=1)).status == 200
+    pool.join()
+    pool.close()
+
+    assert [event["text"] for event in stored] == ["hi"]
@@ -0,0 +1,38 @@
+import pytest
+
+from slack_digest_bot.nl.fast_path import parse_command
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("list", [("list_configuration", {})]),
+        ("What am I tracking?", [("list_configuration", {})]),
+        (
+            "add #foo, #Bar and <#C0123ABCD|ops>",
+            [("add_channels", {"channels": ["#foo", "#bar", "C0123ABCD"]})],
+        ),
+        ("untrack <#C0123ABCD|ops>", [("remove_channels", {"channels": ["C0123ABCD"]})]),
+        ("set time 08:30", [("set_digest_time", {"time_local": "08:30"})]),
+        ("set digest time to 5:15pm", [("set_digest_time", {"time_local": "17:15"})]),
+        ("max channels 20", [("set_max_channels", {"max_channels": 20})]),
+        ("disable broadcasts", [("set_preferences", {"include_broadcasts": False})]),
+    ],
+)
+def test_common_commands_are_parsed_locally(text, expected):
+    assert parse_command(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "add the channel where we discuss releases",
+        "remove #foo",  # names need resolving; the LLM path handles it
+        "set time 8",
+        "set time 25:00",
+        "max channels 500",
+        "can you stop sending me broadcasts on fridays?",
+    ],
+)
+def test_ambiguous_text_falls_back_to_the_llm(text):
+    assert parse_command(text) is None
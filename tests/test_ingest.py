@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from slack_digest_bot.storage.ingest import MessageIngestBuffer
+from slack_digest_bot.storage.models import Message
+
+
+def enqueue(buffer, ts, text, user="U1"):
+    buffer.upsert_message(
+        team_id="T1",
+        channel_id="C1",
+        slack_ts=ts,
+        user_id=user,
+        text=text,
+        thread_ts=None,
+        subtype=None,
+    )
+
+
+def load(factory):
+    with factory() as session:
+        return {m.slack_ts: m for m in session.execute(select(Message)).scalars()}
+
+
+def test_flush_applies_edits_and_deletes_in_arrival_order(scoped_sessions):
+    buffer = MessageIngestBuffer(session_factory=scoped_sessions)
+
+    enqueue(buffer, "1.0", "first")
+    enqueue(buffer, "1.0", "first (edited)", user="U-ignored")
+    enqueue(buffer, "2.0", "doomed")
+    buffer.mark_message_deleted("T1", "C1", "2.0")
+    buffer.mark_message_deleted("T1", "C1", "3.0")
+    enqueue(buffer, "3.0", "restored")
+    assert buffer.flush() == 6
+
+    rows = load(scoped_sessions)
+    assert rows["1.0"].text == "first (edited)"
+    assert rows["1.0"].user_id == "U1"
+    assert rows["2.0"].is_deleted
+    assert not rows["3.0"].is_deleted
+
+
+def test_flush_upserts_on_conflict_and_soft_deletes_existing_rows(scoped_sessions):
+    buffer = MessageIngestBuffer(session_factory=scoped_sessions)
+    enqueue(buffer, "1.0", "original")
+    enqueue(buffer, "2.0", "keep")
+    buffer.flush()
+
+    enqueue(buffer, "1.0", "changed")
+    buffer.mark_message_deleted("T1", "C1", "2.0")
+    buffer.close()
+
+    rows = load(scoped_sessions)
+    assert len(rows) == 2
+    assert rows["1.0"].text == "changed"
+    assert rows["2.0"].is_deleted
+
+
+def test_bad_row_is_dead_lettered_without_blocking_the_batch(scoped_sessions):
+    buffer = MessageIngestBuffer(session_factory=scoped_sessions)
+    enqueue(buffer, "1.0", "before")
+    enqueue(buffer, None, "edit without ts")  # violates NOT NULL
+    enqueue(buffer, "2.0", "after")
+    buffer.mark_message_deleted("T1", "C1", "1.0")
+
+    assert buffer.flush() == 3
+    assert buffer.flush() == 0  # nothing was put back
+
+    rows = load(scoped_sessions)
+    assert sorted(rows) == ["1.0", "2.0"]
+    assert rows["1.0"].is_deleted
+    assert [op.key for op in buffer.dead_letters] == [("T1", "C1", None)]
+
+
+def test_transient_failures_are_retried_then_dead_lettered():
+    calls = []
+
+    @contextmanager
+    def unavailable():
+        calls.append(1)
+        raise OperationalError("connect", {}, Exception("database is down"))
+        yield
+
+    buffer = MessageIngestBuffer(session_factory=unavailable, max_attempts=2)
+    enqueue(buffer, "1.0", "hello")
+    assert buffer.flush() == 0
+    assert not buffer.dead_letters  # requeued after the first failure
+    assert buffer.flush() == 0
+    assert len(calls) == 2
+    assert [op.key for op in buffer.dead_letters] == [("T1", "C1", "1.0")]
+    assert buffer.flush() == 0
@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from slack_digest_bot.digest import llm_digest
+from slack_digest_bot.digest.preprocess import preprocess_messages
+from slack_digest_bot.llm.gateway import LLMGateway
+from slack_digest_bot.storage.models import DigestMessage
+
+CHUNK_DELAY = 0.3
+
+
+class StubOpenAI(BaseHTTPRequestHandler):
+    """Minimal /v1/chat/completions: slow chunk summaries, instant reduce calls."""
+
+    calls = []
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["content-length"])))
+        payload = json.loads(body["messages"][-1]["content"])
+        if "channel_summaries" in payload:
+            content = {"overview": f"{len(payload['channel_summaries'])} chunks"}
+        else:
+            cls = type(self)
+            with cls.lock:
+                cls.active += 1
+                cls.peak = max(cls.peak, cls.active)
+            time.sleep(CHUNK_DELAY)
+            with cls.lock:
+                cls.active -= 1
+            content = {"summary": f"{len(payload['messages'])} messages", "highlights": []}
+        type(self).calls.append(payload)
+        out = json.dumps(
+            {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": json.dumps(content)},
+                    }
+                ],
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_openai(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenAI)
+    StubOpenAI.calls, StubOpenAI.active, StubOpenAI.peak = [], 0, 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    gateway = LLMGateway(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setattr(llm_digest, "get_llm_gateway", lambda: gateway)
+    yield StubOpenAI
+    gateway.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_oversized_window_is_map_reduced_concurrently(stub_openai):
+    messages = [
+        DigestMessage(f"C{channel}", f"{channel * 100 + idx}.0", "U2", "status update " * 8, None)
+        for channel in range(4)
+        for idx in range(5)
+    ]
+
+    started = time.monotonic()
+    digest = llm_digest.generate_digest(
+        user_id="U1",
+        preprocessed=preprocess_messages(messages, "U1"),
+        messages=messages,
+        token_budget=250,
+    )
+    elapsed = time.monotonic() - started
+
+    map_calls = [call for call in stub_openai.calls if "channel_summaries" not in call]
+    assert len(map_calls) == 4
+    assert digest == {"overview": "4 chunks"}
+    assert stub_openai.peak > 1
+    assert elapsed < 4 * CHUNK_DELAY
+
+
+def test_small_window_uses_single_call(stub_openai):
+    messages = [DigestMessage("C1", "1.0", "U2", "hello", None)]
+    llm_digest.generate_digest(
+        user_id="U1", preprocessed=preprocess_messages(messages, "U1"), messages=messages
+    )
+    assert len(stub_openai.calls) == 1
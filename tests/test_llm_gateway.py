@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from slack_digest_bot.app.metrics import metrics
+from slack_digest_bot.llm import gateway as gateway_mod
+from slack_digest_bot.llm.gateway import LLMGateway
+
+
+class FlakyStub(BaseHTTPRequestHandler):
+    """Fails the first ``failures`` calls with 429, then answers after ``delay``."""
+
+    failures = 0
+    delay = 0.0
+    calls = 0
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        cls = type(self)
+        self.rfile.read(int(self.headers["content-length"]))
+        with cls.lock:
+            cls.calls += 1
+            fail = cls.calls <= cls.failures
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        time.sleep(cls.delay)
+        with cls.lock:
+            cls.active -= 1
+        if fail:
+            body = json.dumps({"error": {"message": "slow down", "type": "rate_limit"}})
+            status = 429
+        else:
+            body = json.dumps(
+                {
+                    "id": "stub",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": "m",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": "ok"},
+                        }
+                    ],
+                    "usage": {"prompt_tokens": 7, "completion_tokens": 1, "total_tokens": 8},
+                }
+            )
+            status = 200
+        out = body.encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url(monkeypatch):
+    monkeypatch.setattr(gateway_mod, "RETRY_BASE_SECONDS", 0.01)
+    FlakyStub.failures, FlakyStub.delay = 0, 0.0
+    FlakyStub.calls, FlakyStub.active, FlakyStub.peak = 0, 0, 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def test_retries_rate_limited_calls_and_records_usage(stub_url):
+    FlakyStub.failures = 2
+    gateway = LLMGateway(api_key="test", base_url=stub_url, max_retries=3)
+    retries_before = metrics.counter("llm.test.retries").value
+
+    response = gateway.chat("test", model="m", messages=[{"role": "user", "content": "hi"}])
+    gateway.close()
+
+    assert response.choices[0].message.content == "ok"
+    assert FlakyStub.calls == 3
+    assert metrics.counter("llm.test.retries").value - retries_before == 2
+    assert metrics.histogram("llm.test.prompt_tokens").percentile(50) == 7
+
+
+def test_concurrency_is_capped_by_the_semaphore(stub_url):
+    FlakyStub.delay = 0.05
+    gateway = LLMGateway(api_key="test", base_url=stub_url, max_concurrency=2)
+
+    futures = [
+        gateway.submit("test", model="m", messages=[{"role": "user", "content": str(idx)}])
+        for idx in range(6)
+    ]
+    for future in futures:
+        future.result()
+    gateway.close()
+
+    assert FlakyStub.calls == 6
+    assert FlakyStub.peak <= 2
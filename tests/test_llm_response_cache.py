@@ -0,0 +1,114 @@
+import datetime as dt
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from slack_digest_bot.llm.gateway import LLMGateway
+from slack_digest_bot.llm.response_cache import (
+    LLMResponseCache,
+    MemoryResponseCache,
+    SQLResponseCache,
+    request_key,
+)
+from slack_digest_bot.storage import db
+from slack_digest_bot.storage.db import Base
+from slack_digest_bot.storage.repo import Repository
+
+
+class CountingStub(BaseHTTPRequestHandler):
+    calls = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["content-length"])))
+        type(self).calls += 1
+        out = json.dumps(
+            {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": "you track #general"},
+                    }
+                ],
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+def ask(text):
+    return {"model": "m", "messages": [{"role": "user", "content": text}], "tools": None}
+
+
+def test_request_key_ignores_whitespace_and_unset_options():
+    assert request_key(ask("what am I  tracking?")) == request_key(
+        {"messages": [{"content": " what am I\ntracking? ", "role": "user"}], "model": "m"}
+    )
+    assert request_key(ask("what am I tracking?")) != request_key(ask("what am I tracking"))
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryResponseCache(max_entries=2)
+    backend.set("a", "nl", {"v": 1}, ttl_seconds=60)
+    backend.set("b", "nl", {"v": 2}, ttl_seconds=60)
+    backend.get("a")
+    backend.set("c", "nl", {"v": 3}, ttl_seconds=60)
+    assert backend.get("a") == {"v": 1}
+    assert backend.get("b") is None
+
+    backend.set("d", "nl", {"v": 4}, ttl_seconds=0)
+    assert backend.get("d") is None  # already expired
+
+
+def test_gateway_answers_repeated_requests_from_cache():
+    CountingStub.calls = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CountingStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cache = LLMResponseCache(MemoryResponseCache())
+    gateway = LLMGateway(
+        api_key="test", base_url=f"http://127.0.0.1:{server.server_port}/v1", response_cache=cache
+    )
+    try:
+        first = gateway.chat("nl", **ask("what am I tracking?"))
+        second = gateway.chat("nl", **ask("what am I   tracking?"))
+        gateway.chat("nl", cache=False, **ask("what am I tracking?"))
+    finally:
+        gateway.close()
+        server.shutdown()
+        server.server_close()
+
+    assert first.choices[0].message.content == second.choices[0].message.content
+    assert CountingStub.calls == 2
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_sql_backend_expires_and_prunes(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(db, "SessionLocal", sessionmaker(bind=engine, expire_on_commit=False))
+    backend = SQLResponseCache(max_entries=2, prune_every=3)
+
+    backend.set("old", "digest", {"v": 0}, ttl_seconds=-1)
+    backend.set("k1", "digest", {"v": 1}, ttl_seconds=60)
+    assert backend.get("old") is None
+    assert backend.get("k1") == {"v": 1}
+    backend.set("k2", "digest", {"v": 2}, ttl_seconds=60)  # third write prunes
+    assert backend.size() == 2
+    backend.set("k3", "digest", {"v": 3}, ttl_seconds=60)
+    with db.session_scope() as session:
+        Repository(session).prune_llm_responses(dt.datetime.now(dt.timezone.utc), 2)
+    assert backend.get("k1") is None
+    assert backend.get("k3") == {"v": 3}
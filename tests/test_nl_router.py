@@ -1,28 +1,19 @@
 import json
 from types import SimpleNamespace
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import pytest
 
+from slack_digest_bot.app.metrics import metrics
 from slack_digest_bot.nl import router
 from slack_digest_bot.storage import db
-from slack_digest_bot.storage.db import Base
 from slack_digest_bot.storage.repo import Repository
 
 
 class FakeSlackClient:
-    def resolve_channel_id(self, value: str):
+    def resolve_channel_id(self, team_id: str, value: str):
         return value
 
 
-def setup_inmemory_db(monkeypatch):
-    engine = create_engine("sqlite:///:memory:")
-    Base.metadata.create_all(engine)
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
-    monkeypatch.setattr(db, "engine", engine)
-    monkeypatch.setattr(db, "SessionLocal", SessionLocal)
-
-
 def make_fake_completion():
     tool_call = SimpleNamespace(
         function=SimpleNamespace(name="add_channels", arguments=json.dumps({"channels": ["C1"]})),
@@ -32,14 +23,36 @@ def make_fake_completion():
     return SimpleNamespace(choices=choices)
 
 
+@pytest.mark.usefixtures("inmemory_db")
 def test_nl_router_applies_tool_calls(monkeypatch):
-    setup_inmemory_db(monkeypatch)
-    monkeypatch.setattr(router, "openai_client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: make_fake_completion()))))
-
-    text = router.handle_dm_message(team_id="T1", user_id="U1", text="track #general", slack_client=FakeSlackClient())
+    fake = SimpleNamespace(chat=lambda purpose, **kwargs: make_fake_completion())
+    monkeypatch.setattr(router, "get_llm_gateway", lambda: fake)
+
+    text = router.handle_dm_message(
+        team_id="T1",
+        user_id="U1",
+        text="please keep an eye on general for me",
+        slack_client=FakeSlackClient(),
+    )
     with db.session_scope() as session:
         repo = Repository(session)
         user = repo.get_user_with_prefs("T1", "U1")
         channels = [sub.channel_id for sub in user.subscriptions if sub.enabled]
     assert "C1" in channels
     assert "Added" in text
+
+
+@pytest.mark.usefixtures("inmemory_db")
+def test_common_commands_skip_the_llm(monkeypatch):
+    def fail(purpose, **kwargs):
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr(router, "get_llm_gateway", lambda: SimpleNamespace(chat=fail))
+    before = metrics.counter("nl.dm.fast").value
+
+    text = router.handle_dm_message(
+        team_id="T1", user_id="U1", text="add C0123ABCD", slack_client=FakeSlackClient()
+    )
+
+    assert "Added: C0123ABCD" in text
+    assert metrics.counter("nl.dm.fast").value == before + 1
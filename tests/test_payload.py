@@ -0,0 +1,79 @@
+import json
+import logging
+
+from slack_digest_bot.digest.payload import build_digest_payload, estimate_tokens
+from slack_digest_bot.digest.preprocess import preprocess_messages
+from slack_digest_bot.storage.models import DigestMessage
+
+
+def make_messages():
+    return [
+        DigestMessage("C_LOW", "100.0", "U2", "lunch anyone " * 20, None),
+        DigestMessage("C_HIGH", "101.0", "U3", "release notes " * 20, None),
+        DigestMessage("C_LOW", "102.0", "U4", "<@U1> can you review?", None),
+        DigestMessage("C_LOW", "103.0", "U5", "<!here> deploy freeze", None),
+    ]
+
+
+def build(messages, budget, channel_summaries=None):
+    return build_digest_payload(
+        preprocessed=preprocess_messages(messages, "U1"),
+        messages=messages,
+        timezone="UTC",
+        instructions="digest",
+        token_budget=budget,
+        channel_summaries=channel_summaries,
+        channel_weights={"C_HIGH": 3},
+    )
+
+
+def test_payload_is_compact_json_with_index_references(caplog):
+    caplog.set_level(logging.DEBUG, logger="slack_digest_bot.digest.payload")
+    messages = make_messages()
+    result = build(messages, budget=10_000)
+    payload = json.loads(result.content)
+
+    assert len(payload["messages"]) == 4
+    # Priority order: mention, broadcast, weighted channel, the rest.
+    assert [row[1] for row in payload["messages"]] == ["102.0", "103.0", "101.0", "100.0"]
+    assert payload["mentions_me"] == [0]
+    assert payload["broadcasts"] == [1]
+    assert result.tokens == estimate_tokens(result.content)
+    assert result.tokens_saved > 0
+    assert result.baseline_tokens > result.tokens  # legacy measure, DEBUG only
+
+
+def test_budget_drops_lowest_priority_messages_first():
+    messages = make_messages()
+    result = build(messages, budget=180)
+    payload = json.loads(result.content)
+
+    kept = [row[1] for row in payload["messages"]]
+    assert kept[:2] == ["102.0", "103.0"]
+    assert "100.0" not in kept
+    assert result.dropped >= 1
+    assert result.tokens <= 180
+
+
+def test_savings_are_measured_without_the_debug_only_legacy_baseline():
+    result = build(make_messages(), budget=10_000)
+    assert result.baseline_tokens is None
+    # The mention and the broadcast are referenced by index instead of copied.
+    assert result.tokens_saved > 0
+
+
+def test_oversized_channel_summaries_are_trimmed_and_keep_mentions():
+    messages = make_messages()
+    summaries = [
+        {"channel_id": "C_LOW", "summary": "standup chatter " * 200, "highlights": ["x"] * 50},
+        {"channel_id": "C_HIGH", "summary": "release went out " * 200, "highlights": []},
+    ]
+    result = build(messages, budget=600, channel_summaries=summaries)
+    payload = json.loads(result.content)
+
+    assert result.tokens <= 600
+    assert result.trimmed_summaries == 2
+    # Weighted channel first, cut short; the second one no longer fits.
+    assert [s["channel_id"] for s in payload["channel_summaries"]] == ["C_HIGH"]
+    assert payload["channel_summaries"][0]["summary"].endswith("…")
+    assert payload["messages"][payload["mentions_me"][0]][1] == "102.0"
@@ -1,5 +1,4 @@
-import datetime as dt
-
+from slack_digest_bot.digest.classifier import MessageClassifier, MessageFlag
 from slack_digest_bot.digest.preprocess import preprocess_messages
 from slack_digest_bot.storage.models import Message
 
@@ -37,3 +36,46 @@ def test_unanswered_questions_in_threads_and_channels():
     unanswered_ts = {m.slack_ts for m in result.unanswered_questions}
     assert "10.0" in unanswered_ts
     assert "20.0" not in unanswered_ts
+
+
+def test_unanswered_channel_window_handles_unsorted_input():
+    # Question answered 30 minutes later is still unanswered; arrival order is shuffled.
+    late_q = make_msg("Who owns billing?", "1000.0")
+    late_reply = make_msg("me", "2800.0")
+    quick_q = make_msg("Is prod down?", "5000.0", channel="C2")
+    quick_reply = make_msg("no", "5060.0", channel="C2")
+    thread_q = make_msg("How do I deploy?", "7000.0", thread_ts="7000.0")
+    thread_reply = make_msg("see docs", "7100.0", thread_ts="7000.0")
+    messages = [quick_reply, late_reply, thread_reply, late_q, thread_q, quick_q]
+
+    result = preprocess_messages(messages, user_id="U1")
+
+    assert [m.slack_ts for m in result.unanswered_questions] == ["1000.0"]
+
+
+def test_classifier_flags_everything_in_one_scan():
+    classifier = MessageClassifier({"incident": r"sev[12]", "broken": "(unclosed"})
+    features = classifier.classify(
+        "<!channel> SEV1 for <@U2|bob> and <@U3>: see <https://status.example.com/?id=1>"
+    )
+    expected = MessageFlag.BROADCAST | MessageFlag.MENTION | MessageFlag.LINK | MessageFlag.QUESTION
+    assert features.flags == expected
+    assert features.mentions == {"U2", "U3"}
+    assert features.custom == {"incident"}
+    assert classifier.classify("  how do I rotate keys").flags == MessageFlag.QUESTION
+
+
+def test_custom_rules_do_not_shadow_builtin_matches():
+    classifier = MessageClassifier({"deploy": "deploy.*", "me": "<@U1>"})
+    features = classifier.classify("deploy broke <@U1> ?")
+    assert features.flags == MessageFlag.MENTION | MessageFlag.QUESTION
+    assert features.mentions == {"U1"}
+    assert features.custom == {"deploy", "me"}
+
+
+def test_preprocess_collects_custom_rule_matches():
+    messages = [make_msg("sev2 in payments", "1.0"), make_msg("all good", "2.0")]
+    result = preprocess_messages(
+        messages, user_id="U1", custom_rules={"patterns": {"incident": "sev[12]"}}
+    )
+    assert [m.slack_ts for m in result.custom_matches["incident"]] == ["1.0"]
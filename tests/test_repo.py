@@ -1,24 +1,15 @@
 import datetime as dt
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
 
-from slack_digest_bot.storage import db
-from slack_digest_bot.storage.db import Base
-from slack_digest_bot.storage.models import Message
+from slack_digest_bot.digest.classifier import MessageFlag, ingestion_features
+from slack_digest_bot.storage.models import DigestMessage
 from slack_digest_bot.storage.repo import Repository
+from slack_digest_bot.storage.schedule_changes import schedule_changes
 
 
-def setup_inmemory_session():
-    engine = create_engine("sqlite:///:memory:")
-    Base.metadata.create_all(engine)
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
-    return SessionLocal()
-
-
-def test_fetch_messages_filters_to_tracked_channels():
-    session = setup_inmemory_session()
-    repo = Repository(session)
+def test_fetch_messages_filters_to_tracked_channels(db_session):
+    repo = Repository(db_session)
     user = repo.get_or_create_user("T1", "U1")
     repo.add_channels(user, ["C-track"])
     repo.add_channels(user, ["C-other"])  # disabled later
@@ -47,3 +38,137 @@ def test_fetch_messages_filters_to_tracked_channels():
     messages = repo.fetch_messages_for_user("T1", "U1", since=now - dt.timedelta(days=1))
     assert len(messages) == 1
     assert messages[0].channel_id == "C-track"
+
+
+def test_schedule_changes_publish_after_commit_only(db_session):
+    repo = Repository(db_session)
+    heard = []
+    schedule_changes.subscribe(heard.append)
+    try:
+        repo.set_digest_time(repo.get_or_create_user("T1", "U1", "Europe/Paris"), "08:00")
+        assert heard == []
+        db_session.commit()
+        assert heard == [
+            ("T1", "U1", "Europe/Paris", "09:00"),
+            ("T1", "U1", "Europe/Paris", "08:00"),
+        ]
+
+        repo.set_digest_time(repo.get_or_create_user("T1", "U1"), "07:00")
+        db_session.rollback()
+        assert repo.delete_user("T1", "U1")
+        db_session.commit()
+    finally:
+        schedule_changes.unsubscribe(heard.append)
+
+    assert heard[2:] == [("T1", "U1", None, None)]
+    assert repo.user_keys() == set()
+
+
+def test_stream_messages_yields_digest_columns_only(db_session):
+    repo = Repository(db_session)
+    user = repo.get_or_create_user("T1", "U1")
+    repo.add_channels(user, ["C-track"])
+    for ts, text in (("1.0", "first"), ("2.0", "gone"), ("3.0", "reply")):
+        repo.upsert_message(
+            team_id="T1",
+            channel_id="C-track",
+            slack_ts=ts,
+            user_id="U2",
+            text=text,
+            thread_ts="1.0" if ts == "3.0" else None,
+            subtype=None,
+            raw_json={"big": "payload"},
+        )
+    repo.mark_message_deleted("T1", "C-track", "2.0")
+
+    since = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=1)
+    streamed = list(repo.stream_messages_for_user("T1", "U1", since=since, batch_size=1))
+    assert [m[:5] for m in streamed] == [
+        ("C-track", "1.0", "U2", "first", None),
+        ("C-track", "3.0", "U2", "reply", "1.0"),
+    ]
+    assert all(isinstance(m, DigestMessage) for m in streamed)
+    assert list(repo.stream_messages_for_user("T1", "U-unknown", since=since)) == []
+
+
+def test_upsert_stores_caller_features_and_clears_them_on_edit(db_session):
+    repo = Repository(db_session)
+    user = repo.get_or_create_user("T1", "U1")
+    repo.add_channels(user, ["C1"])
+    features, mentioned = ingestion_features("lunch <@U1>?")
+    message = {"team_id": "T1", "channel_id": "C1", "slack_ts": "1.0", "user_id": "U2"}
+    repo.upsert_message(
+        **message,
+        text="lunch <@U1>?",
+        thread_ts=None,
+        subtype=None,
+        features=features,
+        mentioned_user_ids=mentioned,
+    )
+    db_session.flush()
+
+    since = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=1)
+    (stored,) = repo.stream_messages_for_user("T1", "U1", since=since)
+    assert stored.features == MessageFlag.MENTION | MessageFlag.QUESTION
+    assert stored.mentioned_user_ids == ",U1,"
+
+    repo.upsert_message(**message, text="lunch", thread_ts=None, subtype=None)
+    db_session.flush()
+    (edited,) = repo.stream_messages_for_user("T1", "U1", since=since)
+    assert (edited.features, edited.mentioned_user_ids) == (None, None)
+
+
+def add_window(repo, count, created_at):
+    user = repo.get_or_create_user("T1", "U1")
+    repo.add_channels(user, ["C1", "C2"])
+    repo.bulk_upsert_messages(
+        [
+            {
+                "team_id": "T1",
+                "channel_id": f"C{idx % 2 + 1}",
+                "slack_ts": f"{idx}.0",
+                "user_id": "U2",
+                "text": f"m{idx}",
+                "thread_ts": None,
+                "subtype": None,
+                "created_at": created_at + dt.timedelta(minutes=idx // 3),  # ties of 3
+            }
+            for idx in range(count)
+        ]
+    )
+
+
+def test_stream_messages_pages_by_keyset_across_created_at_ties(db_session):
+    repo = Repository(db_session)
+    now = dt.datetime.now(dt.timezone.utc)
+    add_window(repo, 10, now - dt.timedelta(hours=1))
+    repo.mark_message_deleted("T1", "C1", "4.0")
+
+    messages = repo.stream_messages_for_user(
+        "T1", "U1", since=now - dt.timedelta(days=1), batch_size=4
+    )
+
+    assert [msg.text for msg in messages] == [f"m{idx}" for idx in range(10) if idx != 4]
+
+
+def test_stream_messages_pages_use_live_window_index(db_session):
+    repo = Repository(db_session)
+    now = dt.datetime.now(dt.timezone.utc)
+    add_window(repo, 10, now - dt.timedelta(hours=1))
+    engine = db_session.get_bind()
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT messages."):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    list(repo.stream_messages_for_user("T1", "U1", since=now - dt.timedelta(days=1), batch_size=4))
+    event.remove(engine, "before_cursor_execute", capture)
+
+    assert len(captured) == 3  # first page plus two keyset continuations
+    for statement, parameters in captured:
+        plan = db_session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        )
+        assert any("ix_messages_team_channel_created_live" in row[-1] for row in plan)
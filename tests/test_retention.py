@@ -0,0 +1,41 @@
+import datetime as dt
+
+from sqlalchemy import func, select
+
+from slack_digest_bot.storage.models import Message
+from slack_digest_bot.storage.repo import Repository
+from slack_digest_bot.storage.retention import MessageRetention
+
+
+def test_retention_deletes_in_id_batches_and_stops_at_new_rows(scoped_sessions, committed_sessions):
+    now = dt.datetime.now(dt.timezone.utc)
+    with scoped_sessions() as session:
+        Repository(session).bulk_upsert_messages(
+            [
+                {
+                    "team_id": "T1",
+                    "channel_id": "C1",
+                    "slack_ts": f"{idx}.0",
+                    "user_id": "U1",
+                    "text": "hello",
+                    "thread_ts": None,
+                    "subtype": None,
+                    "created_at": now - dt.timedelta(days=40 if idx < 20 else 1),
+                }
+                for idx in range(30)
+            ]
+        )
+    committed_sessions.clear()
+    pauses = []
+
+    retention = MessageRetention(
+        batch_size=6, pause_seconds=0.5, session_factory=scoped_sessions, sleep=pauses.append
+    )
+    deleted = retention.run(before=now - dt.timedelta(days=30))
+
+    assert deleted == 20
+    # bounds lookup + 4 batches (ids 1-24; the row after id 24 is new) + derived rows
+    assert len(committed_sessions) == 6
+    assert pauses == [0.5] * 3
+    with scoped_sessions() as session:
+        assert session.execute(select(func.count()).select_from(Message)).scalar() == 10
@@ -0,0 +1,83 @@
+import datetime as dt
+
+import pytest
+
+from slack_digest_bot.digest.rollup import RollingChannelSummaries
+from slack_digest_bot.storage import db
+from slack_digest_bot.storage.models import Message
+from slack_digest_bot.storage.repo import Repository
+
+BASE = dt.datetime(2024, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def add_message(session, minutes: int, text: str) -> None:
+    moment = BASE + dt.timedelta(minutes=minutes)
+    session.add(
+        Message(
+            team_id="T1",
+            channel_id="C1",
+            slack_ts=f"{moment.timestamp():.6f}",
+            text=text,
+            created_at=moment,
+        )
+    )
+
+
+def messages(session):
+    return list(
+        Repository(session).stream_channel_messages("T1", "C1", BASE, BASE + dt.timedelta(hours=2))
+    )
+
+
+class Recorder:
+    def __init__(self):
+        self.summarized = []
+        self.merged = []
+
+    def summarize(self, channel_id, msgs):
+        self.summarized.append([m.text for m in msgs])
+        return {"summary": "+".join(m.text for m in msgs)}
+
+    def merge(self, channel_id, partials):
+        self.merged.append(list(partials))
+        return {"summary": " | ".join(p["summary"] for p in partials)}
+
+
+@pytest.mark.usefixtures("inmemory_db")
+def test_refresh_precomputes_buckets_and_digest_folds_in_delta():
+    with db.session_scope() as session:
+        repo = Repository(session)
+        repo.add_channels(repo.get_or_create_user("T1", "U1"), ["C1"])
+        for minutes, text in ((5, "a"), (10, "b"), (40, "c"), (70, "d")):
+            add_message(session, minutes, text)
+
+    recorder = Recorder()
+    rollups = RollingChannelSummaries(recorder.summarize, recorder.merge, bucket_minutes=30)
+    assert rollups.refresh(now=BASE + dt.timedelta(minutes=80)) == 2
+    assert recorder.summarized == [["a", "b"], ["c"]]
+
+    with db.session_scope() as session:
+        window = messages(session)
+    summary = rollups.channel_summary(
+        "T1", "C1", window, since=BASE, until=BASE + dt.timedelta(minutes=80)
+    )
+    assert summary == {"summary": "a+b | c | d"}
+    assert recorder.summarized[2:] == [["d"]]  # only the delta bucket
+
+    with db.session_scope() as session:
+        Repository(session).upsert_message(
+            team_id="T1",
+            channel_id="C1",
+            slack_ts=window[0].slack_ts,
+            user_id=None,
+            text="a2",
+            thread_ts=None,
+            subtype=None,
+        )
+        session.flush()
+        window = messages(session)
+    summary = rollups.channel_summary(
+        "T1", "C1", window, since=BASE, until=BASE + dt.timedelta(minutes=80)
+    )
+    assert summary == {"summary": "a2+b | c | d"}
+    assert recorder.summarized[3:] == [["a2", "b"], ["d"]]
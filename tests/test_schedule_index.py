@@ -0,0 +1,36 @@
+import datetime as dt
+
+from slack_digest_bot.digest.schedule_index import ScheduleIndex
+
+UTC = dt.timezone.utc
+
+
+def test_pop_due_groups_users_and_follows_dst():
+    index = ScheduleIndex()
+    # 2024-03-09 12:00 UTC: New York is on EST (UTC-5); DST starts on 2024-03-10.
+    now = dt.datetime(2024, 3, 9, 12, 0, tzinfo=UTC)
+    index.upsert("T1", "U1", "America/New_York", "09:00", now=now)
+    index.upsert("T1", "U2", "America/New_York", "09:00", now=now)
+    index.upsert("T1", "U3", "UTC", "15:00", now=now)
+
+    assert index.pop_due(now) == []
+    assert index.next_due() == dt.datetime(2024, 3, 9, 14, 0, tzinfo=UTC)
+
+    due = index.pop_due(dt.datetime(2024, 3, 9, 14, 0, 30, tzinfo=UTC))
+    assert due == [(dt.datetime(2024, 3, 9, 14, 0, tzinfo=UTC), [("T1", "U1"), ("T1", "U2")])]
+
+    index.pop_due(dt.datetime(2024, 3, 9, 15, 0, tzinfo=UTC))
+    # Next New York run is after the switch to EDT (UTC-4).
+    assert index.next_due() == dt.datetime(2024, 3, 10, 13, 0, tzinfo=UTC)
+
+
+def test_upsert_moves_user_between_slots_incrementally():
+    index = ScheduleIndex()
+    now = dt.datetime(2024, 1, 1, 0, 0, tzinfo=UTC)
+    index.upsert("T1", "U1", "UTC", "09:00", now=now)
+    index.upsert("T1", "U1", "UTC", "10:30", now=now)
+
+    assert len(index) == 1
+    assert index.pop_due(dt.datetime(2024, 1, 1, 9, 0, tzinfo=UTC)) == []
+    due = index.pop_due(dt.datetime(2024, 1, 1, 10, 30, tzinfo=UTC))
+    assert due == [(dt.datetime(2024, 1, 1, 10, 30, tzinfo=UTC), [("T1", "U1")])]
@@ -0,0 +1,80 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from slack_digest_bot.slack.rate_limits import BULK, INTERACTIVE, SlackRateLimiter
+from slack_digest_bot.slack.slack_client import SlackClient
+
+
+class FakeSlackAPI(BaseHTTPRequestHandler):
+    """Answers every method with ok, except the first ``limited`` calls get a 429."""
+
+    limited = 0
+    calls = []
+
+    def do_POST(self):
+        cls = type(self)
+        self.rfile.read(int(self.headers.get("content-length") or 0))
+        cls.calls.append((self.path, time.monotonic()))
+        if len(cls.calls) <= cls.limited:
+            status, body, headers = 429, {"ok": False, "error": "ratelimited"}, {"Retry-After": "1"}
+        else:
+            status, body, headers = 200, {"ok": True, "channel": {"id": "D1"}}, {}
+        out = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(out)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slack_url():
+    FakeSlackAPI.limited, FakeSlackAPI.calls = 0, []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSlackAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/api/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_rate_limited_call_waits_for_retry_after_and_is_queued_again(slack_url):
+    FakeSlackAPI.limited = 1
+    client = SlackClient("xoxb-test", base_url=slack_url, rate_limiter=SlackRateLimiter())
+
+    client.post_message("D1", "hello")
+
+    (_, first), (path, second) = FakeSlackAPI.calls
+    assert path == "/api/chat.postMessage"
+    assert second - first >= 1.0
+
+
+def test_interactive_calls_jump_ahead_of_queued_bulk_calls():
+    limiter = SlackRateLimiter(tier_rates={"post": 600})  # one token per 0.1s
+    while limiter._lane("T1", "post").bucket.try_acquire() <= 0:
+        pass  # drain the burst allowance
+    served = []
+
+    def call(name, priority):
+        limiter.acquire("T1", "chat.postMessage", priority)
+        served.append(name)
+
+    threads = [threading.Thread(target=call, args=(f"bulk{i}", BULK)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.02)
+    interactive = threading.Thread(target=call, args=("dm-reply", INTERACTIVE))
+    interactive.start()
+    for thread in [*threads, interactive]:
+        thread.join()
+
+    assert served[0] == "dm-reply"
+    assert sorted(served[1:]) == ["bulk0", "bulk1", "bulk2"]
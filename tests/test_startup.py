@@ -0,0 +1,17 @@
+import subprocess
+import sys
+
+PROBE = """
+import sys
+import slack_digest_bot.app.main
+from slack_digest_bot.storage import db
+print(sorted(m for m in ("openai", "httpx") if m in sys.modules), db.engine, db.SessionLocal)
+"""
+
+
+def test_importing_the_app_builds_no_clients_or_engines():
+    """Clients and the engine are built on first use, not at import (see bench_import_time)."""
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], capture_output=True, text=True, check=True
+    ).stdout
+    assert out.strip() == "[] None None"
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from slack_digest_bot.digest.summary_cache import ChannelSummaryCache
+from slack_digest_bot.storage.models import DigestMessage
+
+
+def msg(ts: str, text: str = "hello") -> DigestMessage:
+    return DigestMessage("C1", ts, "U9", text, None)
+
+
+def test_same_messages_hit_and_edits_change_the_key():
+    cache = ChannelSummaryCache(max_entries=10)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"summary": f"v{len(calls)}"}
+
+    first = cache.get_or_compute("T1", "C1", [msg("1.0"), msg("2.0")], compute)
+    again = cache.get_or_compute("T1", "C1", [msg("2.0"), msg("1.0")], compute)
+    edited = cache.get_or_compute("T1", "C1", [msg("1.0"), msg("2.0", "edited")], compute)
+
+    assert first == again == {"summary": "v1"}
+    assert edited == {"summary": "v2"}
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_invalidate_drops_channel_entries():
+    cache = ChannelSummaryCache(max_entries=10)
+    cache.get_or_compute("T1", "C1", [msg("1.0")], lambda: {"summary": "a"})
+    cache.get_or_compute("T1", "C2", [msg("1.0")], lambda: {"summary": "b"})
+
+    assert cache.invalidate("T1", "C1") == 1
+    stats = cache.stats()
+    assert stats["invalidations"] == 1
+    assert stats["size"] == 1
+
+
+def test_concurrent_misses_compute_once():
+    cache = ChannelSummaryCache(max_entries=10)
+    calls = []
+
+    def slow_compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"summary": "shared"}
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                cache.get_or_compute("T1", "C1", [msg("1.0")], slow_compute)
+            )
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"summary": "shared"}] * 8
+    assert cache.stats()["hits"] == 7